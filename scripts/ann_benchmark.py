@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Recall/latency report for the FAISS ANN index types.
+
+Reads the exact vectors from a saved flat semantic index, holds out a set of
+them as queries, and measures each ANN configuration against exact
+inner-product search: recall@k, p50/p95 single-query latency and the
+serialized index size.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from foia_ai.retrieval.ann import (
+    StreamingIndexBuilder,
+    create_ann_index,
+    describe_index,
+    index_type_of,
+    set_search_params,
+)
+
+
+def load_vectors(index_dir: Path) -> np.ndarray:
+    index = faiss.read_index(str(index_dir / "semantic.faiss"))
+    if index_type_of(index) != "flat":
+        raise SystemExit(f"{index_dir} holds a {index_type_of(index)} index; the benchmark needs exact (flat) vectors")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    latencies = []
+    found = np.empty((len(queries), k), dtype='int64')
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0]
+    return found, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def configurations(args):
+    yield "flat", {}, {}
+    for nprobe in args.nprobe:
+        yield "ivf_flat", {}, {'nprobe': nprobe}
+    for nprobe in args.nprobe:
+        yield "ivf_pq", {}, {'nprobe': nprobe}
+    for ef_search in args.ef_search:
+        yield "hnsw", {}, {'ef_search': ef_search}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS ANN index types against exact search")
+    parser.add_argument("index_dir", type=Path, help="Saved search index directory with a flat semantic.faiss")
+    parser.add_argument("--queries", type=int, default=500, help="Held-out vectors used as queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--types", nargs="+", default=None, help="Only benchmark these index types")
+    parser.add_argument("--json", type=Path, default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index_dir)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(vectors))
+    n_queries = min(args.queries, len(vectors) // 10 or 1)
+    queries = np.ascontiguousarray(vectors[order[:n_queries]])
+    base = np.ascontiguousarray(vectors[order[n_queries:]])
+    dim = base.shape[1]
+    print(f"Corpus: {len(base):,} vectors x {dim} dims, {n_queries} queries, k={args.top_k}")
+
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(base)
+    _, truth = exact.search(queries, args.top_k)
+
+    built = {}
+    results = []
+    for index_type, build_params, search_params in configurations(args):
+        if args.types and index_type not in args.types:
+            continue
+        if index_type not in built:
+            start = time.perf_counter()
+            index = create_ann_index(dim, index_type, n_vectors=len(base), **build_params)
+            builder = StreamingIndexBuilder(index)
+            for offset in range(0, len(base), 10000):
+                builder.add(base[offset:offset + 10000])
+            index = builder.finish()
+            if index_type_of(index) != index_type:
+                print(f"Skipping {index_type}: corpus too small to train it")
+                built[index_type] = None
+                continue
+            built[index_type] = (index, time.perf_counter() - start, len(faiss.serialize_index(index)))
+        if built[index_type] is None:
+            continue
+        index, build_seconds, size_bytes = built[index_type]
+        set_search_params(index, **search_params)
+        found, p50, p95 = time_queries(index, queries, args.top_k)
+        row = {
+            **describe_index(index),
+            'recall': round(recall_at_k(found, truth), 4),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'size_mb': round(size_bytes / 1e6, 2),
+            'build_s': round(build_seconds, 2),
+        }
+        results.append(row)
+
+    print(f"\n{'type':<9} {'params':<22} {'recall@' + str(args.top_k):>10} {'p50 ms':>8} {'p95 ms':>8} {'size MB':>9} {'build s':>8}")
+    for row in results:
+        if row['index_type'] in ("ivf_flat", "ivf_pq"):
+            params = f"nlist={row['nlist']} nprobe={row['nprobe']}"
+            if row['index_type'] == "ivf_pq":
+                params += f" m={row['pq_m']}"
+        elif row['index_type'] == "hnsw":
+            params = f"M={row['hnsw_m']} ef={row['ef_search']}"
+        else:
+            params = "exact"
+        print(f"{row['index_type']:<9} {params:<22} {row['recall']:>10.4f} {row['p50_ms']:>8.3f} "
+              f"{row['p95_ms']:>8.3f} {row['size_mb']:>9.2f} {row['build_s']:>8.2f}")
+
+    if args.json:
+        args.json.write_text(json.dumps({'top_k': args.top_k, 'queries': n_queries, 'results': results}, indent=2))
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
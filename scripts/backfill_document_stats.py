@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Populate the document_stats table for documents ingested before it existed."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from foia_ai.storage.stats import backfill_document_stats, corpus_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill per-document page/word statistics")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per refresh batch")
+    parser.add_argument("--missing-only", action="store_true", help="Skip documents that already have stats")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    start = time.time()
+    refreshed = backfill_document_stats(batch_size=args.batch_size, missing_only=args.missing_only)
+    totals = corpus_totals()
+
+    print(f"Refreshed stats for {refreshed:,} documents in {time.time() - start:.1f}s")
+    print(f"Documents: {totals['documents']:,}  Pages: {totals['pages']:,}  Words: {totals['words']:,}")
+
+
+if __name__ == "__main__":
+    main()
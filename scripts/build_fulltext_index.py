@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Create (or rebuild) the database full-text index used by /documents and query_database."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from foia_ai.storage.db import engine
+from foia_ai.storage.fulltext import ensure_fulltext_index, fulltext_supported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SQLite FTS5 / Postgres tsvector full-text index")
+    parser.add_argument("--rebuild", action="store_true", help="Repopulate the index from the pages/documents tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not fulltext_supported():
+        print(f"Full-text index not supported on {engine.dialect.name}; searches use ILIKE")
+        return
+
+    start = time.time()
+    ensure_fulltext_index(rebuild=args.rebuild)
+    print(f"Full-text index ready on {engine.dialect.name} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,13 @@ Build search index in batches and merge them
 This allows processing large document collections without memory issues
 """
 import sys
+import os
 import argparse
+import json
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
 import pickle
@@ -16,9 +22,17 @@ sys.path.insert(0, 'scripts')
 from hybrid_search_system import HybridSearchSystem
 
 sys.path.insert(0, 'src')
+from foia_ai.config import INDEX_DEDUP
+from foia_ai.retrieval.ann import ANN_INDEX_TYPES, describe_index, merge_saved_indexes
+from foia_ai.retrieval.dedup import ChunkDeduplicator
+from foia_ai.retrieval.bm25 import BM25IndexBuilder
+from foia_ai.storage.corpus import document_batch_starts, iter_documents
 from foia_ai.storage.db import get_session
 from foia_ai.storage.models import Document
 
+MANIFEST_PATH = Path("data/search_indexes/batch_manifest.json")
+LEGACY_PROGRESS_PATH = Path("data/search_indexes/batch_build_progress.pkl")
+
 
 def get_total_document_count():
     """Get total number of documents in database"""
@@ -26,53 +40,70 @@ def get_total_document_count():
         return session.query(Document).count()
 
 
-def build_batch_index(batch_num, offset, limit, embed_batch_size, chunk_process_size):
-    """Build index for a single batch of documents"""
+def load_manifest(batch_size):
+    """
+    Batch build manifest: {'batch_size', 'batches': {batch_num: entry}}.
+    
+    Entries carry the batch stats plus 'status' ('done' or 'failed') and
+    'attempts'. A manifest written for another batch size describes other
+    document ranges and is started over.
+    """
+    if MANIFEST_PATH.exists():
+        with open(MANIFEST_PATH, 'r') as f:
+            manifest = json.load(f)
+        if batch_size is None or manifest.get('batch_size') == batch_size:
+            return manifest
+        print(f"Batch manifest was written for batch size {manifest.get('batch_size')}, starting a new one")
+    return {'batch_size': batch_size, 'batches': {}}
+
+
+def write_manifest(manifest):
+    """Write the manifest via a temp file and rename, so a crash never leaves it half-written"""
+    manifest['updated_at'] = datetime.now().isoformat()
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_name(f".{MANIFEST_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def record_batch(manifest, batch_num, status, stats=None, attempts=1, error=None):
+    entry = dict(stats or {}, batch_num=batch_num, status=status, attempts=attempts)
+    if error:
+        entry['error'] = error
+    manifest['batches'][str(batch_num)] = entry
+    write_manifest(manifest)
+
+
+def completed_batches(manifest):
+    """Stats of the batches built successfully, in batch order"""
+    done = [entry for entry in manifest['batches'].values() if entry.get('status') == 'done']
+    return sorted(done, key=lambda entry: entry['batch_num'])
+
+
+def build_batch_index(batch_num, offset, limit, after_id, embed_batch_size, chunk_process_size,
+                      embedding_model=None, torch_threads=1):
+    """
+    Build index for a single batch of documents
+    
+    after_id: keyset cursor of the batch (see document_batch_starts); the
+        batch is the `limit` documents with the next ids
+    embedding_model: an already loaded SentenceTransformer to reuse
+    """
     print("\n" + "="*80)
     print(f"Building Index for Batch {batch_num}")
     print(f"   Documents: {offset} to {offset + limit - 1}")
     print("="*80)
     
-    search_system = HybridSearchSystem()
-    
-    print(f"Loading documents {offset} to {offset + limit}...")
-    
-    from foia_ai.storage.models import Page
+    # Batch indices stay exact so the merge can recover every vector; the
+    # configured ANN type is applied to the merged index.
+    search_system = HybridSearchSystem(index_type="flat")
+    search_system.embedding_model = embedding_model
     
-    with get_session() as session:
-        documents_query = session.query(Document).offset(offset).limit(limit).all()
-        
-        print(f"Processing {len(documents_query):,} documents...")
-        
-        documents = []
-        for doc in documents_query:
-            pages = session.query(Page).filter_by(document_id=doc.id).order_by(Page.page_no).all()
-            pages_with_text = [p for p in pages if p.text]
-            
-            if not pages_with_text:
-                continue
-            
-            page_texts = []
-            for page in pages_with_text:
-                page_texts.append({
-                    'page_no': page.page_no,
-                    'text': page.text
-                })
-            
-            full_text = "\n\n".join(p['text'] for p in page_texts)
-            if len(full_text.strip()) < 100:
-                continue
-            
-            documents.append({
-                'id': doc.external_id,
-                'title': doc.title or f"Document {doc.external_id}",
-                'source': doc.source.name if doc.source else 'Unknown',
-                'text': full_text,
-                'url': doc.url,
-                'page_count': len(pages_with_text),
-                'word_count': len(full_text.split()),
-                'pages': page_texts  # Store page-level data for citation tracking
-            })
+    print(f"Loading documents {offset} to {offset + limit} (after id {after_id})...")
+    documents = list(iter_documents(after_id=after_id, limit=limit, skip_duplicate_files=INDEX_DEDUP))
     
     if not documents:
         print(f"No valid documents found in batch {batch_num}")
@@ -86,6 +117,7 @@ def build_batch_index(batch_num, offset, limit, embed_batch_size, chunk_process_
         chunk_size=512,
         encode_batch_size=embed_batch_size,
         chunk_processing_size=chunk_process_size,
+        torch_threads=torch_threads,
     )
     duration = datetime.now() - start_time
     
@@ -104,12 +136,105 @@ def build_batch_index(batch_num, offset, limit, embed_batch_size, chunk_process_
         'doc_count': len(documents),
         'chunk_count': len(search_system.document_chunks),
         'duration': str(duration),
-        'path': batch_path
+        'path': str(batch_path)
     }
 
 
-def merge_batch_indices(batch_stats, output_name="full_search_index"):
-    """Merge all batch indices into a single unified index"""
+_worker_model = None
+_worker_torch_threads = 1
+
+
+def _init_build_worker(model_name, torch_threads):
+    """Load the embedding model once per worker process; every batch it builds reuses it"""
+    global _worker_model, _worker_torch_threads
+    _worker_torch_threads = torch_threads
+    loader = HybridSearchSystem(model_name, index_type="flat")
+    loader.load_embedding_model()
+    _worker_model = loader.embedding_model
+
+
+def _build_batch_task(batch_num, offset, limit, after_id, embed_batch_size, chunk_process_size):
+    stats = build_batch_index(batch_num, offset, limit, after_id, embed_batch_size, chunk_process_size,
+                              embedding_model=_worker_model, torch_threads=_worker_torch_threads)
+    gc.collect()
+    return stats
+
+
+def build_batches_parallel(batches, manifest, workers, embed_batch_size, chunk_process_size,
+                           model_name="all-MiniLM-L6-v2", max_attempts=3):
+    """
+    Build (batch_num, offset, limit, after_id) ranges on a pool of worker processes.
+    
+    Each worker loads the model once and takes the next range as soon as it
+    is free. Finished batches are recorded in the manifest as they complete.
+    A range whose build raised, or that was running when a worker process
+    died (which breaks the pool, so it is restarted), is queued again until
+    it has been tried max_attempts times, then recorded as failed.
+    """
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    pending = deque(batches)
+    attempts = defaultdict(int)
+    built = []
+    
+    def retry_or_fail(batch, error):
+        batch_num = batch[0]
+        if attempts[batch_num] < max_attempts:
+            print(f"Batch {batch_num} failed ({error}), retrying (attempt {attempts[batch_num] + 1}/{max_attempts})")
+            pending.append(batch)
+        else:
+            print(f"Batch {batch_num} failed after {attempts[batch_num]} attempts: {error}")
+            record_batch(manifest, batch_num, 'failed', attempts=attempts[batch_num], error=str(error))
+    
+    while pending:
+        print(f"Starting {workers} build workers ({torch_threads} torch threads each) for {len(pending)} batches")
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),  # torch is not fork-safe once initialised
+            initializer=_init_build_worker,
+            initargs=(model_name, torch_threads),
+        )
+        in_flight = {}
+        broken = False
+        try:
+            while (pending or in_flight) and not broken:
+                while pending and len(in_flight) < workers:
+                    batch = pending.popleft()
+                    attempts[batch[0]] += 1
+                    in_flight[executor.submit(_build_batch_task, *batch, embed_batch_size, chunk_process_size)] = batch
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    try:
+                        stats = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        retry_or_fail(batch, f"worker process died: {e}")
+                    except Exception as e:
+                        retry_or_fail(batch, e)
+                    else:
+                        if stats:
+                            built.append(stats)
+                            record_batch(manifest, batch[0], 'done', stats, attempts=attempts[batch[0]])
+                            print(f"Batch {batch[0]} recorded ({len(completed_batches(manifest))} done)")
+            
+            # The pool is unusable after a crash; everything it was running goes back in the queue
+            for batch in in_flight.values():
+                retry_or_fail(batch, "worker pool restarted")
+        finally:
+            executor.shutdown(wait=not broken, cancel_futures=True)
+    
+    return built
+
+
+def merge_batch_indices(batch_stats, output_name="full_search_index", index_type=None, ondisk=False):
+    """
+    Merge all batch indices into a single unified index of the given FAISS type.
+    
+    Vectors are streamed from one batch index at a time (see
+    merge_saved_indexes), never stacked into one array. With ondisk, IVF
+    inverted lists go to semantic.ivfdata next to the index instead of RAM.
+    """
     print("\n" + "="*80)
     print("Merging All Batch Indices")
     print("="*80)
@@ -120,9 +245,17 @@ def merge_batch_indices(batch_stats, output_name="full_search_index"):
     
     print(f"Merging {len(batch_stats)} batch indices...")
     
+    output_path = Path("data/search_indexes") / output_name
+    output_path.mkdir(parents=True, exist_ok=True)
+    
     all_document_chunks = []
     all_chunk_metadata = []
-    all_faiss_vectors = []
+    all_duplicate_chunks = []
+    faiss_files = []
+    keep_masks = []
+    expected_vectors = 0
+    bm25_builder = BM25IndexBuilder()
+    deduplicator = ChunkDeduplicator() if INDEX_DEDUP else None
     
     for i, stats in enumerate(batch_stats, 1):
         batch_path = Path(stats['path'])
@@ -130,99 +263,109 @@ def merge_batch_indices(batch_stats, output_name="full_search_index"):
         print(f"   Path: {batch_path}")
         
         try:
+            faiss_file = batch_path / "semantic.faiss"
+            if not faiss_file.exists():
+                print(f"No semantic.faiss in {batch_path}, skipping batch")
+                continue
+            
+            chunks = []
             chunks_file = batch_path / "document_chunks.pkl"
             if chunks_file.exists():
                 with open(chunks_file, 'rb') as f:
                     chunks = pickle.load(f)
-                    all_document_chunks.extend(chunks)
             
+            batch_metadata = []
+            batch_duplicates = []
             metadata_file = batch_path / "metadata.json"
             if metadata_file.exists():
-                import json
                 with open(metadata_file, 'r') as f:
                     metadata = json.load(f)
-                    if 'chunk_metadata' in metadata:
-                        all_chunk_metadata.extend(metadata['chunk_metadata'])
-            
-            # Note: We'll tokenize from chunks later (BM25 doesn't expose corpus)
-            
-            faiss_file = batch_path / "semantic.faiss"
-            if faiss_file.exists():
-                batch_index = faiss.read_index(str(faiss_file))
-                batch_vectors = np.zeros((batch_index.ntotal, batch_index.d), dtype='float32')
-                for j in range(batch_index.ntotal):
-                    batch_vectors[j] = batch_index.reconstruct(j)
-                all_faiss_vectors.append(batch_vectors)
-                print(f"Loaded {batch_index.ntotal:,} vectors")
-                del batch_index
-                del batch_vectors
-                gc.collect()
+                    batch_metadata = metadata.get('chunk_metadata', [])
+                    batch_duplicates = metadata.get('duplicate_chunks', [])
             
+            if len(batch_metadata) != len(chunks):
+                print(f"{len(batch_metadata):,} metadata entries for {len(chunks):,} chunks in {batch_path}, skipping batch")
+                continue
+            if any(not 0 <= duplicate['canonical'] < len(chunks) for duplicate in batch_duplicates):
+                print(f"Duplicate chunk records in {batch_path} point outside its {len(chunks):,} chunks, skipping batch")
+                continue
         except Exception as e:
             print(f"Error loading batch {stats['batch_num']}: {e}")
             continue
+        
+        # The batch is fully loaded; from here on the shared accumulators and the
+        # deduplicator are updated together, and a failure aborts the merge rather
+        # than leaving chunk positions out of step with the merged FAISS ids.
+        if deduplicator is not None:
+            # Chunks already merged from an earlier batch keep that batch's vector
+            placed = deduplicator.add_many(chunks)
+            merged_position = np.array([position for position, _ in placed], dtype=np.int64)
+            mask = np.array([new for _, new in placed], dtype=bool)
+            kept_chunks = [chunk for chunk, new in zip(chunks, mask) if new]
+            kept_metadata = [meta for meta, new in zip(batch_metadata, mask) if new]
+            duplicates = [
+                {**meta, 'canonical': int(position)}
+                for meta, position, new in zip(batch_metadata, merged_position, mask) if not new
+            ]
+            duplicates.extend(
+                {**duplicate, 'canonical': int(merged_position[duplicate['canonical']])}
+                for duplicate in batch_duplicates
+            )
+            print(f"Loaded {len(chunks):,} chunks ({len(chunks) - len(kept_chunks):,} already merged)")
+        else:
+            mask = None
+            kept_chunks = chunks
+            kept_metadata = batch_metadata
+            duplicates = [
+                {**duplicate, 'canonical': duplicate['canonical'] + len(all_document_chunks)}
+                for duplicate in batch_duplicates
+            ]
+            print(f"Loaded {len(chunks):,} chunks")
+        
+        bm25_builder.add_texts(kept_chunks)
+        all_document_chunks.extend(kept_chunks)
+        all_chunk_metadata.extend(kept_metadata)
+        all_duplicate_chunks.extend(duplicates)
+        keep_masks.append(mask)
+        faiss_files.append(faiss_file)
+        expected_vectors += len(kept_chunks)
     
     print(f"\nMerge Statistics:")
     print(f"   Total chunks: {len(all_document_chunks):,}")
     print(f"   Total metadata entries: {len(all_chunk_metadata):,}")
-    print(f"   FAISS vector batches: {len(all_faiss_vectors)}")
+    print(f"   Duplicate chunks sharing a vector: {len(all_duplicate_chunks):,}")
+    print(f"   FAISS batch indices: {len(faiss_files)}")
     
     print("\nBuilding merged FAISS index...")
-    if all_faiss_vectors:
-        merged_vectors = np.vstack(all_faiss_vectors)
-        print(f"   Total vectors: {merged_vectors.shape[0]:,}")
-        
-        dimension = merged_vectors.shape[1]
-        merged_faiss = faiss.IndexFlatIP(dimension)
-        
-        block_size = 10000
-        for start in range(0, len(merged_vectors), block_size):
-            end = min(start + block_size, len(merged_vectors))
-            block = merged_vectors[start:end]
-            merged_faiss.add(block)
-            print(f"   Added {end:,}/{len(merged_vectors):,} vectors...")
-        
-        del merged_vectors
-        del all_faiss_vectors
-        gc.collect()
-        
-        print(f"Merged FAISS index: {merged_faiss.ntotal:,} vectors")
-    else:
+    if not faiss_files:
         print("No FAISS vectors to merge")
         return
     
+    merged_faiss = merge_saved_indexes(
+        faiss_files,
+        index_type,
+        n_vectors=expected_vectors,
+        keep=keep_masks,
+        ondisk_path=(output_path / "semantic.ivfdata").resolve() if ondisk else None,
+    )
+    dimension = merged_faiss.d
+    gc.collect()
+    print(f"Merged FAISS index: {merged_faiss.ntotal:,} vectors ({describe_index(merged_faiss)['index_type']})")
+    if merged_faiss.ntotal != len(all_document_chunks):
+        print(f"Warning: {merged_faiss.ntotal:,} vectors for {len(all_document_chunks):,} chunks")
+    
     print("\nBuilding merged BM25 index...")
-    print(f"   Tokenizing {len(all_document_chunks):,} chunks...")
-    from rank_bm25 import BM25Okapi
-    
-    tokenized_chunks = []
-    batch_size = 100000
-    for i in range(0, len(all_document_chunks), batch_size):
-        end_idx = min(i + batch_size, len(all_document_chunks))
-        batch = all_document_chunks[i:end_idx]
-        tokenized_batch = [chunk.lower().split() for chunk in batch]
-        tokenized_chunks.extend(tokenized_batch)
-        print(f"   Tokenized {end_idx:,}/{len(all_document_chunks):,} chunks ({end_idx/len(all_document_chunks)*100:.1f}%)")
-        del tokenized_batch
-        gc.collect()
-    
-    print("   Creating BM25 index...")
-    merged_bm25 = BM25Okapi(tokenized_chunks)
-    del tokenized_chunks
+    merged_bm25 = bm25_builder.build()
+    del bm25_builder
     gc.collect()
     print(f"Merged BM25 index: {len(all_document_chunks):,} chunks")
     
     print("\nSaving merged index...")
-    output_path = Path("data/search_indexes") / output_name
-    output_path.mkdir(parents=True, exist_ok=True)
-    
     faiss_path = output_path / "semantic.faiss"
     faiss.write_index(merged_faiss, str(faiss_path))
     print(f"Saved FAISS index: {merged_faiss.ntotal:,} vectors")
     
-    bm25_path = output_path / "bm25.pkl"
-    with open(bm25_path, 'wb') as f:
-        pickle.dump(merged_bm25, f)
+    merged_bm25.save(output_path / "bm25")
     print(f"Saved BM25 index")
     
     chunks_path = output_path / "document_chunks.pkl"
@@ -230,16 +373,17 @@ def merge_batch_indices(batch_stats, output_name="full_search_index"):
         pickle.dump(all_document_chunks, f)
     print(f"Saved {len(all_document_chunks):,} chunks")
     
-    import json
     metadata = {
         'created_at': datetime.now().isoformat(),
         'total_documents': sum(s['doc_count'] for s in batch_stats),
         'total_chunks': len(all_document_chunks),
         'embedding_dimension': dimension,
+        'semantic_index': describe_index(merged_faiss),
         'chunk_size': 512,
         'overlap': 50,
         'batches_merged': len(batch_stats),
         'chunk_metadata': all_chunk_metadata,
+        'duplicate_chunks': all_duplicate_chunks,
         'semantic_weight': 0.6,
         'bm25_weight': 0.4
     }
@@ -275,6 +419,16 @@ def main():
                        help="Maximum number of batches to process (for testing)")
     parser.add_argument("--merge-only", action="store_true",
                        help="Only merge existing batch indices, don't build new ones")
+    parser.add_argument("--index-type", choices=ANN_INDEX_TYPES, default=None,
+                       help="FAISS type for the merged index (default SEARCH_ANN_INDEX)")
+    parser.add_argument("--ondisk", action="store_true",
+                       help="Keep IVF inverted lists of the merged index on disk (semantic.ivfdata)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes building batches in parallel (default: 1, sequential)")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                       help="Attempts per batch before it is recorded as failed in parallel mode (default: 3)")
+    parser.add_argument("--rebuild", action="store_true",
+                       help="Rebuild batches the manifest already records as done")
     args = parser.parse_args()
     
     print("="*80)
@@ -291,64 +445,78 @@ def main():
     print(f"   Starting Batch: {args.start_batch}")
     if args.max_batches:
         print(f"   Max Batches: {args.max_batches}")
+    print(f"   Workers: {args.workers}")
     print()
     
-    batch_stats = []
+    if args.merge_only:
+        print("Loading existing batch indices...")
+        if MANIFEST_PATH.exists():
+            batch_stats = completed_batches(load_manifest(None))
+        elif LEGACY_PROGRESS_PATH.exists():
+            with open(LEGACY_PROGRESS_PATH, 'rb') as f:
+                batch_stats = pickle.load(f)
+        else:
+            print("No batch manifest found. Run without --merge-only first.")
+            return
+        print(f"Found {len(batch_stats)} existing batch indices")
     
-    if not args.merge_only:
+    else:
+        manifest = load_manifest(args.batch_size)
+        batch_starts = document_batch_starts(args.batch_size)
+        batches = []
         batch_num = args.start_batch
         offset = (batch_num - 1) * args.batch_size
-        
         while offset < total_docs:
             if args.max_batches and batch_num >= args.start_batch + args.max_batches:
-                print(f"\nReached max batches limit ({args.max_batches})")
+                print(f"Limiting this run to {args.max_batches} batches")
                 break
-            
-            remaining = total_docs - offset
-            batch_limit = min(args.batch_size, remaining)
-            
-            try:
-                stats = build_batch_index(
-                    batch_num,
-                    offset,
-                    batch_limit,
-                    args.embed_batch_size,
-                    args.chunk_process_size
-                )
-                
-                if stats:
-                    batch_stats.append(stats)
-                    
-                    stats_file = Path("data/search_indexes/batch_build_progress.pkl")
-                    stats_file.parent.mkdir(parents=True, exist_ok=True)
-                    with open(stats_file, 'wb') as f:
-                        pickle.dump(batch_stats, f)
-                
-            except Exception as e:
-                print(f"\nError building batch {batch_num}: {e}")
-                print("   Saving progress and continuing...")
-                import traceback
-                traceback.print_exc()
-            
+            batches.append((batch_num, offset, min(args.batch_size, total_docs - offset), batch_starts[batch_num - 1]))
             batch_num += 1
             offset += args.batch_size
-            
-            gc.collect()
-    
-    else:
-        print("Loading existing batch indices...")
-        stats_file = Path("data/search_indexes/batch_build_progress.pkl")
-        if stats_file.exists():
-            with open(stats_file, 'rb') as f:
-                batch_stats = pickle.load(f)
-            print(f"Found {len(batch_stats)} existing batch indices")
-        else:
-            print("No batch progress file found. Run without --merge-only first.")
-            return
+        
+        todo = batches
+        if not args.rebuild:
+            done = {entry['batch_num'] for entry in completed_batches(manifest)}
+            todo = [batch for batch in batches if batch[0] not in done]
+            if len(todo) < len(batches):
+                print(f"Skipping {len(batches) - len(todo)} batches already in {MANIFEST_PATH} (--rebuild to redo them)")
+        
+        if args.workers > 1:
+            build_batches_parallel(todo, manifest, args.workers, args.embed_batch_size,
+                                   args.chunk_process_size, max_attempts=args.max_attempts)
+        elif todo:
+            loader = HybridSearchSystem(index_type="flat")
+            loader.load_embedding_model()
+            for batch_num, offset, batch_limit, after_id in todo:
+                try:
+                    stats = build_batch_index(
+                        batch_num,
+                        offset,
+                        batch_limit,
+                        after_id,
+                        args.embed_batch_size,
+                        args.chunk_process_size,
+                        embedding_model=loader.embedding_model,
+                    )
+                    
+                    if stats:
+                        record_batch(manifest, batch_num, 'done', stats)
+                    
+                except Exception as e:
+                    print(f"\nError building batch {batch_num}: {e}")
+                    print("   Saving progress and continuing...")
+                    import traceback
+                    traceback.print_exc()
+                    record_batch(manifest, batch_num, 'failed', error=str(e))
+                
+                gc.collect()
+        
+        batch_stats = completed_batches(manifest)
     
     if batch_stats:
-        print(f"\nBuilt {len(batch_stats)} batches successfully")
-        merge_batch_indices(batch_stats, output_name="full_search_index")
+        print(f"\n{len(batch_stats)} batches built successfully")
+        merge_batch_indices(batch_stats, output_name="full_search_index",
+                            index_type=args.index_type, ondisk=args.ondisk)
     else:
         print("\nNo batches were built successfully")
 
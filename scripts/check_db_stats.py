@@ -2,22 +2,19 @@
 import sys
 from pathlib import Path
 sys.path.append(str(Path(".").resolve()))
-from src.foia_ai.storage.db import get_session
-from src.foia_ai.storage.models import Document, Page
+from src.foia_ai.storage.stats import corpus_totals, ensure_document_stats_table
+from src.foia_ai.retrieval.columnar import ColumnarIndex
 from src.foia_ai.retrieval.hybrid_search import HybridRetriever
 
-with get_session() as session:
-    doc_count = session.query(Document).count()
-    page_count = session.query(Page).count()
-    print(f"Total Documents: {doc_count}")
-    print(f"Total Pages: {page_count}")
+ensure_document_stats_table()
+totals = corpus_totals()
+print(f"Total Documents: {totals['documents']}")
+print(f"Total Pages: {totals['pages']}")
+print(f"Total Words: {totals['words']:,}")
 
 retriever = HybridRetriever()
-if retriever.corpus_cache.exists():
-    import pickle
-    with open(retriever.corpus_cache, 'rb') as f:
-        data = pickle.load(f)
-        print(f"Cached Pages in Index: {len(data['pages'])}")
+if ColumnarIndex.exists(retriever.index_dir):
+    index = ColumnarIndex(retriever.index_dir)
+    print(f"Cached Pages in Index: {len(index)}")
 else:
     print("No retrieval cache found.")
-
@@ -36,6 +36,7 @@ try:
 except ImportError as e:
     print(f"Legacy search not available: {e}")
 
+from foia_ai.retrieval.result_cache import get_search_result_cache, search_cache_key
 from foia_ai.storage.db import get_session
 from foia_ai.storage.models import Document, Page
 
@@ -171,12 +172,18 @@ class ContextAwareWikiGenerator:
         
         print(f"Retrieving context for topic: '{topic}' (diversity: {diversity_mode})")
         
-        results = self.search_system.search(
-            query=topic, 
-            top_k=max_chunks,
-            search_mode="hybrid",
-            semantic_weight=0.6,  # 60-40 split as requested
-            diversity=diversity_mode
+        # Shared with the web search route, so regenerating a topic reuses its retrieval
+        results = get_search_result_cache().get_or_search(
+            search_cache_key(topic, "hybrid", max_chunks, 0.6, diversity_mode),
+            (type(self.search_system).__name__, self.search_system.index_version()),
+            lambda: self.search_system.search(
+                query=topic, 
+                top_k=max_chunks,
+                search_mode="hybrid",
+                semantic_weight=0.6,  # 60-40 split as requested
+                diversity=diversity_mode
+            ),
+            cacheable=lambda: not getattr(self.search_system, 'last_search_degraded', False),
         )
         
         context_chunks = []
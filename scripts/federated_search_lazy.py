@@ -20,7 +20,9 @@ if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
 sys.path.insert(0, str(ROOT / "scripts"))
-from hybrid_search_system import HybridSearchSystem
+from hybrid_search_system import HybridSearchSystem, encode_queries
+from foia_ai.retrieval.result_cache import path_version
+from foia_ai.retrieval.topk import iter_descending
 from sentence_transformers import SentenceTransformer
 
 
@@ -82,6 +84,10 @@ class LazyFederatedSearch:
         print(f"\nFederated search ready (lazy loading, parallel enabled)")
         print(f"Total: {len(self.batch_info)} batches, {total_docs:,} documents, {total_chunks:,} chunks")
     
+    def index_version(self) -> tuple:
+        """Changes whenever a batch index is rebuilt (its metadata.json is rewritten on save)"""
+        return path_version(info['path'] / "metadata.json" for info in self.batch_info)
+    
     def _load_shared_embedding_model(self):
         """Load embedding model once, share across all batches"""
         if self.shared_embedding_model is None:
@@ -203,6 +209,121 @@ class LazyFederatedSearch:
         
         return final_results
     
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 20,
+        search_mode: str = "hybrid",
+        semantic_weight: float = 0.6,
+        diversity: str = "balanced",
+        parallel: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Federated search for a list of queries (evaluation runs, topic sweeps).
+        
+        Queries are embedded once with the shared model, and each batch index
+        is loaded once and searched for all queries together (one FAISS call,
+        BM25 postings shared across queries), instead of cycling every batch
+        through the cache once per query.
+        
+        Returns:
+            One re-ranked result list per query, in input order
+        """
+        if not self.batch_info:
+            print("No batch indices found!")
+            return [[] for _ in queries]
+        if not queries:
+            return []
+        
+        print(f"\nFederated {search_mode.upper()} Search: {len(queries)} queries")
+        print(f"Settings: top_k={top_k}, semantic_weight={semantic_weight}, diversity={diversity}")
+        
+        shared_model = self._load_shared_embedding_model()
+        query_embeddings = None
+        if search_mode in ("semantic", "hybrid"):
+            query_embeddings = encode_queries(shared_model, self.model_name, queries)
+        
+        all_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        
+        def collect(batch_info, batch_results):
+            for query_results, results in zip(all_results, batch_results):
+                query_results.extend(results)
+            print(f"{batch_info['name']}: {sum(len(r) for r in batch_results)} results")
+        
+        if parallel and len(self.batch_info) > 1:
+            max_workers = min(2, len(self.batch_info))
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_batch = {
+                    executor.submit(
+                        self._search_batch_many,
+                        batch_info, queries, query_embeddings,
+                        top_k, search_mode, semantic_weight, diversity
+                    ): batch_info
+                    for batch_info in self.batch_info
+                }
+                
+                for future in as_completed(future_to_batch):
+                    batch_info = future_to_batch[future]
+                    try:
+                        collect(batch_info, future.result())
+                    except Exception as e:
+                        print(f"{batch_info['name']}: Error - {e}")
+        else:
+            for i, batch_info in enumerate(self.batch_info, 1):
+                print(f"[{i}/{len(self.batch_info)}] {batch_info['name']}...")
+                try:
+                    collect(batch_info, self._search_batch_many(
+                        batch_info, queries, query_embeddings,
+                        top_k, search_mode, semantic_weight, diversity
+                    ))
+                except Exception as e:
+                    print(f"Error: {e}")
+        
+        final_results = [self._rerank_results(results, top_k, diversity) for results in all_results]
+        
+        gc.collect()
+        
+        return final_results
+    
+    def _search_batch_many(
+        self,
+        batch_info: Dict[str, Any],
+        queries: List[str],
+        query_embeddings: Optional[Any],
+        top_k: int,
+        search_mode: str,
+        semantic_weight: float,
+        diversity: str
+    ) -> List[List[Dict[str, Any]]]:
+        """Search one batch index for every query; one result list per query."""
+        system = self._load_batch_index(batch_info)
+        if system is None:
+            return [[] for _ in queries]
+        
+        if search_mode == "hybrid":
+            batch_results = system.hybrid_search_many(
+                queries,
+                top_k=top_k,
+                semantic_weight=semantic_weight,
+                bm25_weight=1.0 - semantic_weight,
+                diversity_mode=diversity,
+                query_embeddings=query_embeddings
+            )
+        elif search_mode == "semantic":
+            raw = system.search_semantic_many(queries, top_k=top_k, query_embeddings=query_embeddings)
+            batch_results = [system._convert_indices_to_results(r) for r in raw]
+        else:  # bm25
+            raw = system.search_bm25_many(queries, top_k=top_k)
+            batch_results = [system._convert_indices_to_results(r) for r in raw]
+        
+        for results in batch_results:
+            for result in results:
+                result['batch_name'] = batch_info['name']
+                result['batch_path'] = str(batch_info['path'])
+        
+        return batch_results
+    
     def _search_single_batch(
         self,
         batch_info: Dict[str, Any],
@@ -276,9 +397,7 @@ class LazyFederatedSearch:
             if key not in seen or result.get('normalized_score', 0) > seen[key].get('normalized_score', 0):
                 seen[key] = result
         
-        deduplicated = list(seen.values())
-        
-        deduplicated.sort(key=lambda x: x.get('normalized_score', 0), reverse=True)
+        deduplicated = iter_descending(seen.values(), key=lambda x: x.get('normalized_score', 0))
         
         diversity_limits = {
             'strict': 1,      # Max 1 chunk per document
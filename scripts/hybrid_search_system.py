@@ -28,40 +28,61 @@ import faiss
 
 from sentence_transformers import SentenceTransformer
 
-try:
-    from rank_bm25 import BM25Okapi
-except ImportError:
-    print("Installing rank-bm25...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "rank-bm25"])
-    from rank_bm25 import BM25Okapi
-
 ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
-from foia_ai.storage.db import get_session
-from foia_ai.storage.models import Document, Page, Source
+from foia_ai.config import INDEX_DEDUP, SEARCH_ANN_INDEX
+from foia_ai.retrieval.ann import (
+    ANN_INDEX_TYPES,
+    StreamingIndexBuilder,
+    create_ann_index,
+    describe_index,
+    set_search_params,
+)
+from foia_ai.retrieval.bm25 import BM25Index, BM25IndexBuilder, tokenize
+from foia_ai.retrieval.dedup import ChunkDeduplicator, unique_documents
+from foia_ai.retrieval.embedding_cache import get_query_embedding_cache
+from foia_ai.retrieval.embedding_store import encode_chunks, get_chunk_embedding_store
+from foia_ai.retrieval.topk import iter_descending
+from foia_ai.storage.corpus import iter_documents
+
+
+def encode_queries(model, model_name: str, queries: List[str], batch_size: int = 64) -> np.ndarray:
+    """
+    Embed queries, L2-normalized for the inner-product FAISS index. Repeated
+    queries come from the shared query embedding cache; the rest are encoded
+    in one call.
+    """
+    embeddings = get_query_embedding_cache().encode(model, model_name, queries, batch_size=batch_size)
+    embeddings = np.array(embeddings, dtype='float32', order='C')
+    faiss.normalize_L2(embeddings)
+    return embeddings
 
 
 class HybridSearchSystem:
     """Combines semantic search (embeddings) with BM25 keyword search"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_type: Optional[str] = None):
         """
         Initialize hybrid search system
         
         Args:
             model_name: Sentence transformer model for embeddings
+            index_type: FAISS index built by build_search_index: flat, ivf_flat,
+                ivf_pq or hnsw (default SEARCH_ANN_INDEX)
         """
         self.model_name = model_name
+        self.index_type = index_type or SEARCH_ANN_INDEX
         self.embedding_model = None
         self.bm25 = None
         self.faiss_index = None
         self.documents = []
         self.document_chunks = []
         self.chunk_metadata = []
+        self.duplicate_chunks = []  # chunks whose text is indexed elsewhere; 'canonical' is that position
+        self._duplicates_by_chunk = None
         
         self.semantic_weight = 0.6
         self.bm25_weight = 0.4
@@ -103,46 +124,11 @@ class HybridSearchSystem:
         """Load documents from database and prepare for indexing"""
         print("Loading documents from database...")
         
-        with get_session() as session:
-            query = session.query(Document)
-            
-            if source_filter:
-                source = session.query(Source).filter_by(name=source_filter).first()
-                if source:
-                    query = query.filter_by(source_id=source.id)
-            
-            if limit:
-                documents = query.limit(limit).all()
-            else:
-                documents = query.all()
-            
-            print(f"Processing {len(documents):,} documents...")
-            
-            processed_docs = []
-            
-            for i, doc in enumerate(documents, 1):
-                if i % 500 == 0:
-                    print(f"  Processed {i:,}/{len(documents):,} documents...")
-                
-                pages = session.query(Page).filter_by(document_id=doc.id).all()
-                
-                if not pages:
-                    continue
-                
-                full_text = "\n\n".join(p.text or "" for p in pages if p.text)
-                
-                if len(full_text.strip()) < 100:
-                    continue
-                
-                processed_docs.append({
-                    'id': doc.external_id,
-                    'title': doc.title or f"Document {doc.external_id}",
-                    'source': doc.source.name if doc.source else 'Unknown',
-                    'text': full_text,
-                    'url': doc.url,
-                    'page_count': len(pages),
-                    'word_count': len(full_text.split())
-                })
+        processed_docs = []
+        for i, doc in enumerate(iter_documents(limit=limit, source=source_filter, include_pages=False), 1):
+            if i % 500 == 0:
+                print(f"  Loaded {i:,} documents...")
+            processed_docs.append(doc)
         
         print(f"Loaded {len(processed_docs):,} documents with text")
         return processed_docs
@@ -153,13 +139,41 @@ class HybridSearchSystem:
         chunk_size: int = 512,
         encode_batch_size: int = 32,
         chunk_processing_size: int = 512,
+        torch_threads: int = 1,
+        dedup: Optional[bool] = None,
     ):
-        """Build both semantic and BM25 search indexes"""
+        """
+        Build both semantic and BM25 search indexes
+        
+        torch_threads: intra-op threads for encoding; parallel batch builders
+            give each worker process its share of the cores
+        dedup: drop documents with a repeated sha256 and index each distinct
+            chunk text once (default INDEX_DEDUP); repeats are kept in
+            duplicate_chunks, pointing at the shared chunk/vector position
+        """
         print("Building hybrid search indexes...")
         
+        dedup = INDEX_DEDUP if dedup is None else dedup
+        if dedup:
+            documents, skipped = unique_documents(documents)
+            if skipped:
+                print(f"Skipping {len(skipped):,} documents whose file (sha256) is already indexed")
+        
         self.documents = documents
         self.document_chunks = []
         self.chunk_metadata = []
+        self.duplicate_chunks = []
+        self._duplicates_by_chunk = None
+        deduplicator = ChunkDeduplicator() if dedup else None
+        
+        def add_chunk(chunk, metadata):
+            if deduplicator is not None:
+                position, is_new = deduplicator.add(chunk)
+                if not is_new:
+                    self.duplicate_chunks.append({**metadata, 'canonical': position})
+                    return
+            self.document_chunks.append(chunk)
+            self.chunk_metadata.append(metadata)
         
         self.load_embedding_model()
         
@@ -173,8 +187,7 @@ class HybridSearchSystem:
                     page_chunks = self.chunk_text(page_text, chunk_size)
                     
                     for chunk_idx, chunk in enumerate(page_chunks):
-                        self.document_chunks.append(chunk)
-                        self.chunk_metadata.append({
+                        add_chunk(chunk, {
                             'doc_idx': doc_idx,
                             'chunk_idx': chunk_idx,
                             'doc_id': doc['id'],
@@ -187,8 +200,7 @@ class HybridSearchSystem:
                 chunks = self.chunk_text(doc['text'], chunk_size)
                 
                 for chunk_idx, chunk in enumerate(chunks):
-                    self.document_chunks.append(chunk)
-                    self.chunk_metadata.append({
+                    add_chunk(chunk, {
                         'doc_idx': doc_idx,
                         'chunk_idx': chunk_idx,
                         'doc_id': doc['id'],
@@ -199,17 +211,21 @@ class HybridSearchSystem:
                     })
         
         print(f"Created {len(self.document_chunks):,} chunks from {len(documents):,} documents")
+        if self.duplicate_chunks:
+            print(f"   {len(self.duplicate_chunks):,} duplicate chunks share an existing vector")
         
         print("Building BM25 index...")
-        tokenized_chunks = [chunk.lower().split() for chunk in self.document_chunks]
-        self.bm25 = BM25Okapi(tokenized_chunks)
-        del tokenized_chunks
+        builder = BM25IndexBuilder()
+        builder.add_texts(self.document_chunks)
+        self.bm25 = builder.build()
+        del builder
         gc.collect()
         
         self._build_semantic_index_streaming(
             self.document_chunks,
             encode_batch_size=encode_batch_size,
             chunk_processing_size=chunk_processing_size,
+            torch_threads=torch_threads,
         )
         
         print(f"Search indexes built successfully!")
@@ -221,19 +237,22 @@ class HybridSearchSystem:
         if not self.bm25:
             return []
         
-        tokenized_query = query.lower().split()
-        scores = self.bm25.get_scores(tokenized_query)
-        
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        results = [(int(idx), float(scores[idx])) for idx in top_indices if scores[idx] > 0]
-        
-        return results
+        indices, scores = self.bm25.search(tokenize(query), top_k)
+        return [(int(idx), float(score)) for idx, score in zip(indices, scores)]
+    
+    def search_bm25_many(self, queries: List[str], top_k: int = 100) -> List[List[Tuple[int, float]]]:
+        """BM25 for several queries; each distinct term's postings are scored once for the batch"""
+        if not self.bm25:
+            return [[] for _ in queries]
+        batches = self.bm25.search_many([tokenize(query) for query in queries], top_k)
+        return [[(int(idx), float(score)) for idx, score in zip(indices, scores)] for indices, scores in batches]
     
     def _build_semantic_index_streaming(
         self,
         chunk_texts: List[str],
         encode_batch_size: int = 32,
         chunk_processing_size: int = 512,
+        torch_threads: int = 1,
     ) -> None:
         """
         Build FAISS index by encoding and adding embeddings in small batches.
@@ -242,6 +261,7 @@ class HybridSearchSystem:
             chunk_texts: All chunk texts to embed.
             encode_batch_size: Batch size passed to SentenceTransformer.encode (lower = less RAM).
             chunk_processing_size: Number of chunk texts to encode before adding to FAISS.
+            torch_threads: torch intra-op threads used while encoding.
         """
         total_chunks = len(chunk_texts)
         if total_chunks == 0:
@@ -251,6 +271,7 @@ class HybridSearchSystem:
         
         print("Building semantic embeddings (streaming mode)...")
         print(f"   Total chunks: {total_chunks:,}")
+        print(f"   Index type: {self.index_type}")
         print(f"   encode_batch_size (model): {encode_batch_size}")
         print(f"   chunk_processing_size: {chunk_processing_size}")
         
@@ -261,7 +282,11 @@ class HybridSearchSystem:
             pass
         
         dimension = self.embedding_model.get_sentence_embedding_dimension()
-        self.faiss_index = faiss.IndexFlatIP(dimension)
+        self.faiss_index = create_ann_index(dimension, self.index_type, n_vectors=total_chunks)
+        # IVF types buffer a training sample before their first add
+        builder = StreamingIndexBuilder(self.faiss_index)
+        store = get_chunk_embedding_store()
+        store_before = store.stats() if store is not None else None
         
         processed = 0
         start_time = datetime.now()
@@ -270,16 +295,19 @@ class HybridSearchSystem:
             batch_texts = chunk_texts[start:start + chunk_processing_size]
             try:
                 import torch
-                torch.set_num_threads(1)
+                torch.set_num_threads(torch_threads)
                 
-                embeddings = self.embedding_model.encode(
+                # chunks embedded by an earlier build come from the chunk embedding store
+                embeddings = encode_chunks(
+                    self.embedding_model,
+                    self.model_name,
                     batch_texts,
                     batch_size=encode_batch_size,
                     show_progress_bar=False,
                     convert_to_numpy=True,
                     normalize_embeddings=False,
                     device='cpu'
-                ).astype('float32')
+                )
                 
                 if hasattr(torch.cuda, 'empty_cache'):
                     torch.cuda.empty_cache()
@@ -293,7 +321,7 @@ class HybridSearchSystem:
                 block = embeddings[block_start:block_start + add_block]
                 block = np.ascontiguousarray(block, dtype='float32')
                 faiss.normalize_L2(block)
-                self.faiss_index.add(block)
+                builder.add(block)
                 
                 del block
             
@@ -311,20 +339,64 @@ class HybridSearchSystem:
                 time.sleep(0.1)  # Brief pause to let OS reclaim memory
                 gc.collect()
         
-        print(f"Added {self.faiss_index.ntotal:,} embeddings to FAISS index")
+        self.faiss_index = builder.finish()
+        print(f"Added {self.faiss_index.ntotal:,} embeddings to FAISS index ({describe_index(self.faiss_index)['index_type']})")
+        if store is not None:
+            stats = store.stats()
+            reused = stats['hits'] - store_before['hits']
+            encoded = stats['misses'] - store_before['misses']
+            print(f"   Chunk embedding store: {reused:,} reused, {encoded:,} encoded ({stats['path']})")
+    
+    def configure_ann(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Set query-time recall/latency knobs (IVF nprobe, HNSW efSearch) on the loaded index"""
+        if self.faiss_index is not None:
+            set_search_params(self.faiss_index, nprobe=nprobe, ef_search=ef_search)
+    
+    def _convert_legacy_bm25(self, index_dir: Path) -> Optional[BM25Index]:
+        """One-time conversion of a pickled rank_bm25 index to the inverted layout"""
+        print("Converting legacy bm25.pkl to inverted index...")
+        try:
+            with open(index_dir / "bm25.pkl", 'rb') as f:
+                legacy = pickle.load(f)
+        except ImportError:
+            print("rank_bm25 is needed to read bm25.pkl; rebuild the index instead")
+            return None
+        bm25 = BM25Index.from_okapi(legacy)
+        del legacy
+        gc.collect()
+        try:
+            bm25.save(index_dir / "bm25")
+            print(f"Saved converted BM25 index to {index_dir / 'bm25'}")
+        except OSError as e:
+            print(f"Could not save converted BM25 index ({e}); using it in memory")
+        return bm25
     
     def search_semantic(self, query: str, top_k: int = 100) -> List[Tuple[int, float]]:
         """Search using semantic embeddings"""
         if not self.faiss_index or not self.embedding_model:
             return []
         
-        query_embedding = self.embedding_model.encode([query], convert_to_numpy=True)
-        faiss.normalize_L2(query_embedding)
-        
-        scores, indices = self.faiss_index.search(query_embedding.astype('float32'), top_k)
-        
-        results = [(int(indices[0][i]), float(scores[0][i])) for i in range(len(indices[0]))]
-        return results
+        return self.search_semantic_many([query], top_k)[0]
+    
+    def search_semantic_many(self, queries: List[str], top_k: int = 100,
+                             query_embeddings: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Semantic search for several queries: one encode call and one FAISS search
+        over the (n_queries, dim) matrix. Pass query_embeddings (from encode_queries)
+        to reuse embeddings across indexes.
+        """
+        if not self.faiss_index or (query_embeddings is None and not self.embedding_model):
+            return [[] for _ in queries]
+        if query_embeddings is None:
+            query_embeddings = encode_queries(self.embedding_model, self.model_name, queries)
+        
+        scores, indices = self.faiss_index.search(query_embeddings, top_k)
+        
+        # IVF/HNSW pad with -1 when fewer than top_k neighbours were reached
+        return [
+            [(int(idx), float(score)) for idx, score in zip(row_indices, row_scores) if idx >= 0]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
     
     def hybrid_search(self, query: str, top_k: int = 20, 
                      semantic_weight: float = None, bm25_weight: float = None,
@@ -353,6 +425,43 @@ class HybridSearchSystem:
         bm25_results = self.search_bm25(query, top_k * 5)  # Get more candidates
         semantic_results = self.search_semantic(query, top_k * 5)
         
+        results = self._fuse_results(bm25_results, semantic_results, top_k, semantic_weight, bm25_weight, diversity_mode)
+        
+        unique_docs = len(set(r['doc_id'] for r in results))
+        avg_chunks_per_doc = len(results) / unique_docs if unique_docs > 0 else 0
+        
+        print(f"Found {len(results)} chunks from {unique_docs} unique documents (avg: {avg_chunks_per_doc:.1f} chunks/doc)")
+        return results
+    
+    def hybrid_search_many(self, queries: List[str], top_k: int = 20,
+                           semantic_weight: float = None, bm25_weight: float = None,
+                           diversity_mode: str = 'balanced',
+                           query_embeddings: Optional[np.ndarray] = None) -> List[List[Dict]]:
+        """
+        hybrid_search for a list of queries, results in input order.
+        
+        Queries are embedded in one batch and searched with one FAISS call;
+        BM25 postings are scored once per distinct term across the batch.
+        """
+        if semantic_weight is None:
+            semantic_weight = self.semantic_weight
+        if bm25_weight is None:
+            bm25_weight = self.bm25_weight
+        
+        print(f"Hybrid search: {len(queries)} queries (semantic: {semantic_weight}, BM25: {bm25_weight}, diversity: {diversity_mode})")
+        
+        bm25_all = self.search_bm25_many(queries, top_k * 5)
+        semantic_all = self.search_semantic_many(queries, top_k * 5, query_embeddings=query_embeddings)
+        
+        return [
+            self._fuse_results(bm25_results, semantic_results, top_k, semantic_weight, bm25_weight, diversity_mode)
+            for bm25_results, semantic_results in zip(bm25_all, semantic_all)
+        ]
+    
+    def _fuse_results(self, bm25_results: List[Tuple[int, float]], semantic_results: List[Tuple[int, float]],
+                      top_k: int, semantic_weight: float, bm25_weight: float,
+                      diversity_mode: str) -> List[Dict]:
+        """Min-max normalize both result lists, combine with the weights and apply the diversity cap"""
         def normalize_scores(results):
             if not results:
                 return {}
@@ -374,7 +483,8 @@ class HybridSearchSystem:
         for idx, score in semantic_normalized.items():
             combined_scores[idx] += semantic_weight * score
         
-        sorted_results = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+        # Consumed lazily: the diversity cap decides how many candidates are needed
+        sorted_results = iter_descending(combined_scores.items(), key=lambda x: x[1])
         
         diversity_limits = {
             'strict': 1,      # 1 chunk per document
@@ -411,13 +521,10 @@ class HybridSearchSystem:
                 'bm25_score': bm25_normalized.get(chunk_idx, 0),
                 'semantic_score': semantic_normalized.get(chunk_idx, 0),
                 'chunk_idx': metadata['chunk_idx'],
-                'page_no': metadata.get('page_no')  # Include page number for citations
+                'page_no': metadata.get('page_no'),  # Include page number for citations
+                'also_in': self.duplicate_doc_ids(chunk_idx)
             })
         
-        unique_docs = len(set(r['doc_id'] for r in results))
-        avg_chunks_per_doc = len(results) / unique_docs if unique_docs > 0 else 0
-        
-        print(f"Found {len(results)} chunks from {unique_docs} unique documents (avg: {avg_chunks_per_doc:.1f} chunks/doc)")
         return results
     
     def _convert_indices_to_results(self, raw_results: List[Tuple[int, float]]) -> List[Dict]:
@@ -443,11 +550,24 @@ class HybridSearchSystem:
                 'bm25_score': 0,  # Not available in this context
                 'semantic_score': 0,  # Not available in this context
                 'chunk_idx': metadata['chunk_idx'],
-                'page_no': metadata.get('page_no')  # Include page number
+                'page_no': metadata.get('page_no'),  # Include page number
+                'also_in': self.duplicate_doc_ids(chunk_idx)  # Other documents with this exact passage
             })
         
         return results
     
+    def duplicate_doc_ids(self, chunk_position: int) -> List[str]:
+        """doc_ids of other documents containing the chunk at chunk_position (deduplicated at build time)"""
+        if not self.duplicate_chunks:
+            return []
+        if self._duplicates_by_chunk is None:
+            by_chunk = defaultdict(list)
+            for duplicate in self.duplicate_chunks:
+                by_chunk[duplicate['canonical']].append(duplicate['doc_id'])
+            self._duplicates_by_chunk = by_chunk
+        own_doc_id = self.chunk_metadata[chunk_position]['doc_id']
+        return sorted({doc_id for doc_id in self._duplicates_by_chunk.get(chunk_position, ()) if doc_id != own_doc_id})
+    
     def save_index(self, index_path: str = None):
         """Save the search index to disk"""
         if not index_path:
@@ -471,8 +591,7 @@ class HybridSearchSystem:
         try:
             if self.bm25:
                 print("  ├─ Saving BM25 keyword index...")
-                with open(index_dir / "bm25.pkl", 'wb') as f:
-                    pickle.dump(self.bm25, f)
+                self.bm25.save(index_dir / "bm25")
                 print("BM25 index saved")
         except Exception as e:
             print(f"Error saving BM25 index: {e}")
@@ -493,8 +612,10 @@ class HybridSearchSystem:
                 'model_name': self.model_name,
                 'documents': self.documents,
                 'chunk_metadata': self.chunk_metadata,
+                'duplicate_chunks': self.duplicate_chunks,
                 'semantic_weight': self.semantic_weight,
                 'bm25_weight': self.bm25_weight,
+                'semantic_index': describe_index(self.faiss_index) if self.faiss_index else None,
                 'created_at': datetime.now().isoformat(),
                 'total_documents': len(self.documents),
                 'total_chunks': len(self.document_chunks)
@@ -528,6 +649,8 @@ class HybridSearchSystem:
         self.model_name = metadata['model_name']
         self.documents = metadata['documents']
         self.chunk_metadata = metadata['chunk_metadata']
+        self.duplicate_chunks = metadata.get('duplicate_chunks', [])
+        self._duplicates_by_chunk = None
         self.semantic_weight = metadata['semantic_weight']
         self.bm25_weight = metadata['bm25_weight']
         
@@ -549,10 +672,12 @@ class HybridSearchSystem:
             except Exception as e:
                 print(f"MMAP failed ({e}), falling back to full load")
                 self.faiss_index = faiss.read_index(str(index_dir / "semantic.faiss"))
+            set_search_params(self.faiss_index)
         
-        if (index_dir / "bm25.pkl").exists():
-            with open(index_dir / "bm25.pkl", 'rb') as f:
-                self.bm25 = pickle.load(f)
+        if BM25Index.exists(index_dir / "bm25"):
+            self.bm25 = BM25Index.load(index_dir / "bm25")
+        elif (index_dir / "bm25.pkl").exists():
+            self.bm25 = self._convert_legacy_bm25(index_dir)
         
         print(f"Index loaded successfully")
         print(f"   - Documents: {len(self.documents):,}")
@@ -571,6 +696,10 @@ def main():
     parser.add_argument("--top-k", type=int, default=10, help="Number of results")
     parser.add_argument("--semantic-weight", type=float, default=0.6, help="Semantic search weight")
     parser.add_argument("--bm25-weight", type=float, default=0.4, help="BM25 search weight")
+    parser.add_argument("--index-type", choices=ANN_INDEX_TYPES, default=None,
+                        help="FAISS index type for --build (default SEARCH_ANN_INDEX)")
+    parser.add_argument("--nprobe", type=int, default=None, help="IVF lists probed per query")
+    parser.add_argument("--ef-search", type=int, default=None, help="HNSW candidate list size per query")
     
     args = parser.parse_args()
     
@@ -578,7 +707,7 @@ def main():
     print("Hybrid Search System (Semantic + BM25)")
     print("="*60)
     
-    search_system = HybridSearchSystem()
+    search_system = HybridSearchSystem(index_type=args.index_type)
     
     if args.load:
         search_system.load_index(args.load)
@@ -595,6 +724,7 @@ def main():
         if not search_system.faiss_index or not search_system.bm25:
             print("No search index loaded. Use --build or --load first.")
             return
+        search_system.configure_ann(nprobe=args.nprobe, ef_search=args.ef_search)
         
         results = search_system.hybrid_search(
             args.search,
@@ -8,8 +8,10 @@ Replaces the old FAISS/Pickle system for 100x speed and scalability.
 import sys
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from collections import defaultdict
 import numpy as np
 
@@ -18,6 +20,12 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+from foia_ai.config import DOC_METADATA_PREWARM, SEARCH_LEG_TIMEOUT, SEARCH_LEG_WORKERS, SEARCH_PARALLEL_LEGS
+from foia_ai.retrieval.embedding_cache import get_query_embedding_cache
+from foia_ai.retrieval.latency import LatencyTracker
+from foia_ai.retrieval.result_cache import path_version
+from foia_ai.storage.metadata import DocumentMetadataCache
+
 try:
     import lancedb
     import tantivy
@@ -37,6 +45,20 @@ def setup_tantivy_schema():
     
     return schema_builder.build()
 
+def normalize_raw_scores(score_list):
+    """Normalize a list of raw scores to [0, 1] range using min-max"""
+    if not score_list:
+        return {}
+    scores = [s for s in score_list if s is not None]
+    if not scores:
+        return {}
+    min_s = min(scores)
+    max_s = max(scores)
+    if max_s == min_s:
+        return {i: 1.0 for i in range(len(score_list))}
+    return {i: (s - min_s) / (max_s - min_s) 
+           for i, s in enumerate(score_list)}
+
 class ProductionSearchSystem:
     """
     High-performance hybrid search system using LanceDB and Tantivy.
@@ -55,7 +77,16 @@ class ProductionSearchSystem:
         self.tantivy_index = None
         self.tantivy_searcher = None
         
+        self.parallel_legs = SEARCH_PARALLEL_LEGS
+        self.leg_timeout = SEARCH_LEG_TIMEOUT
+        self.latency = LatencyTracker()
+        self._leg_executor = ThreadPoolExecutor(max_workers=max(2, SEARCH_LEG_WORKERS), thread_name_prefix="search-leg")
+        self._last_search = threading.local()
+        self.metadata = DocumentMetadataCache()
+        
         self._initialize_stores()
+        if DOC_METADATA_PREWARM and (self.table or self.tantivy_searcher):
+            threading.Thread(target=self._prewarm_metadata, name="metadata-prewarm", daemon=True).start()
         
     def _initialize_stores(self):
         """Initialize connections to LanceDB and Tantivy"""
@@ -89,165 +120,238 @@ class ProductionSearchSystem:
         except Exception as e:
             print(f"Error initializing search stores: {e}")
 
+    def index_version(self) -> Tuple:
+        """Changes whenever the LanceDB table or the Tantivy index is rewritten or replaced"""
+        return path_version([
+            self.lancedb_path,
+            self.lancedb_path / "chunks.lance" / "_versions",
+            self.tantivy_path,
+            self.tantivy_path / "meta.json",
+        ])
+
     def _load_model(self):
         """Lazy load the embedding model"""
         if self.embedding_model is None:
             print(f"Loading embedding model: {self.model_name}")
             self.embedding_model = SentenceTransformer(self.model_name)
     
-    def _get_document_metadata(self, doc_id: str) -> Dict[str, str]:
-        """Look up document metadata from database by doc_id (external_id)"""
+    def _prewarm_metadata(self):
         try:
-            from foia_ai.storage.db import get_session
-            from foia_ai.storage.models import Document
-            
-            with get_session() as session:
-                doc = session.query(Document).filter_by(external_id=doc_id).first()
-                if doc:
-                    source_name = doc.source.name if doc.source else 'Unknown'
-                    url = f"/pdf/{doc_id}"
-                    return {
-                        'title': doc.title or f"{doc_id}.pdf",
-                        'source': source_name,
-                        'url': url
-                    }
+            count = self.metadata.prewarm()
+            print(f"Document metadata prewarmed ({count} entries)")
         except Exception as e:
-            print(f"Error looking up document metadata for {doc_id}: {e}")
+            print(f"Error prewarming document metadata: {e}")
+
+    def search_many(self, queries: List[str], top_k: int = 20,
+                    semantic_weight: float = 0.6, diversity: str = "balanced",
+                    search_mode: str = "hybrid", encode_batch_size: int = 64) -> List[List[Dict]]:
+        """
+        Run search() for a list of queries, results in input order.
         
-        return {
-            'title': f"{doc_id}.pdf",
-            'source': 'Unknown',
-            'url': f"/pdf/{doc_id}"
-        }
+        All query embeddings come from one batched encode call, which is where
+        single-query search spends most of its time; the LanceDB and Tantivy
+        lookups then run per query with the precomputed vectors.
+        """
+        query_vectors = [None] * len(queries)
+        if search_mode in ["semantic", "hybrid"] and self.table and queries:
+            self._load_model()
+            query_vectors = get_query_embedding_cache().encode(
+                self.embedding_model, self.model_name, queries, batch_size=encode_batch_size
+            )
+        
+        return [
+            self.search(query, top_k=top_k, semantic_weight=semantic_weight, diversity=diversity,
+                        search_mode=search_mode, query_vector=query_vector)
+            for query, query_vector in zip(queries, query_vectors)
+        ]
 
-    def search(self, query: str, top_k: int = 20, 
-               semantic_weight: float = 0.6, diversity: str = "balanced",
-               search_mode: str = "hybrid") -> List[Dict]:
+    def _run_legs(self, legs: Dict[str, Callable[[], List[Dict]]]) -> Dict[str, List[Dict]]:
         """
-        Perform high-speed search using LanceDB + Tantivy
+        Run the search legs, concurrently when there are several and
+        SEARCH_PARALLEL_LEGS is on, so hybrid latency tracks the slower leg
+        instead of the sum. A leg still running SEARCH_LEG_TIMEOUT seconds
+        after the start contributes no hits and the search is marked degraded;
+        it is cancelled if it never left the queue, so a backlog in the
+        SEARCH_LEG_WORKERS pool does not keep growing.
         """
-        results = []
-        semantic_hits = []
-        bm25_results = []
+        def timed(name, leg):
+            with self.latency.measure(name):
+                return leg()
         
-        if search_mode in ["semantic", "hybrid"] and self.table:
+        if not self.parallel_legs or len(legs) < 2:
+            return {name: timed(name, leg) for name, leg in legs.items()}
+        
+        futures = {name: self._leg_executor.submit(timed, name, leg) for name, leg in legs.items()}
+        deadline = time.monotonic() + self.leg_timeout if self.leg_timeout > 0 else None
+        outputs = {}
+        for name, future in futures.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                outputs[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                if future.cancel():
+                    print(f"{name} search still queued after {self.leg_timeout:g}s "
+                          f"(SEARCH_LEG_WORKERS={SEARCH_LEG_WORKERS} busy), continuing without it")
+                else:
+                    print(f"{name} search exceeded {self.leg_timeout:g}s, continuing without it")
+                    self.latency.record_timeout(name)
+                self._last_search.degraded = True
+                outputs[name] = []
+        return outputs
+
+    @property
+    def last_search_degraded(self) -> bool:
+        """True if this thread's last search dropped a leg that timed out"""
+        return getattr(self._last_search, 'degraded', False)
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95 per leg ('semantic', 'bm25') and for whole searches ('total')"""
+        return self.latency.stats()
+
+    def metadata_stats(self) -> Dict[str, int]:
+        return self.metadata.stats()
+
+    def _semantic_leg(self, query: str, top_k: int, query_vector: Optional[Any]) -> List[Dict]:
+        """LanceDB vector hits with raw and min-max normalized similarity"""
+        if query_vector is None:
             self._load_model()
-            query_vec = self.embedding_model.encode(query).tolist()
+            query_vector = get_query_embedding_cache().encode_one(self.embedding_model, self.model_name, query)
+        query_vec = np.asarray(query_vector).tolist()
+        
+        semantic_hits = self.table.search(query_vec) \
+            .metric("cosine") \
+            .limit(max(top_k * 10, 100)) \
+            .to_list()
+        
+        if semantic_hits:
+            raw_scores = []
+            for hit in semantic_hits:
+                distance = hit.get('_distance', 0)
+                similarity = max(0.0, 1.0 - (distance / 2.0))
+                raw_scores.append(similarity)
+                hit['semantic_score_raw'] = similarity
+                hit['chunk_text'] = hit.get('text', hit.get('chunk_text', ''))  # Standardize key
             
-            semantic_hits = self.table.search(query_vec) \
-                .metric("cosine") \
-                .limit(max(top_k * 10, 100)) \
-                .to_list()
+            metadata = self.metadata.resolve(
+                hit['doc_id'] for hit in semantic_hits
+                if hit.get('doc_id') and (not hit.get('url') or not hit.get('source'))
+            )
+            for hit in semantic_hits:
+                doc_id = hit.get('doc_id', '')
+                if doc_id and (not hit.get('url') or not hit.get('source')):
+                    doc_metadata = metadata[doc_id]
+                    if not hit.get('url'):
+                        hit['url'] = doc_metadata['url']
+                    if not hit.get('source'):
+                        hit['source'] = doc_metadata['source']
+                    if not hit.get('title'):
+                        hit['title'] = doc_metadata['title']
+                elif doc_id:
+                    hit['url'] = f"/pdf/{doc_id}"
             
+            min_score = min(raw_scores)
+            max_score = max(raw_scores)
+            score_range = max_score - min_score if max_score > min_score else 1.0
             
-            if semantic_hits:
-                raw_scores = []
-                for hit in semantic_hits:
-                    distance = hit.get('_distance', 0)
-                    similarity = max(0.0, 1.0 - (distance / 2.0))
-                    raw_scores.append(similarity)
-                    hit['semantic_score_raw'] = similarity
-                    hit['chunk_text'] = hit.get('text', hit.get('chunk_text', ''))  # Standardize key
-                    
-                    doc_id = hit.get('doc_id', '')
-                    if doc_id and (not hit.get('url') or not hit.get('source')):
-                        doc_metadata = self._get_document_metadata(doc_id)
-                        if not hit.get('url'):
-                            hit['url'] = doc_metadata['url']
-                        if not hit.get('source'):
-                            hit['source'] = doc_metadata['source']
-                        if not hit.get('title'):
-                            hit['title'] = doc_metadata['title']
-                    elif doc_id:
-                        hit['url'] = f"/pdf/{doc_id}"
-                
-                min_score = min(raw_scores)
-                max_score = max(raw_scores)
-                score_range = max_score - min_score if max_score > min_score else 1.0
+            for i, hit in enumerate(semantic_hits):
+                raw = raw_scores[i]
+                normalized = (raw - min_score) / score_range if score_range > 0 else 1.0
+                hit['semantic_score'] = normalized
+                hit['score'] = normalized  # Default if only semantic
+        
+        return semantic_hits
+
+    def _bm25_leg(self, query: str, top_k: int) -> List[Dict]:
+        """Tantivy keyword hits with raw BM25 scores"""
+        bm25_results = []
+        try:
+            query_parser = self.tantivy_index.parse_query(query, ["chunk_text", "title"])
+            search_result = self.tantivy_searcher.search(query_parser, max(top_k * 10, 100))
+            
+            def get_field(doc, field_name, default=''):
+                try:
+                    values = doc[field_name]
+                    return values[0] if values else default
+                except (KeyError, IndexError, TypeError):
+                    return default
+            
+            hits = [(score, self.tantivy_searcher.doc(doc_address)) for score, doc_address in search_result.hits]
+            metadata = self.metadata.resolve(get_field(doc, 'doc_id') for _, doc in hits)
+            
+            for score, doc in hits:
+                doc_id = get_field(doc, 'doc_id')
+                doc_metadata = metadata[doc_id]
                 
-                for i, hit in enumerate(semantic_hits):
-                    raw = raw_scores[i]
-                    normalized = (raw - min_score) / score_range if score_range > 0 else 1.0
-                    hit['semantic_score'] = normalized
-                    hit['score'] = normalized  # Default if only semantic
+                res = {
+                    'chunk_text': get_field(doc, 'chunk_text'),
+                    'title': doc_metadata['title'],  # Use database title if available
+                    'doc_id': doc_id,
+                    'bm25_score': score,
+                    'score': score, # Default if only bm25
+                    'url': doc_metadata['url'],  # Construct URL consistently
+                    'source': doc_metadata['source']  # Look up source from database
+                }
+                bm25_results.append(res)
+            
+            print(f"BM25 found {len(bm25_results)} results")
                 
-                if search_mode == "semantic":
-                    results = semantic_hits
-            else:
-                results = []
+        except Exception as e:
+            print(f"Tantivy search error: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        return bm25_results
+
+    def search(self, query: str, top_k: int = 20, 
+               semantic_weight: float = 0.6, diversity: str = "balanced",
+               search_mode: str = "hybrid", query_vector: Optional[Any] = None) -> List[Dict]:
+        """
+        Perform high-speed search using LanceDB + Tantivy
+        
+        query_vector: precomputed embedding of query (see search_many)
+        """
+        self._last_search.degraded = False
+        with self.latency.measure('total'):
+            return self._search(query, top_k, semantic_weight, diversity, search_mode, query_vector)
 
+    def _search(self, query: str, top_k: int, semantic_weight: float, diversity: str,
+                search_mode: str, query_vector: Optional[Any]) -> List[Dict]:
+        results = []
+        
+        legs = {}
+        if search_mode in ["semantic", "hybrid"] and self.table:
+            legs['semantic'] = lambda: self._semantic_leg(query, top_k, query_vector)
         if search_mode in ["bm25", "hybrid"] and self.tantivy_searcher:
-            try:
-                query_parser = self.tantivy_index.parse_query(query, ["chunk_text", "title"])
-                search_result = self.tantivy_searcher.search(query_parser, max(top_k * 10, 100))
-                
-                for score, doc_address in search_result.hits:
-                    doc = self.tantivy_searcher.doc(doc_address)
-                    
-                    def get_field(doc, field_name, default=''):
-                        try:
-                            values = doc[field_name]
-                            return values[0] if values else default
-                        except (KeyError, IndexError, TypeError):
-                            return default
-                    
-                    doc_id = get_field(doc, 'doc_id')
-                    doc_metadata = self._get_document_metadata(doc_id)
-                    
-                    res = {
-                        'chunk_text': get_field(doc, 'chunk_text'),
-                        'title': doc_metadata['title'],  # Use database title if available
-                        'doc_id': doc_id,
-                        'bm25_score': score,
-                        'score': score, # Default if only bm25
-                        'url': doc_metadata['url'],  # Construct URL consistently
-                        'source': doc_metadata['source']  # Look up source from database
-                    }
-                    bm25_results.append(res)
+            legs['bm25'] = lambda: self._bm25_leg(query, top_k)
+        leg_results = self._run_legs(legs)
+        semantic_hits = leg_results.get('semantic', [])
+        bm25_results = leg_results.get('bm25', [])
+        
+        if search_mode == "semantic":
+            results = semantic_hits
+        
+        if search_mode == "bm25":
+            if bm25_results:
+                raw_bm25_scores = [hit.get('bm25_score', 0) for hit in bm25_results]
+                min_score = min(raw_bm25_scores)
+                max_score = max(raw_bm25_scores)
+                score_range = max_score - min_score if max_score > min_score else 1.0
                 
-                print(f"BM25 found {len(bm25_results)} results")
-                    
-                if search_mode == "bm25":
-                    if bm25_results:
-                        raw_bm25_scores = [hit.get('bm25_score', 0) for hit in bm25_results]
-                        min_score = min(raw_bm25_scores)
-                        max_score = max(raw_bm25_scores)
-                        score_range = max_score - min_score if max_score > min_score else 1.0
-                        
-                        for i, hit in enumerate(bm25_results):
-                            raw = raw_bm25_scores[i]
-                            normalized = (raw - min_score) / score_range if score_range > 0 else 1.0
-                            normalized = max(0.0, min(1.0, normalized))
-                            hit['bm25_score_raw'] = raw
-                            hit['bm25_score'] = normalized
-                            hit['score'] = normalized
-                            hit['semantic_score'] = 0
-                    results = bm25_results
-                    
-            except Exception as e:
-                print(f"Tantivy search error: {e}")
-                import traceback
-                traceback.print_exc()
+                for i, hit in enumerate(bm25_results):
+                    raw = raw_bm25_scores[i]
+                    normalized = (raw - min_score) / score_range if score_range > 0 else 1.0
+                    normalized = max(0.0, min(1.0, normalized))
+                    hit['bm25_score_raw'] = raw
+                    hit['bm25_score'] = normalized
+                    hit['score'] = normalized
+                    hit['semantic_score'] = 0
+            results = bm25_results
 
         if search_mode == "hybrid":
             print(f"Hybrid search: semantic={len(semantic_hits)} results, bm25={len(bm25_results)} results")
             bm25_weight = 1.0 - semantic_weight
             
             if semantic_hits and bm25_results:
-                def normalize_raw_scores(score_list):
-                    """Normalize a list of raw scores to [0, 1] range using min-max"""
-                    if not score_list:
-                        return {}
-                    scores = [s for s in score_list if s is not None]
-                    if not scores:
-                        return {}
-                    min_s = min(scores)
-                    max_s = max(scores)
-                    if max_s == min_s:
-                        return {i: 1.0 for i in range(len(score_list))}
-                    return {i: (s - min_s) / (max_s - min_s) 
-                           for i, s in enumerate(score_list)}
-                
                 raw_semantic_scores = [hit.get('semantic_score_raw', hit.get('semantic_score', 0)) 
                                       for hit in semantic_hits]
                 raw_bm25_scores = [hit.get('bm25_score', 0) for hit in bm25_results]
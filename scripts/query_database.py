@@ -11,8 +11,13 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
 from foia_ai.storage.db import get_session
-from foia_ai.storage.models import Source, Document, Page
+from foia_ai.storage.models import Source, Document, DocumentStats, Page
+from foia_ai.storage.fulltext import search_pages
+from foia_ai.storage.stats import corpus_totals, ensure_document_stats_table
 
 
 def show_database_overview():
@@ -20,25 +25,22 @@ def show_database_overview():
     print("FOIA AI Database Overview")
     print("=" * 50)
     
+    totals = corpus_totals()
     with get_session() as session:
-        sources = session.query(Source).all()
-        documents = session.query(Document).all()
-        pages = session.query(Page).all()
-        
-        print(f"Sources: {len(sources)}")
-        for source in sources:
-            doc_count = session.query(Document).filter_by(source_id=source.id).count()
-            print(f"  • {source.name}: {doc_count} documents")
+        source_counts = (
+            session.query(Source.name, func.count(Document.id))
+            .outerjoin(Document, Document.source_id == Source.id)
+            .group_by(Source.id, Source.name)
+            .all()
+        )
         
-        print(f"\nDocuments: {len(documents)}")
-        print(f"Pages with text: {len(pages)}")
+        print(f"Sources: {len(source_counts)}")
+        for name, doc_count in source_counts:
+            print(f"  • {name}: {doc_count} documents")
         
-        total_words = 0
-        for page in pages:
-            if page.text:
-                total_words += len(page.text.split())
-        
-        print(f"Total words: {total_words:,}")
+        print(f"\nDocuments: {totals['documents']}")
+        print(f"Pages with text: {totals['pages']}")
+        print(f"Total words: {totals['words']:,}")
 
 
 def search_text(query: str, limit: int = 10):
@@ -46,33 +48,20 @@ def search_text(query: str, limit: int = 10):
     print(f"\nSearching for: '{query}'")
     print("-" * 40)
     
-    with get_session() as session:
-        pages = session.query(Page).filter(
-            Page.text.ilike(f'%{query}%')
-        ).limit(limit).all()
-        
-        if not pages:
-            print("No results found.")
-            return
+    hits = search_pages(query, limit=limit, highlight=("**", "**"))
+    
+    if not hits:
+        print("No results found.")
+        return
+    
+    for hit in hits:
+        context = " ".join(hit.snippet.split())
         
-        for page in pages:
-            doc = page.document
-            source = doc.source
-            
-            text = page.text or ""
-            query_lower = query.lower()
-            text_lower = text.lower()
-            
-            if query_lower in text_lower:
-                start = text_lower.find(query_lower)
-                context_start = max(0, start - 100)
-                context_end = min(len(text), start + len(query) + 100)
-                context = text[context_start:context_end]
-                
-                print(f"{doc.external_id} (Page {page.page_no})")
-                print(f"   Source: {source.name}")
-                print(f"   Context: ...{context}...")
-                print()
+        print(f"{hit.external_id} (Page {hit.page_no})")
+        print(f"   Source: {hit.source_name}")
+        print(f"   Score: {hit.score:.2f}")
+        print(f"   Context: {context}")
+        print()
 
 
 def show_document_details(external_id: str):
@@ -113,15 +102,17 @@ def list_documents():
     print("-" * 30)
     
     with get_session() as session:
-        documents = session.query(Document).all()
+        rows = (
+            session.query(Document, DocumentStats)
+            .outerjoin(DocumentStats, DocumentStats.document_id == Document.id)
+            .options(joinedload(Document.source))
+            .order_by(Document.id)
+            .all()
+        )
         
-        for doc in documents:
-            page_count = session.query(Page).filter_by(document_id=doc.id).count()
-            total_words = 0
-            
-            if page_count > 0:
-                pages = session.query(Page).filter_by(document_id=doc.id).all()
-                total_words = sum(len(p.text.split()) if p.text else 0 for p in pages)
+        for doc, stats in rows:
+            page_count = stats.page_count if stats else 0
+            total_words = stats.word_count if stats else 0
             
             print(f"{doc.external_id}")
             print(f"   Title: {doc.title}")
@@ -170,6 +161,7 @@ def interactive_mode():
 
 
 def main():
+    ensure_document_stats_table()
     if len(sys.argv) > 1:
         command = sys.argv[1]
         if command == "overview":
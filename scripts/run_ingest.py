@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Run (or resume) staged ingestion for a source.
+
+Documents already registered in the database are advanced through
+fetch → rasterize → OCR → clean → store. Interrupted runs can simply be
+started again; each document resumes at its last completed stage.
+
+Usage:
+  python scripts/run_ingest.py --source dia-reading-room
+  python scripts/run_ingest.py --source dia-reading-room --ocr-workers 8 --extract-workers 3
+  python scripts/run_ingest.py --source dia-reading-room --job-id 12   # keep reporting into job 12
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from foia_ai.logging_setup import setup_logging
+from foia_ai.ingest.orchestrator import IngestionOrchestrator
+from foia_ai.storage.db import get_session
+from foia_ai.storage.models import IngestionJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Staged, resumable document ingestion")
+    parser.add_argument("--source", required=True, help="Source name (sources.name)")
+    parser.add_argument("--document-id", type=int, action="append", help="Only these document ids (repeatable)")
+    parser.add_argument("--job-id", type=int, help="Existing ingestion job to resume reporting into")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Download threads (default: 4)")
+    parser.add_argument("--extract-workers", type=int, default=2,
+                        help="Documents rasterized/OCR'd concurrently (default: 2)")
+    parser.add_argument("--store-workers", type=int, default=1, help="Clean/store threads (default: 1)")
+    parser.add_argument("--ocr-workers", type=int, default=None,
+                        help="OCR processes shared by all documents (default: OCR_WORKERS; 1 = in-process)")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="Skip documents that already failed this many times (default: 3)")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    orchestrator = IngestionOrchestrator(
+        args.source,
+        fetch_workers=args.fetch_workers,
+        extract_workers=args.extract_workers,
+        store_workers=args.store_workers,
+        ocr_workers=args.ocr_workers,
+        max_attempts=args.max_attempts,
+    )
+    job_id = orchestrator.run(args.document_id, job_id=args.job_id)
+
+    with get_session() as session:
+        job = session.get(IngestionJob, job_id)
+        print(f"\nJob {job.id}: {job.status}")
+        print(json.dumps(json.loads(job.stats or "{}"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
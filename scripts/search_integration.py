@@ -12,6 +12,9 @@ SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+from foia_ai.retrieval.embedding_cache import get_query_embedding_cache
+from foia_ai.retrieval.result_cache import get_search_result_cache, search_cache_key
+
 sys.path.insert(0, str(ROOT / "scripts"))
 PRODUCTION_SEARCH = False
 PRODUCTION_SEARCH_IMPORT_ERROR = None
@@ -141,27 +144,55 @@ class SearchManager:
         if not self.index_loaded or not self.search_system:
             return []
         
+        if not PRODUCTION_SEARCH:
+            search_mode = "hybrid"  # Legacy doesn't support mode switching
+        
+        def run_search():
+            return self.search_system.search(
+                query=query,
+                top_k=top_k,
+                semantic_weight=semantic_weight,
+                diversity=diversity,
+                search_mode=search_mode
+            )
+        
         try:
-            if PRODUCTION_SEARCH:
-                return self.search_system.search(
-                    query=query,
-                    top_k=top_k,
-                    semantic_weight=semantic_weight,
-                    diversity=diversity,
-                    search_mode=search_mode
-                )
-            else:
-                return self.search_system.search(
-                    query=query,
-                    top_k=top_k,
-                    search_mode="hybrid",  # Legacy doesn't support mode switching
-                    semantic_weight=semantic_weight,
-                    diversity=diversity
-                )
+            key = search_cache_key(query, search_mode, top_k, semantic_weight, diversity)
+            return get_search_result_cache().get_or_search(
+                key, self.index_version(), run_search,
+                cacheable=lambda: not getattr(self.search_system, 'last_search_degraded', False),
+            )
         except Exception as e:
             print(f"Search error: {e}")
             return []
     
+    def index_version(self) -> tuple:
+        """Identity of the loaded indexes; cached results from another version are discarded"""
+        return (type(self.search_system).__name__, self.search_system.index_version())
+    
+    @property
+    def embedding_cache_hits(self) -> int:
+        """Query embeddings served from the shared cache (memory or disk tier)"""
+        stats = get_query_embedding_cache().stats()
+        return stats['hits'] + stats['disk_hits']
+    
+    @property
+    def embedding_cache_misses(self) -> int:
+        """Query embeddings that had to be computed by the model"""
+        return get_query_embedding_cache().stats()['misses']
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Counters of the caches in front of the search backends, plus per-leg latency where tracked"""
+        stats = {
+            'search_results': get_search_result_cache().stats(),
+            'query_embeddings': get_query_embedding_cache().stats(),
+        }
+        if hasattr(self.search_system, 'latency_stats'):
+            stats['latency'] = self.search_system.latency_stats()
+        if hasattr(self.search_system, 'metadata_stats'):
+            stats['document_metadata'] = self.search_system.metadata_stats()
+        return stats
+    
     def get_search_suggestions(self, query: str) -> List[str]:
         """Get search suggestions based on query"""
         suggestions = []
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Bring the HybridRetriever index up to date without re-embedding the whole corpus."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from foia_ai.retrieval.hybrid_search import HybridRetriever
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally update the hybrid retrieval index")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Index directory parent (default data/retrieval_cache)")
+    parser.add_argument("--detect-changes", action="store_true",
+                        help="Re-hash indexed pages to pick up edits and deletions (text scan, no re-embedding)")
+    parser.add_argument("--merge", action="store_true", help="Merge all delta segments into the base now")
+    parser.add_argument("--no-merge", action="store_true", help="Never merge automatically")
+    parser.add_argument("--rebuild", action="store_true", help="Full rebuild from the database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    start = time.time()
+    retriever = HybridRetriever(cache_dir=args.cache_dir)
+    if args.rebuild:
+        retriever.build_index(force_rebuild=True)
+    else:
+        counts = retriever.update_index(
+            detect_changes=args.detect_changes,
+            merge=not args.no_merge and not args.merge,
+            background_merge=False,
+        )
+        print(f"Added {counts['added']:,}, changed {counts['changed']:,}, deleted {counts['deleted']:,} pages")
+        if args.merge:
+            retriever.merge_segments()
+
+    index = retriever.index
+    if index is not None:
+        print(f"Index: {len(retriever.pages):,} live pages, {len(index.deltas)} delta segments "
+              f"({index.delta_rows:,} rows) in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,8 +36,10 @@ from foia_ai.synthesis.wiki_service import (
 )
 from foia_ai.synthesis.citation_validator import validate_file
 from foia_ai.storage.db import get_session
-from foia_ai.storage.models import Document, Page, Source
-from sqlalchemy import or_
+from foia_ai.storage.models import Document, DocumentStats, Page, Source
+from foia_ai.storage.fulltext import document_match_clause, fulltext_index_available
+from foia_ai.storage.stats import corpus_totals, ensure_document_stats_table
+from sqlalchemy.orm import joinedload
 
 try:
     from search_integration import search_documents, get_search_manager
@@ -57,6 +59,9 @@ except ImportError:
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.secret_key = "foia-ai-wiki-ui"
 
+ensure_document_stats_table()
+fulltext_index_available()  # detect only; build with scripts/build_fulltext_index.py
+
 generation_status = {}
 generation_lock = threading.Lock()
 
@@ -1323,9 +1328,8 @@ def index():
         if (_index_cache['db_stats'] is None or 
             _index_cache['db_stats_time'] is None or 
             current_time - _index_cache['db_stats_time'] > CACHE_TTL):
-            with get_session() as session:
-                total_docs = session.query(Document).count()
-                total_pages = session.query(Page).count()
+            totals = corpus_totals()
+            total_docs, total_pages = totals['documents'], totals['pages']
             _index_cache['db_stats'] = (total_docs, total_pages)
             _index_cache['db_stats_time'] = current_time
         else:
@@ -1651,6 +1655,21 @@ def generation_status_api(job_id: str):
     return jsonify(status)
 
 
+@app.route("/api/search-stats")
+def search_stats_api():
+    """Hit rates of the search result and query embedding caches, and search leg latencies"""
+    if not HYBRID_SEARCH_AVAILABLE:
+        return jsonify({'available': False})
+    manager = get_search_manager()
+    stats = manager.cache_stats()
+    stats.update({
+        'available': True,
+        'index_loaded': manager.index_loaded,
+        'using_production_search': manager.using_production_search,
+    })
+    return jsonify(stats)
+
+
 @app.route("/documents")
 def documents():
     q = (request.args.get("q") or "").strip()
@@ -1666,19 +1685,23 @@ def documents():
     with get_session() as session:
         query = session.query(Document)
         if q:
-            like = f"%{q}%"
-            query = query.filter(or_(Document.title.ilike(like), Document.external_id.ilike(like)))
+            query = query.filter(document_match_clause(q))
         total = query.count()
-        docs = query.order_by(Document.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        docs = (
+            query.add_entity(DocumentStats)
+            .outerjoin(DocumentStats, DocumentStats.document_id == Document.id)
+            .options(joinedload(Document.source))
+            .order_by(Document.created_at.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+            .all()
+        )
 
         start_index = (page - 1) * per_page + 1
         rows = []
-        for idx, d in enumerate(docs, start=start_index):
-            page_count = session.query(Page).filter_by(document_id=d.id).count()
-            total_words = 0
-            if page_count:
-                pages = session.query(Page).filter_by(document_id=d.id).all()
-                total_words = sum(len(p.text.split()) if p.text else 0 for p in pages)
+        for idx, (d, stats) in enumerate(docs, start=start_index):
+            page_count = stats.page_count if stats else 0
+            total_words = stats.word_count if stats else 0
             has_pdf = bool((d.file_path and Path(d.file_path).exists()) or d.url)
             pdf_link = url_for('serve_pdf', external_id=d.external_id) if d.external_id else None
             rows.append({
@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/foia_ai.db")
+DB_BULK_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", "1000"))  # rows per bulk-insert transaction
 BLOB_DIR = Path(os.getenv("BLOB_DIR", "data/blob"))
 USER_AGENT = os.getenv("USER_AGENT", "FOIA-AI-Bot/0.1")
 RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", "0.5"))
@@ -13,6 +14,36 @@ RETRY_TOTAL = int(os.getenv("RETRY_TOTAL", "3"))
 
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
 OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))  # 0 = one process per CPU core
+OCR_RASTER_WINDOW = int(os.getenv("OCR_RASTER_WINDOW", "4"))  # pages rendered per pdftoppm call
+OCR_SINGLE_PASS = os.getenv("OCR_SINGLE_PASS", "true").lower() == "true"
+OCR_PREPROCESS_TIER = os.getenv("OCR_PREPROCESS_TIER", "auto").lower()  # auto | fast | standard | full
+OCR_ESCALATE_CONFIDENCE = float(os.getenv("OCR_ESCALATE_CONFIDENCE", "70"))
+OCR_PERSIST_IMAGES = os.getenv("OCR_PERSIST_IMAGES", "off").lower()  # off | lossless | thumbnail
+OCR_THUMBNAIL_MAX_PX = int(os.getenv("OCR_THUMBNAIL_MAX_PX", "1200"))
+
+INDEX_DEDUP = os.getenv("INDEX_DEDUP", "true").lower() == "true"  # skip repeated files (sha256) and embed repeated chunks once
+CHUNK_EMBEDDING_STORE_PATH = os.getenv("CHUNK_EMBEDDING_STORE_PATH", "data/embeddings/chunk_embeddings.sqlite")  # reuse chunk vectors across rebuilds, empty = off
+RETRIEVAL_EMBEDDING_DTYPE = os.getenv("RETRIEVAL_EMBEDDING_DTYPE", "float32").lower()  # float32 | float16 (half the disk/page cache)
+
+SEARCH_ANN_INDEX = os.getenv("SEARCH_ANN_INDEX", "flat").lower()  # flat | ivf_flat | ivf_pq | hnsw
+SEARCH_ANN_NLIST = int(os.getenv("SEARCH_ANN_NLIST", "0"))  # 0 = ~4*sqrt(n_vectors)
+SEARCH_ANN_NPROBE = int(os.getenv("SEARCH_ANN_NPROBE", "16"))
+SEARCH_ANN_PQ_M = int(os.getenv("SEARCH_ANN_PQ_M", "0"))  # 0 = dim/8 bytes per vector
+SEARCH_ANN_HNSW_M = int(os.getenv("SEARCH_ANN_HNSW_M", "32"))
+SEARCH_ANN_EF_SEARCH = int(os.getenv("SEARCH_ANN_EF_SEARCH", "64"))
+SEARCH_ANN_TRAIN_SIZE = int(os.getenv("SEARCH_ANN_TRAIN_SIZE", "100000"))  # vectors sampled for IVF training
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))  # in-memory LRU entries, 0 = off
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")  # SQLite file for a persistent tier, empty = memory only
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "512"))  # cached result lists, 0 = off
+SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", "900"))  # seconds
+SEARCH_PARALLEL_LEGS = os.getenv("SEARCH_PARALLEL_LEGS", "true").lower() == "true"  # run semantic and keyword legs concurrently
+SEARCH_LEG_TIMEOUT = float(os.getenv("SEARCH_LEG_TIMEOUT", "5"))  # seconds per leg before degrading to the other, 0 = wait
+SEARCH_LEG_WORKERS = int(os.getenv("SEARCH_LEG_WORKERS", "8"))  # leg threads shared by all searches, ~2x the concurrent searches expected
+SEARCH_LATENCY_WINDOW = int(os.getenv("SEARCH_LATENCY_WINDOW", "1000"))  # samples kept per stage for p50/p95
+DOC_METADATA_CACHE_SIZE = int(os.getenv("DOC_METADATA_CACHE_SIZE", "200000"))  # external_id -> title/source entries, 0 = off
+DOC_METADATA_PREWARM = os.getenv("DOC_METADATA_PREWARM", "false").lower() == "true"  # load the whole map when search starts
 
 ENABLE_CIA_CREST = os.getenv("ENABLE_CIA_CREST", "true").lower() == "true"
 ENABLE_FBI_VAULT = os.getenv("ENABLE_FBI_VAULT", "true").lower() == "true"
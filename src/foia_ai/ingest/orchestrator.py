@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+from sqlalchemy import or_
+
+from ..config import BLOB_DIR, RATE_LIMIT_PER_SEC, REQUEST_TIMEOUT, RETRY_TOTAL, USER_AGENT
+from ..ocr.parallel import ParallelOCREngine
+from ..ocr.pipeline import ocr_page
+from ..ocr.rasterize import get_page_count, iter_pdf_pages
+from ..storage.bulk import bulk_upsert_pages
+from ..storage.fulltext import ensure_fulltext_index
+from ..storage.stats import refresh_document_stats
+from ..storage.db import Base, engine, get_session
+from ..storage.models import Document, DocumentIngestState, DocumentStats, IngestionJob, Page, Source
+from ..utils.text_cleanup import enhance_text_quality
+from ..utils.text_extraction import iter_raw_page_texts, is_usable_text_layer
+
+LOGGER = logging.getLogger(__name__)
+
+# Stages in order; DocumentIngestState.stage records the last one completed.
+# "rasterized" records the page plan (text-layer pages stored, OCR page list);
+# rendering itself streams page windows inside the "ocrd" stage.
+STAGES = ("pending", "fetched", "rasterized", "ocrd", "cleaned", "stored", "indexed")
+
+# Which worker pool runs the work that reaches each stage
+STAGE_POOLS = {
+    "fetched": "fetch",
+    "rasterized": "extract",
+    "ocrd": "extract",
+    "cleaned": "store",
+    "stored": "store",
+    "indexed": "store",
+}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionOrchestrator:
+    """
+    Drive documents through fetch → rasterize → OCR → clean → store → index
+    with durable per-document stage state.
+
+    Each stage runs on its own worker pool, so downloads, OCR and database
+    writes overlap across documents. Stage completion and every OCR'd page
+    are committed as soon as they finish; re-running picks each document up
+    at its last completed stage and skips pages already in the `pages` table.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        fetch_workers: int = 4,
+        extract_workers: int = 2,
+        store_workers: int = 1,
+        ocr_workers: Optional[int] = None,
+        dpi: int = 300,
+        indexer: Optional[Callable[[int], None]] = None,
+        max_attempts: int = 3,
+        stats_interval: float = 5.0,
+    ):
+        self.source = source
+        self.pool_sizes = {'fetch': fetch_workers, 'extract': extract_workers, 'store': store_workers}
+        self.ocr_workers = ocr_workers
+        self.dpi = dpi
+        self.indexer = indexer
+        self.max_attempts = max_attempts
+        self.stats_interval = stats_interval
+        self.final_stage = "indexed" if indexer else "stored"
+
+        self.job_id: Optional[int] = None
+        self.ocr_engine: Optional[ParallelOCREngine] = None
+
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._last_fetch = 0.0
+        self._counters: Dict[str, float] = {}
+        self._stage_counts: Dict[str, int] = {}
+        self._started = 0.0
+        self._last_publish = 0.0
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def ensure_tables() -> None:
+        Base.metadata.create_all(engine)
+        # Install the full-text triggers before any pages are written.
+        ensure_fulltext_index()
+
+    def _get_state(self, session, document_id: int) -> DocumentIngestState:
+        state = session.query(DocumentIngestState).filter_by(document_id=document_id).first()
+        if state is None:
+            state = DocumentIngestState(document_id=document_id, stage="pending", status="ok", attempts=0)
+            session.add(state)
+        return state
+
+    def _detail(self, document_id: int) -> Dict:
+        with get_session() as session:
+            state = session.query(DocumentIngestState).filter_by(document_id=document_id).first()
+            return json.loads(state.detail) if state and state.detail else {}
+
+    def _mark_stage(self, document_id: int, stage: str, detail: Optional[Dict] = None) -> None:
+        with get_session() as session:
+            state = self._get_state(session, document_id)
+            previous = state.stage
+            state.stage = stage
+            state.status = "ok"
+            state.error = None
+            state.job_id = self.job_id
+            if detail is not None:
+                merged = json.loads(state.detail) if state.detail else {}
+                merged.update(detail)
+                state.detail = json.dumps(merged)
+        with self._lock:
+            self._stage_counts[previous] = self._stage_counts.get(previous, 0) - 1
+            self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+
+    def _mark_failed(self, document_id: int, stage: str, error: Exception) -> None:
+        with get_session() as session:
+            state = self._get_state(session, document_id)
+            state.status = "failed"
+            state.attempts = (state.attempts or 0) + 1
+            state.error = f"{stage}: {error}"[:4000]
+            state.job_id = self.job_id
+        self._bump('documents_failed')
+
+    def _select_documents(self, document_ids: Optional[Sequence[int]]) -> List[Tuple[int, str]]:
+        """Documents that still have stages to run, with their last completed stage."""
+        with get_session() as session:
+            query = (
+                session.query(Document.id, DocumentIngestState.stage)
+                .join(Source, Document.source_id == Source.id)
+                .outerjoin(DocumentIngestState, DocumentIngestState.document_id == Document.id)
+                .filter(Source.name == self.source)
+                .filter(or_(DocumentIngestState.id.is_(None), DocumentIngestState.stage != self.final_stage))
+                .filter(or_(
+                    DocumentIngestState.id.is_(None),
+                    DocumentIngestState.status != "failed",
+                    DocumentIngestState.attempts < self.max_attempts,
+                ))
+            )
+            if document_ids:
+                query = query.filter(Document.id.in_(list(document_ids)))
+            return [(doc_id, stage or "pending") for doc_id, stage in query.order_by(Document.id).all()]
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def _bump(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = dict(self._counters)
+            stage_counts = {s: n for s, n in self._stage_counts.items() if n > 0}
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        stats: Dict[str, object] = {
+            'updated_at': datetime.utcnow().isoformat(),
+            'elapsed_seconds': round(elapsed, 1),
+            'documents_total': int(counters.get('documents_total', 0)),
+            'documents_completed': int(counters.get('documents_completed', 0)),
+            'documents_failed': int(counters.get('documents_failed', 0)),
+            'pages_committed': int(counters.get('pages_committed', 0)),
+            'pages_ocrd': int(counters.get('pages_ocrd', 0)),
+            'bytes_fetched': int(counters.get('bytes_fetched', 0)),
+            'pages_per_sec': round(counters.get('pages_committed', 0) / elapsed, 3) if elapsed > 0 else 0.0,
+            'documents_per_min': round(counters.get('documents_completed', 0) * 60 / elapsed, 3) if elapsed > 0 else 0.0,
+            'stage_counts': stage_counts,
+        }
+        if self.ocr_engine is not None:
+            stats['ocr'] = self.ocr_engine.get_stats()
+        return stats
+
+    def _publish_stats(self, *, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last_publish < self.stats_interval:
+            return
+        self._last_publish = now
+        with get_session() as session:
+            job = session.get(IngestionJob, self.job_id)
+            if job is not None:
+                job.stats = json.dumps(self.get_stats())
+
+    # ------------------------------------------------------------------
+    # Page writes
+    # ------------------------------------------------------------------
+
+    def _write_pages(self, document_id: int, rows: Iterable[Tuple[int, str, Optional[float], Optional[str]]]) -> int:
+        """Upsert (page_no, text, ocr_confidence, image_path) rows and commit."""
+        count = bulk_upsert_pages(
+            ((document_id, page_no, text, conf, image_path) for page_no, text, conf, image_path in rows),
+            refresh_stats=False,
+        )
+        self._bump('pages_committed', count)
+        return count
+
+    def _existing_page_numbers(self, document_id: int) -> set:
+        with get_session() as session:
+            return {n for (n,) in session.query(Page.page_no).filter_by(document_id=document_id).all()}
+
+    def _file_path(self, document_id: int) -> Path:
+        with get_session() as session:
+            doc = session.get(Document, document_id)
+            if not doc or not doc.file_path:
+                raise RuntimeError(f"Document {document_id} has no file_path; fetch stage incomplete")
+            return Path(doc.file_path)
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _throttle(self) -> None:
+        if RATE_LIMIT_PER_SEC <= 0:
+            return
+        with self._fetch_lock:
+            wait_for = self._last_fetch + 1.0 / RATE_LIMIT_PER_SEC - time.monotonic()
+            if wait_for > 0:
+                time.sleep(wait_for)
+            self._last_fetch = time.monotonic()
+
+    def _fetch(self, document_id: int) -> Optional[Dict]:
+        with get_session() as session:
+            doc = session.get(Document, document_id)
+            path = Path(doc.file_path) if doc.file_path else None
+            if path and path.exists():
+                if not doc.sha256:
+                    doc.sha256 = _sha256(path)
+                return None
+            if not doc.url:
+                raise RuntimeError("Document has neither a local file nor a URL")
+            url = doc.url
+            dest = BLOB_DIR / "pdf" / self.source / f"{doc.external_id or doc.id}.pdf"
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_suffix(dest.suffix + ".part")
+        last_error: Optional[Exception] = None
+        for attempt in range(max(1, RETRY_TOTAL)):
+            self._throttle()
+            try:
+                with requests.get(url, headers={'User-Agent': USER_AGENT}, timeout=REQUEST_TIMEOUT, stream=True) as resp:
+                    resp.raise_for_status()
+                    with open(tmp, 'wb') as f:
+                        for block in resp.iter_content(chunk_size=1 << 16):
+                            f.write(block)
+                tmp.replace(dest)
+                break
+            except requests.RequestException as e:
+                last_error = e
+                LOGGER.warning("Fetch attempt %d for %s failed: %s", attempt + 1, url, e)
+        else:
+            raise RuntimeError(f"Download failed: {last_error}")
+
+        self._bump('bytes_fetched', dest.stat().st_size)
+        with get_session() as session:
+            doc = session.get(Document, document_id)
+            doc.file_path = str(dest)
+            doc.sha256 = _sha256(dest)
+        return None
+
+    def _plan(self, document_id: int) -> Optional[Dict]:
+        """Store usable text-layer pages and record which pages still need OCR."""
+        path = self._file_path(document_id)
+        text_pages: List[Tuple[int, str, Optional[float], Optional[str]]] = []
+        needs_ocr: List[int] = []
+        try:
+            for page_no, raw_text in iter_raw_page_texts(path):
+                if is_usable_text_layer(raw_text):
+                    text_pages.append((page_no, raw_text, None, None))
+                else:
+                    needs_ocr.append(page_no)
+            page_count = len(text_pages) + len(needs_ocr)
+        except Exception as e:
+            LOGGER.warning("Text layer unreadable for %s, planning full OCR: %s", path, e)
+            page_count = get_page_count(path)
+            text_pages, needs_ocr = [], list(range(1, page_count + 1))
+
+        if text_pages:
+            self._write_pages(document_id, text_pages)
+        return {'page_count': page_count, 'ocr_pages': needs_ocr}
+
+    def _ocr(self, document_id: int) -> Optional[Dict]:
+        path = self._file_path(document_id)
+        planned = self._detail(document_id).get('ocr_pages', [])
+        done = self._existing_page_numbers(document_id)
+        todo = [p for p in planned if p not in done]
+        if not todo:
+            return None
+
+        LOGGER.info("OCR document %d: %d of %d planned pages remaining", document_id, len(todo), len(planned))
+        out_dir = BLOB_DIR / "ocr" / path.stem
+        pages = iter_pdf_pages(path, dpi=self.dpi, page_numbers=todo)
+        if self.ocr_engine is not None:
+            results = self.ocr_engine.iter_page_results(pages, out_dir=out_dir, clean=False)
+        else:
+            results = (ocr_page(idx, img, out_dir, clean=False) for idx, img in pages)
+
+        for result in results:
+            image_path = str(result.image_path) if result.image_path else None
+            self._write_pages(document_id, [(result.page_no, result.text, result.confidence, image_path)])
+            self._bump('pages_ocrd')
+        return None
+
+    def _clean(self, document_id: int) -> Optional[Dict]:
+        with get_session() as session:
+            pages = session.query(Page.page_no, Page.text, Page.ocr_confidence, Page.image_path) \
+                .filter_by(document_id=document_id).all()
+        bulk_upsert_pages(
+            (
+                (document_id, page_no, enhance_text_quality(text) if text else text, conf, image_path)
+                for page_no, text, conf, image_path in pages
+            ),
+            refresh_stats=False,
+        )
+        return None
+
+    def _store(self, document_id: int) -> Optional[Dict]:
+        # Pages were written with refresh_stats=False; settle document_stats once here.
+        refresh_document_stats([document_id])
+        with get_session() as session:
+            doc = session.get(Document, document_id)
+            doc.pages = session.get(DocumentStats, document_id).page_count
+        return None
+
+    def _index(self, document_id: int) -> Optional[Dict]:
+        self.indexer(document_id)
+        return None
+
+    # ------------------------------------------------------------------
+    # Driver
+    # ------------------------------------------------------------------
+
+    def _next_stage(self, stage: str) -> Optional[str]:
+        if stage == self.final_stage:
+            return None
+        return STAGES[STAGES.index(stage) + 1]
+
+    def _run_stage(self, document_id: int, target: str) -> Optional[str]:
+        """Run the work that reaches `target`; returns the following stage or None when done/failed."""
+        handlers = {
+            "fetched": self._fetch,
+            "rasterized": self._plan,
+            "ocrd": self._ocr,
+            "cleaned": self._clean,
+            "stored": self._store,
+            "indexed": self._index,
+        }
+        try:
+            detail = handlers[target](document_id)
+        except Exception as e:
+            LOGGER.exception("Document %d failed reaching stage %s", document_id, target)
+            self._mark_failed(document_id, target, e)
+            return None
+
+        self._mark_stage(document_id, target, detail)
+        following = self._next_stage(target)
+        if following is None:
+            self._bump('documents_completed')
+        return following
+
+    def run(self, document_ids: Optional[Sequence[int]] = None, *, job_id: Optional[int] = None) -> int:
+        """
+        Ingest every unfinished document of the source (or just `document_ids`).
+
+        Returns the IngestionJob id. Pass job_id to keep reporting into an
+        existing job row when resuming.
+        """
+        self.ensure_tables()
+        with get_session() as session:
+            job = session.get(IngestionJob, job_id) if job_id else None
+            if job is None:
+                job = IngestionJob(source=self.source, status="running")
+                session.add(job)
+                session.flush()
+            job.status = "running"
+            job.finished_at = None
+            self.job_id = job.id
+
+        targets = self._select_documents(document_ids)
+        self._counters = {'documents_total': len(targets)}
+        self._stage_counts = {}
+        for _, stage in targets:
+            self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+        self._started = time.perf_counter()
+        LOGGER.info("Ingestion job %d: %d documents to advance for %s", self.job_id, len(targets), self.source)
+
+        executors = {
+            name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"ingest-{name}")
+            for name, size in self.pool_sizes.items()
+        }
+        if self.ocr_workers != 1:
+            self.ocr_engine = ParallelOCREngine(workers=self.ocr_workers)
+            self.ocr_engine.__enter__()
+
+        pending: Dict[Future, int] = {}
+
+        def submit(document_id: int, target: str) -> None:
+            future = executors[STAGE_POOLS[target]].submit(self._run_stage, document_id, target)
+            pending[future] = document_id
+
+        status = "completed"
+        error = None
+        try:
+            for document_id, stage in targets:
+                following = self._next_stage(stage)
+                if following:
+                    submit(document_id, following)
+
+            while pending:
+                done, _ = wait(list(pending), timeout=self.stats_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    document_id = pending.pop(future)
+                    following = future.result()
+                    if following:
+                        submit(document_id, following)
+                self._publish_stats()
+
+            if self._counters.get('documents_failed'):
+                status = "completed_with_errors"
+        except BaseException as e:
+            status = "interrupted"
+            error = repr(e)
+            raise
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=status != "interrupted", cancel_futures=status == "interrupted")
+            if self.ocr_engine is not None:
+                self.ocr_engine.close()
+            with get_session() as session:
+                job = session.get(IngestionJob, self.job_id)
+                job.status = status
+                job.error = error
+                job.finished_at = datetime.utcnow()
+                job.stats = json.dumps(self.get_stats())
+            self.ocr_engine = None
+
+        LOGGER.info("Ingestion job %d %s: %s", self.job_id, status, json.dumps(self.get_stats()))
+        return self.job_id
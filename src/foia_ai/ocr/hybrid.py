@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.text_cleanup import enhance_text_quality
+from ..utils.text_extraction import iter_raw_page_texts, is_usable_text_layer
+from .pipeline import ocr_pdf_to_pages
+
+LOGGER = logging.getLogger(__name__)
+
+
+def extract_pages_hybrid(
+    pdf_path: Path,
+    *,
+    min_chars: int = 50,
+    stats: Dict[str, float] | None = None,
+    **ocr_kwargs,
+) -> List[Tuple[int, str, Optional[float]]]:
+    """
+    Extract every page of a PDF, preferring the embedded text layer.
+
+    The PDF is parsed once with pdfminer; pages whose text layer passes
+    is_usable_text_layer keep it, and only the blank or garbage pages are
+    rasterized and sent through ocr_pdf_to_pages. Mixed scanned/born-digital
+    releases therefore get full coverage without OCR'ing the digital pages.
+
+    Args:
+        pdf_path: Path to PDF file
+        min_chars: Minimum non-whitespace characters for a usable text layer
+        stats: Optional dict filled with text/OCR page counts and OCR totals
+        **ocr_kwargs: Passed through to ocr_pdf_to_pages (workers, dpi, ...)
+
+    Returns list of (page_no, text, ocr_confidence) in page order, where
+    ocr_confidence is None for pages taken from the text layer
+    """
+    pdf_path = Path(pdf_path)
+
+    pages: Dict[int, Tuple[str, Optional[float]]] = {}
+    needs_ocr: Optional[List[int]] = []
+
+    try:
+        for page_no, raw_text in iter_raw_page_texts(pdf_path):
+            if is_usable_text_layer(raw_text, min_chars=min_chars):
+                pages[page_no] = (enhance_text_quality(raw_text), None)
+            else:
+                needs_ocr.append(page_no)
+    except Exception as e:
+        # Unparseable text layer: fall back to OCR'ing the whole document.
+        LOGGER.warning("Text layer extraction failed for %s, OCR'ing all pages: %s", pdf_path, e)
+        pages = {}
+        needs_ocr = None
+
+    ocr_stats: Dict[str, float] = {}
+    if needs_ocr is None or needs_ocr:
+        for page_no, text, conf in ocr_pdf_to_pages(
+            pdf_path, page_numbers=needs_ocr, stats=ocr_stats, **ocr_kwargs
+        ):
+            pages[page_no] = (text, conf)
+
+    text_pages = sum(1 for _, conf in pages.values() if conf is None)
+    ocr_pages = len(pages) - text_pages
+    LOGGER.info("Hybrid extraction %s: %d text-layer pages, %d OCR'd pages", pdf_path.name, text_pages, ocr_pages)
+
+    if stats is not None:
+        stats.update(ocr_stats)
+        stats['text_layer_pages'] = text_pages
+        stats['ocr_pages'] = ocr_pages
+
+    return [(page_no, text, conf) for page_no, (text, conf) in sorted(pages.items())]
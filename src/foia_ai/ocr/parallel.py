@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from ..config import OCR_WORKERS
+
+if TYPE_CHECKING:
+    from .pipeline import PageOCRResult
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerStats:
+    """Throughput counters for a single OCR worker process."""
+    pid: int
+    pages: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+
+def _init_worker() -> None:
+    # Tesseract spawns OpenMP threads per call; with one page per process that
+    # oversubscribes the cores the pool is already using.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_page_task(
+    idx: int,
+    img: Image.Image,
+    out_dir: Path,
+    single_pass: Optional[bool],
+    persist_images: Optional[str],
+    clean: bool = True,
+) -> Tuple["PageOCRResult", int, float]:
+    from .pipeline import ocr_page
+
+    started = time.perf_counter()
+    result = ocr_page(idx, img, out_dir, single_pass=single_pass, persist_images=persist_images, clean=clean)
+    return result, os.getpid(), time.perf_counter() - started
+
+
+class ParallelOCREngine:
+    """
+    Distribute page OCR across a process pool.
+
+    Pages are submitted as they arrive from the input iterable, with at most
+    `max_in_flight` pages pending so rendered images don't pile up in memory.
+    ocr_images/ocr_page_results return pages in page order regardless of
+    completion order; iter_page_results streams them as they finish. One
+    engine can be shared by several threads.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        single_pass: Optional[bool] = None,
+        persist_images: Optional[str] = None,
+    ):
+        self.workers = workers or OCR_WORKERS or os.cpu_count() or 1
+        self.single_pass = single_pass
+        self.persist_images = persist_images
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.worker_stats: Dict[int, WorkerStats] = {}
+        self.wall_seconds = 0.0  # time with at least one iter_page_results call active
+        self._active_calls = 0
+        self._active_since = 0.0
+        self.pages_done = 0
+        self.image_bytes_written = 0
+        self._stats_lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelOCREngine":
+        self._ensure_executor()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _record(self, result: "PageOCRResult", pid: int, elapsed: float) -> None:
+        with self._stats_lock:
+            stats = self.worker_stats.setdefault(pid, WorkerStats(pid=pid))
+            stats.pages += 1
+            stats.busy_seconds += elapsed
+            self.pages_done += 1
+            self.image_bytes_written += result.image_bytes
+
+    def _begin_call(self) -> None:
+        with self._stats_lock:
+            if self._active_calls == 0:
+                self._active_since = time.perf_counter()
+            self._active_calls += 1
+
+    def _end_call(self) -> None:
+        with self._stats_lock:
+            self._active_calls -= 1
+            if self._active_calls == 0:
+                self.wall_seconds += time.perf_counter() - self._active_since
+
+    def _active_wall_seconds(self) -> float:
+        """wall_seconds plus the span still open, so overlapping calls are counted once"""
+        with self._stats_lock:
+            if self._active_calls:
+                return self.wall_seconds + time.perf_counter() - self._active_since
+            return self.wall_seconds
+
+    def iter_page_results(
+        self,
+        pages: Iterable[Tuple[int, Image.Image]],
+        *,
+        out_dir: Path,
+        clean: bool = True,
+    ) -> Iterator["PageOCRResult"]:
+        """
+        OCR (page_no, image) pairs in parallel, yielding each page as soon as it
+        finishes (completion order, not page order).
+        """
+        executor = self._ensure_executor()
+
+        started = time.perf_counter()
+        self._begin_call()
+        pending: Set[Future] = set()
+        done_count = 0
+
+        def drain(futures: Set[Future]) -> Iterator["PageOCRResult"]:
+            for future in futures:
+                result, pid, elapsed = future.result()
+                self._record(result, pid, elapsed)
+                yield result
+
+        try:
+            for idx, img in pages:
+                if len(pending) >= self.max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for result in drain(done):
+                        done_count += 1
+                        yield result
+                pending.add(executor.submit(
+                    _ocr_page_task, idx, img, out_dir, self.single_pass, self.persist_images, clean
+                ))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for result in drain(done):
+                    done_count += 1
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            elapsed = time.perf_counter() - started
+            self._end_call()
+
+        LOGGER.info(
+            "Parallel OCR: %d pages in %.1fs across %d workers (%.2f pages/sec)",
+            done_count, elapsed, len(self.worker_stats),
+            done_count / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def ocr_images(self, pages: Iterable[Tuple[int, Image.Image]], *, out_dir: Path) -> List[Tuple[int, str, float]]:
+        """
+        OCR (page_no, image) pairs in parallel.
+
+        Returns list of (page_no, text, confidence_estimate) sorted by page_no
+        """
+        return [r.as_tuple() for r in self.ocr_page_results(pages, out_dir=out_dir)]
+
+    def ocr_page_results(self, pages: Iterable[Tuple[int, Image.Image]], *, out_dir: Path) -> List["PageOCRResult"]:
+        """Like ocr_images, but keeps the per-page timing and image I/O details."""
+        results = list(self.iter_page_results(pages, out_dir=out_dir))
+        results.sort(key=lambda r: r.page_no)
+        return results
+
+    def ocr_pdf(
+        self,
+        pdf_path: Path,
+        *,
+        out_dir: Path | None = None,
+        dpi: int = 300,
+        raster_window: int | None = None,
+    ) -> List[Tuple[int, str, float]]:
+        """Stream-rasterize a PDF and OCR its pages on the pool."""
+        from ..config import BLOB_DIR
+        from .rasterize import iter_pdf_pages
+
+        pdf_path = Path(pdf_path)
+        if out_dir is None:
+            out_dir = BLOB_DIR / "ocr" / pdf_path.stem
+
+        pages = iter_pdf_pages(pdf_path, dpi=dpi, window=raster_window)
+        return self.ocr_images(pages, out_dir=out_dir)
+
+    def get_stats(self) -> Dict[str, object]:
+        """
+        Throughput summary, overall and per worker process. wall_seconds is
+        the time the engine had any call in progress, so documents OCRed
+        concurrently from several threads are not double counted.
+        """
+        wall_seconds = self._active_wall_seconds()
+        return {
+            'workers': self.workers,
+            'pages': self.pages_done,
+            'wall_seconds': round(wall_seconds, 3),
+            'pages_per_sec': round(self.pages_done / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+            'image_bytes_written': self.image_bytes_written,
+            'per_worker': [
+                {
+                    'pid': s.pid,
+                    'pages': s.pages,
+                    'busy_seconds': round(s.busy_seconds, 3),
+                    'pages_per_sec': round(s.pages_per_sec, 3),
+                }
+                for s in sorted(self.worker_stats.values(), key=lambda s: s.pid)
+            ],
+        }
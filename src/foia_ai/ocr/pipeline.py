@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import logging
+import os
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
-from pdf2image import convert_from_path
 import pytesseract
 
-from ..config import TESSERACT_CMD, OCR_LANG, BLOB_DIR
+from ..config import (
+    TESSERACT_CMD, OCR_LANG, OCR_SINGLE_PASS, OCR_WORKERS, BLOB_DIR,
+    OCR_PERSIST_IMAGES, OCR_THUMBNAIL_MAX_PX, OCR_PREPROCESS_TIER, OCR_ESCALATE_CONFIDENCE,
+)
 from ..utils.text_cleanup import enhance_text_quality
+from .parallel import ParallelOCREngine
+from .rasterize import iter_pdf_pages
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,27 +24,81 @@ LOGGER = logging.getLogger(__name__)
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
 
-def preprocess_image_for_ocr(img: Image.Image) -> Image.Image:
-    """
-    Preprocess image to improve OCR accuracy.
-    - Convert to grayscale
-    - Increase contrast
-    - Apply thresholding
-    """
+PREPROCESS_TIERS = ("fast", "standard", "full")
+
+# Thresholds for choose_preprocess_tier, on the downscaled grayscale page
+CLEAN_NOISE_MAX = 3.0  # Immerkaer sigma below which a page is considered clean
+NOISY_NOISE_MIN = 8.0  # sigma above which only the NLM denoise helps
+CLEAN_CONTRAST_MIN = 60.0  # RMS contrast (std of gray levels) for the Otsu-only tier
+
+
+def _to_grayscale(img: Image.Image):
     import cv2
     import numpy as np
-    
+
     img_array = np.array(img)
-    
     if len(img_array.shape) == 3:
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-    else:
-        gray = img_array
+        return cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+    return img_array
+
+
+def estimate_page_quality(gray) -> Dict[str, float]:
+    """
+    Cheap noise and contrast statistics for a grayscale page.
+
+    Noise uses Immerkaer's fast sigma estimate on a 4x downscaled copy, so it
+    costs a small fraction of a single denoise pass.
+    """
+    import cv2
+    import numpy as np
+
+    small = cv2.resize(gray, None, fx=0.25, fy=0.25, interpolation=cv2.INTER_AREA)
+    h, w = small.shape[:2]
+    if h < 3 or w < 3:
+        return {'noise': 0.0, 'contrast': float(small.std())}
+
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = cv2.filter2D(small.astype(np.float32), -1, kernel)
+    noise = float(np.abs(response[1:-1, 1:-1]).sum() * np.sqrt(0.5 * np.pi) / (6.0 * (w - 2) * (h - 2)))
+
+    return {'noise': noise, 'contrast': float(small.std())}
+
+
+def choose_preprocess_tier(gray) -> str:
+    """Pick the cheapest preprocessing tier likely to be good enough for this page."""
+    quality = estimate_page_quality(gray)
+    if quality['noise'] < CLEAN_NOISE_MAX and quality['contrast'] >= CLEAN_CONTRAST_MIN:
+        return "fast"
+    if quality['noise'] < NOISY_NOISE_MIN:
+        return "standard"
+    return "full"
+
+
+def preprocess_image_for_ocr(img: Image.Image, tier: str = "full") -> Image.Image:
+    """
+    Preprocess image to improve OCR accuracy.
+
+    Tiers, cheapest first:
+    - fast: grayscale + Otsu threshold
+    - standard: grayscale + CLAHE + adaptive threshold
+    - full: grayscale + NLM denoise + CLAHE + adaptive threshold
+    """
+    import cv2
     
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+    gray = _to_grayscale(img)
+
+    if tier not in PREPROCESS_TIERS:
+        raise ValueError(f"Unknown preprocessing tier: {tier!r} (expected one of {PREPROCESS_TIERS})")
+
+    if tier == "fast":
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return Image.fromarray(binary)
+
+    if tier == "full":
+        gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
     
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(denoised)
+    enhanced = clahe.apply(gray)
     
     binary = cv2.adaptiveThreshold(
         enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
@@ -46,59 +107,308 @@ def preprocess_image_for_ocr(img: Image.Image) -> Image.Image:
     return Image.fromarray(binary)
 
 
-def ocr_pdf_to_pages(pdf_path: Path, *, out_dir: Path | None = None, dpi: int = 300) -> List[Tuple[int, str, float]]:
+OCR_CONFIG = r'--oem 3 --psm 1'  # OEM 3 = LSTM, PSM 1 = automatic page segmentation with OSD
+
+
+def _mean_confidence(confs) -> float:
+    """Average Tesseract word confidences, ignoring the -1 entries for non-word boxes."""
+    values = []
+    for c in confs:
+        try:
+            value = float(c)
+        except (TypeError, ValueError):
+            continue
+        if value >= 0:
+            values.append(value)
+    return sum(values) / len(values) if values else 0.0
+
+
+def text_from_tesseract_data(data: Dict[str, list]) -> str:
     """
-    Convert a PDF to images and run Tesseract OCR per page with preprocessing.
+    Rebuild page text from an image_to_data result.
 
-    Args:
-        pdf_path: Path to PDF file
-        out_dir: Output directory for intermediate images
-        dpi: DPI for PDF to image conversion (higher = better quality, default 300)
+    Words are joined with spaces, lines with newlines and paragraphs/blocks
+    with a blank line, which is close to what image_to_string emits.
+    """
+    blocks: List[List[List[str]]] = []
+    last_block = last_par = last_line = None
 
-    Returns list of (page_no, text, confidence_estimate)
+    for i, word in enumerate(data.get("text", [])):
+        if not word or not str(word).strip():
+            continue
+        block, par, line = data["block_num"][i], data["par_num"][i], data["line_num"][i]
+        if (block, par) != (last_block, last_par):
+            blocks.append([[]])
+        elif line != last_line:
+            blocks[-1].append([])
+        blocks[-1][-1].append(str(word).strip())
+        last_block, last_par, last_line = block, par, line
+
+    return "\n\n".join(
+        "\n".join(" ".join(words) for words in lines)
+        for lines in blocks
+    )
+
+
+def ocr_image(img: Image.Image, *, single_pass: bool | None = None) -> Tuple[str, float]:
     """
-    pdf_path = Path(pdf_path)
-    if out_dir is None:
-        out_dir = (BLOB_DIR / "ocr" / pdf_path.stem)
-    out_dir.mkdir(parents=True, exist_ok=True)
+    Run Tesseract on a preprocessed page image.
+
+    In single-pass mode one image_to_data call yields both the word boxes
+    (from which the text is rebuilt) and the confidences. The legacy mode
+    calls image_to_string and image_to_data separately; keep it for A/B runs.
+
+    Returns (raw_text, confidence_estimate)
+    """
+    if single_pass is None:
+        single_pass = OCR_SINGLE_PASS
+
+    if single_pass:
+        data = pytesseract.image_to_data(
+            img,
+            lang=OCR_LANG,
+            config=OCR_CONFIG,
+            output_type=pytesseract.Output.DICT
+        )
+        return text_from_tesseract_data(data), _mean_confidence(data.get("conf", []))
 
-    images = convert_from_path(str(pdf_path), dpi=dpi)
-    results: List[Tuple[int, str, float]] = []
+    text = pytesseract.image_to_string(
+        img, 
+        lang=OCR_LANG,
+        config=OCR_CONFIG
+    )
     
-    custom_config = r'--oem 3 --psm 1'  # OEM 3 = LSTM, PSM 1 = automatic page segmentation with OSD
+    conf = 0.0
+    try:
+        data = pytesseract.image_to_data(
+            img, 
+            lang=OCR_LANG, 
+            config=OCR_CONFIG,
+            output_type=pytesseract.Output.DICT
+        )
+        conf = _mean_confidence(data.get("conf", []))
+    except Exception as e:
+        LOGGER.warning("Failed to compute confidence: %s", e)
     
-    for idx, img in enumerate(images, start=1):
+    return text, conf
+
+
+@dataclass
+class PageOCRResult:
+    page_no: int
+    text: str
+    confidence: float
+    image_path: Optional[Path] = None
+    image_bytes: int = 0  # Bytes written persisting the page image
+    image_seconds: float = 0.0  # Time spent encoding/writing the page image
+    ocr_seconds: float = 0.0  # Preprocessing + Tesseract, including escalations
+    preprocess_tier: Optional[str] = None
+
+    def as_tuple(self) -> Tuple[int, str, float]:
+        return self.page_no, self.text, self.confidence
+
+
+def save_page_image(
+    idx: int,
+    original: Image.Image,
+    preprocessed: Image.Image,
+    out_dir: Path,
+    mode: str,
+) -> Tuple[Optional[Path], int]:
+    """
+    Persist a page image for the citation viewer.
+
+    Modes:
+    - off: nothing is written
+    - lossless: the preprocessed page as PNG (the historical behaviour)
+    - thumbnail: the rendered page downscaled to a grayscale JPEG
+
+    Returns (path or None, bytes written)
+    """
+    if mode == "off":
+        return None, 0
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if mode == "lossless":
         img_path = out_dir / f"page_{idx:04d}.png"
-        
+        preprocessed.save(img_path)
+    elif mode == "thumbnail":
+        img_path = out_dir / f"page_{idx:04d}.jpg"
+        thumb = original.convert("L")
+        thumb.thumbnail((OCR_THUMBNAIL_MAX_PX, OCR_THUMBNAIL_MAX_PX))
+        thumb.save(img_path, format="JPEG", quality=70, optimize=True)
+    else:
+        raise ValueError(f"Unknown page image mode: {mode!r} (expected off, lossless or thumbnail)")
+
+    return img_path, img_path.stat().st_size
+
+
+def ocr_page(
+    idx: int,
+    img: Image.Image,
+    out_dir: Path,
+    *,
+    single_pass: bool | None = None,
+    persist_images: str | None = None,
+    preprocess_tier: str | None = None,
+    clean: bool = True,
+) -> PageOCRResult:
+    """
+    Preprocess and OCR a single rendered page entirely in memory.
+
+    The preprocessed buffer goes straight to Tesseract; the page image is only
+    written to `out_dir` when `persist_images` asks for it.
+
+    With preprocess_tier "auto" the cheapest tier is picked from page
+    statistics and the page is re-run with the next tier up while confidence
+    stays below OCR_ESCALATE_CONFIDENCE. The best-scoring pass is kept.
+
+    With clean=False the raw Tesseract text is returned and the caller is
+    responsible for running enhance_text_quality.
+    """
+    mode = persist_images or OCR_PERSIST_IMAGES
+    requested_tier = preprocess_tier or OCR_PREPROCESS_TIER
+
+    started = time.perf_counter()
+    if requested_tier == "auto":
         try:
-            preprocessed = preprocess_image_for_ocr(img)
-            preprocessed.save(img_path)
+            tier = choose_preprocess_tier(_to_grayscale(img))
         except Exception as e:
-            LOGGER.warning("Preprocessing failed for page %d, using original: %s", idx, e)
-            img.save(img_path)
-        
-        text = pytesseract.image_to_string(
-            Image.open(img_path), 
-            lang=OCR_LANG,
-            config=custom_config
-        )
-        
-        text = enhance_text_quality(text)
-        
-        conf = 0.0
+            LOGGER.warning("Page quality estimate failed for page %d, using full preprocessing: %s", idx, e)
+            tier = "full"
+    elif requested_tier in PREPROCESS_TIERS:
+        tier = requested_tier
+    else:
+        raise ValueError(f"Unknown preprocessing tier: {requested_tier!r}")
+
+    best: Tuple[str, float, Image.Image, str] | None = None
+    while True:
         try:
-            data = pytesseract.image_to_data(
-                Image.open(img_path), 
-                lang=OCR_LANG, 
-                config=custom_config,
-                output_type=pytesseract.Output.DICT
-            )
-            confs = [float(c) for c in data.get("conf", []) if c not in ("-1", "-1.0")]
-            if confs:
-                conf = sum(confs) / len(confs)
+            preprocessed = preprocess_image_for_ocr(img, tier=tier)
         except Exception as e:
-            LOGGER.warning("Failed to compute confidence for %s: %s", img_path, e)
-        
-        results.append((idx, text, conf))
+            LOGGER.warning("Preprocessing (%s) failed for page %d, using original: %s", tier, idx, e)
+            preprocessed = img
+
+        text, conf = ocr_image(preprocessed, single_pass=single_pass)
+        if best is None or conf > best[1]:
+            best = (text, conf, preprocessed, tier)
+
+        # Only adaptive runs escalate; an explicit tier is honoured as-is.
+        next_tier_idx = PREPROCESS_TIERS.index(tier) + 1
+        if (requested_tier != "auto" or conf >= OCR_ESCALATE_CONFIDENCE
+                or next_tier_idx >= len(PREPROCESS_TIERS)):
+            break
+        LOGGER.debug("Page %d: confidence %.1f with %s preprocessing, escalating", idx, conf, tier)
+        tier = PREPROCESS_TIERS[next_tier_idx]
+
+    text, conf, preprocessed, tier = best
+    if clean:
+        text = enhance_text_quality(text)
+    ocr_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    img_path, img_bytes = None, 0
+    try:
+        img_path, img_bytes = save_page_image(idx, img, preprocessed, out_dir, mode)
+    except OSError as e:
+        LOGGER.warning("Failed to save page image %d to %s: %s", idx, out_dir, e)
     
-    return results
+    return PageOCRResult(
+        page_no=idx,
+        text=text,
+        confidence=conf,
+        image_path=img_path,
+        image_bytes=img_bytes,
+        image_seconds=time.perf_counter() - started,
+        ocr_seconds=ocr_seconds,
+        preprocess_tier=tier,
+    )
+
+
+def ocr_page_image(
+    idx: int,
+    img: Image.Image,
+    out_dir: Path,
+    *,
+    single_pass: bool | None = None,
+    persist_images: str | None = None,
+) -> Tuple[int, str, float]:
+    """
+    Preprocess and OCR a single rendered page.
+
+    Returns (page_no, text, confidence_estimate)
+    """
+    return ocr_page(
+        idx, img, out_dir, single_pass=single_pass, persist_images=persist_images
+    ).as_tuple()
+
+
+def summarize_page_results(results: List[PageOCRResult]) -> Dict[str, float]:
+    """Per-document OCR and page-image I/O totals."""
+    return {
+        'pages': len(results),
+        'ocr_seconds': round(sum(r.ocr_seconds for r in results), 3),
+        'image_bytes_written': sum(r.image_bytes for r in results),
+        'image_seconds': round(sum(r.image_seconds for r in results), 3),
+    }
+
+
+def ocr_pdf_to_pages(
+    pdf_path: Path,
+    *,
+    out_dir: Path | None = None,
+    dpi: int = 300,
+    workers: int | None = None,
+    single_pass: bool | None = None,
+    raster_window: int | None = None,
+    persist_images: str | None = None,
+    stats: Dict[str, float] | None = None,
+    page_numbers: Sequence[int] | None = None,
+) -> List[Tuple[int, str, float]]:
+    """
+    Rasterize a PDF a window of pages at a time and run Tesseract OCR per page
+    with preprocessing.
+
+    Args:
+        pdf_path: Path to PDF file
+        out_dir: Output directory for persisted page images
+        dpi: DPI for PDF to image conversion (higher = better quality, default 300)
+        workers: Number of OCR processes (default OCR_WORKERS; 1 = run in-process)
+        single_pass: One image_to_data call per page instead of string + data calls
+            (default OCR_SINGLE_PASS)
+        raster_window: Pages rendered per rasterizer call (default OCR_RASTER_WINDOW)
+        persist_images: off, lossless or thumbnail (default OCR_PERSIST_IMAGES)
+        stats: Optional dict filled with per-document OCR and image I/O totals
+        page_numbers: Only OCR these pages (1-based); default is every page
+
+    Returns list of (page_no, text, confidence_estimate)
+    """
+    pdf_path = Path(pdf_path)
+    if out_dir is None:
+        out_dir = (BLOB_DIR / "ocr" / pdf_path.stem)
+
+    if workers is None:
+        workers = OCR_WORKERS or os.cpu_count() or 1
+
+    pages = iter_pdf_pages(pdf_path, dpi=dpi, window=raster_window, page_numbers=page_numbers)
+
+    if workers > 1:
+        with ParallelOCREngine(workers=workers, single_pass=single_pass, persist_images=persist_images) as engine:
+            page_results = engine.ocr_page_results(pages, out_dir=out_dir)
+    else:
+        page_results = [
+            ocr_page(idx, img, out_dir, single_pass=single_pass, persist_images=persist_images)
+            for idx, img in pages
+        ]
+
+    summary = summarize_page_results(page_results)
+    LOGGER.info(
+        "OCR %s: %d pages, %.1fs OCR, %d image bytes written in %.2fs (mode=%s)",
+        pdf_path.name, summary['pages'], summary['ocr_seconds'],
+        summary['image_bytes_written'], summary['image_seconds'],
+        persist_images or OCR_PERSIST_IMAGES,
+    )
+    if stats is not None:
+        stats.update(summary)
+
+    return [r.as_tuple() for r in page_results]
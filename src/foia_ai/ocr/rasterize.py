@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from ..config import OCR_RASTER_WINDOW
+
+LOGGER = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def get_page_count(pdf_path: Path) -> int:
+    """Return the number of pages in a PDF without rendering it."""
+    info = pdfinfo_from_path(str(pdf_path))
+    return int(info.get("Pages", 0))
+
+
+def _page_windows(page_numbers: Sequence[int], window: int) -> List[Tuple[int, int]]:
+    """Group sorted page numbers into contiguous (first, last) ranges of at most `window` pages."""
+    windows: List[Tuple[int, int]] = []
+    for page_no in sorted(set(page_numbers)):
+        if windows:
+            first, last = windows[-1]
+            if page_no == last + 1 and page_no - first < window:
+                windows[-1] = (first, page_no)
+                continue
+        windows.append((page_no, page_no))
+    return windows
+
+
+def iter_pdf_pages(
+    pdf_path: Path,
+    *,
+    dpi: int = 300,
+    window: int | None = None,
+    prefetch: int = 1,
+    page_numbers: Optional[Sequence[int]] = None,
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Yield (page_no, image) pairs, rendering `window` pages at a time.
+
+    Each window is rasterized with a first_page/last_page range, so peak memory
+    is bounded by the window size rather than the document length. With
+    prefetch > 0 a background thread renders up to `prefetch` windows ahead
+    while the caller is still OCR'ing the current one.
+
+    Args:
+        pdf_path: Path to PDF file
+        dpi: DPI for PDF to image conversion
+        window: Pages rendered per pdftoppm call (default OCR_RASTER_WINDOW)
+        prefetch: Windows rendered ahead of the consumer (0 = render inline)
+        page_numbers: Only render these pages (1-based); default is every page
+    """
+    pdf_path = Path(pdf_path)
+    window = max(1, window or OCR_RASTER_WINDOW)
+    if page_numbers is None:
+        page_numbers = range(1, get_page_count(pdf_path) + 1)
+    windows = _page_windows(page_numbers, window)
+
+    def render(first: int, last: int) -> List[Image.Image]:
+        return convert_from_path(str(pdf_path), dpi=dpi, first_page=first, last_page=last)
+
+    if prefetch <= 0:
+        for first, last in windows:
+            for offset, img in enumerate(render(first, last)):
+                yield first + offset, img
+        return
+
+    rendered: queue.Queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                rendered.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def producer() -> None:
+        try:
+            for first, last in windows:
+                if stop.is_set():
+                    return
+                put((first, render(first, last)))
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    thread = threading.Thread(target=producer, name=f"rasterize-{pdf_path.stem}", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = rendered.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            first, images = item
+            for offset, img in enumerate(images):
+                yield first + offset, img
+            del images
+    finally:
+        stop.set()
+        thread.join(timeout=5)
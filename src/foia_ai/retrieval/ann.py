@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import logging
+import math
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import (
+    SEARCH_ANN_EF_SEARCH,
+    SEARCH_ANN_HNSW_M,
+    SEARCH_ANN_INDEX,
+    SEARCH_ANN_NLIST,
+    SEARCH_ANN_NPROBE,
+    SEARCH_ANN_PQ_M,
+    SEARCH_ANN_TRAIN_SIZE,
+)
+from .topk import top_k_indices
+
+LOGGER = logging.getLogger(__name__)
+
+ANN_INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def default_nlist(n_vectors: int) -> int:
+    """~4*sqrt(n) inverted lists, the usual starting point for IVF, clamped to [16, 65536]."""
+    return int(min(65536, max(16, 4 * math.sqrt(max(n_vectors, 1)))))
+
+
+def default_pq_m(dim: int) -> int:
+    """Largest sub-quantizer count <= dim/8 that divides dim (8 dims per 1-byte code)."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def create_ann_index(
+    dim: int,
+    index_type: Optional[str] = None,
+    *,
+    n_vectors: int = 0,
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    pq_bits: int = 8,
+    hnsw_m: Optional[int] = None,
+    ef_construction: int = 200,
+):
+    """
+    Empty inner-product FAISS index of the requested type (vectors are expected L2-normalized).
+
+    flat      exact IndexFlatIP (the previous behaviour)
+    ivf_flat  inverted lists over full vectors; needs training, tuned by nprobe
+    ivf_pq    inverted lists over product-quantized codes (pq_m bytes/vector); needs training
+    hnsw      graph index, no training, tuned by efSearch
+
+    n_vectors sizes nlist when it isn't given explicitly; corpora too small to
+    train the requested type get a flat index instead.
+    """
+    faiss = _faiss()
+    index_type = (index_type or SEARCH_ANN_INDEX).lower()
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m or SEARCH_ANN_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or SEARCH_ANN_NLIST
+        if not nlist:
+            nlist = default_nlist(n_vectors)
+            if n_vectors:
+                # keep ~39 training vectors per list on small corpora
+                nlist = max(1, min(nlist, n_vectors // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            m = pq_m or SEARCH_ANN_PQ_M or default_pq_m(dim)
+            if dim % m:
+                raise ValueError(f"pq_m={m} must divide the embedding dimension {dim}")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+        if n_vectors and n_vectors < min_train_size(index):
+            LOGGER.warning(
+                "%d vectors is too few to train %s (needs %d); using a flat index",
+                n_vectors, index_type, min_train_size(index),
+            )
+            return faiss.IndexFlatIP(dim)
+        return index
+    raise ValueError(f"Unknown ANN index type {index_type!r}; expected one of {ANN_INDEX_TYPES}")
+
+
+def index_type_of(index) -> str:
+    faiss = _faiss()
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    return "flat"
+
+
+def min_train_size(index) -> int:
+    """Vectors needed to train `index` well (FAISS warns below ~39 per centroid)."""
+    faiss = _faiss()
+    if index.is_trained:
+        return 0
+    ivf = faiss.extract_index_ivf(index)
+    need = ivf.nlist * 39
+    if isinstance(index, faiss.IndexIVFPQ):
+        need = max(need, (1 << index.pq.nbits) * 39)
+    return need
+
+
+def train_size(index) -> int:
+    """Sample size to buffer before training: at least min_train_size, SEARCH_ANN_TRAIN_SIZE by default."""
+    need = min_train_size(index)
+    return max(need, SEARCH_ANN_TRAIN_SIZE) if need else 0
+
+
+def train_index(index, sample: np.ndarray, seed: int = 1234) -> None:
+    """Train an IVF index on (a random subset of) `sample`; no-op for flat/HNSW."""
+    if index.is_trained:
+        return
+    sample = np.ascontiguousarray(sample, dtype='float32')
+    limit = train_size(index)
+    if len(sample) > limit:
+        rng = np.random.default_rng(seed)
+        sample = sample[np.sort(rng.choice(len(sample), limit, replace=False))]
+    if len(sample) < min_train_size(index):
+        LOGGER.warning(
+            "Training %s on %d vectors (recommended >= %d); recall may suffer",
+            index_type_of(index), len(sample), min_train_size(index),
+        )
+    LOGGER.info("Training %s index on %d vectors", index_type_of(index), len(sample))
+    index.train(sample)
+
+
+def set_search_params(index, *, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply query-time knobs (config defaults when not given); ignored by index types they don't apply to."""
+    faiss = _faiss()
+    kind = index_type_of(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(ivf.nlist, nprobe or SEARCH_ANN_NPROBE)
+    elif kind == "hnsw":
+        index.hnsw.efSearch = ef_search or SEARCH_ANN_EF_SEARCH
+
+
+def describe_index(index) -> Dict[str, Any]:
+    """Type and tuning parameters of an index, for metadata.json and reports."""
+    faiss = _faiss()
+    kind = index_type_of(index)
+    info: Dict[str, Any] = {'index_type': kind, 'dimension': index.d, 'ntotal': int(index.ntotal)}
+    if kind in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(index)
+        info.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+        if kind == "ivf_pq":
+            info.update(pq_m=int(index.pq.M), pq_bits=int(index.pq.nbits))
+    elif kind == "hnsw":
+        info.update(hnsw_m=int(index.hnsw.nb_neighbors(1)), ef_search=int(index.hnsw.efSearch))
+    return info
+
+
+class StreamingIndexBuilder:
+    """
+    Adds normalized vectors to an ANN index as they arrive.
+
+    Index types that need training buffer the first train_size() vectors,
+    train on them, then flush the buffer and add the rest directly, so the
+    streaming encoders never hold more than one training sample in memory.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._needed = train_size(index)
+        self._buffer: list = []
+        self._buffered = 0
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if self.index.is_trained:
+            self.index.add(vectors)
+            return
+        self._buffer.append(vectors)
+        self._buffered += len(vectors)
+        if self._buffered >= self._needed:
+            self._train_and_flush()
+
+    def add_many(self, batches: Iterable[np.ndarray]) -> None:
+        for vectors in batches:
+            self.add(vectors)
+
+    def _train_and_flush(self) -> None:
+        sample = np.vstack(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        train_index(self.index, sample)
+        for start in range(0, len(sample), 10000):
+            self.index.add(sample[start:start + 10000])
+
+    def finish(self):
+        """Train on whatever was buffered (small corpora) and return the index."""
+        if not self.index.is_trained and self._buffer:
+            self._train_and_flush()
+        set_search_params(self.index)
+        return self.index
+
+
+def iter_vectors(index, block_size: int = 65536) -> Iterator[np.ndarray]:
+    """The vectors stored in `index`, in id order, one reconstruct_n block at a time."""
+    for start in range(0, index.ntotal, block_size):
+        yield index.reconstruct_n(start, min(block_size, index.ntotal - start))
+
+
+def sample_saved_vectors(paths: Sequence[Path], size: int, seed: int = 1234) -> np.ndarray:
+    """
+    Uniform random sample of up to `size` vectors across saved indexes.
+
+    Every vector gets a random key and the `size` lowest keys are kept while
+    reading the indexes one by one, so the total doesn't have to be known
+    up front and only the sample plus one index is ever in memory.
+    """
+    faiss = _faiss()
+    rng = np.random.default_rng(seed)
+    sample: Optional[np.ndarray] = None
+    keys = np.zeros(0, dtype=np.float64)
+    for path in paths:
+        index = faiss.read_index(str(path))
+        for block in iter_vectors(index):
+            block_keys = rng.random(len(block))
+            keys = np.concatenate([keys, block_keys])
+            sample = block if sample is None else np.vstack([sample, block])
+            if len(keys) > size:
+                keep = np.sort(top_k_indices(-keys, size))
+                keys, sample = keys[keep], sample[keep]
+        del index
+    return sample if sample is not None else np.zeros((0, 0), dtype='float32')
+
+
+def merge_saved_indexes(
+    paths: Sequence[Path],
+    index_type: Optional[str] = None,
+    *,
+    n_vectors: int = 0,
+    keep: Optional[Sequence[Optional[np.ndarray]]] = None,
+    ondisk_path: Optional[Path] = None,
+    block_size: int = 65536,
+    **index_kwargs,
+):
+    """
+    One index of index_type holding the vectors of the saved indexes at
+    `paths`, in order (ids follow the concatenation).
+
+    Sources are read one at a time and copied with merge_from (flat into
+    flat) or added from reconstruct_n blocks, so no concatenated copy of
+    the vectors is built. Types that need training are trained first on
+    sample_saved_vectors, at the cost of a second read of each source.
+    n_vectors (the expected total) sizes nlist; it is counted from the
+    sources when not given. keep, one boolean mask (or None for all) per
+    source, drops vectors from the merge, e.g. chunks already indexed from
+    an earlier source.
+
+    With ondisk_path, IVF types are filled shard by shard and their inverted
+    lists merged into that file (FAISS OnDiskInvertedLists), so the result
+    never holds the encoded vectors in RAM; the written index refers to the
+    file by path, so keep the two together.
+    """
+    faiss = _faiss()
+    paths = [Path(p) for p in paths]
+    if not paths:
+        raise ValueError("no indexes to merge")
+    first = faiss.read_index(str(paths[0]))
+    dim = first.d
+    del first
+    if not n_vectors and (index_type or SEARCH_ANN_INDEX).lower() in ("ivf_flat", "ivf_pq"):
+        n_vectors = sum(faiss.read_index(str(path)).ntotal for path in paths)
+    index = create_ann_index(dim, index_type, n_vectors=n_vectors, **index_kwargs)
+
+    if not index.is_trained:
+        train_index(index, sample_saved_vectors(paths, train_size(index)))
+
+    keep = list(keep) if keep is not None else [None] * len(paths)
+    kind = index_type_of(index)
+    if ondisk_path is not None and kind in ("ivf_flat", "ivf_pq"):
+        _merge_ivf_ondisk(index, paths, keep, Path(ondisk_path), block_size)
+    else:
+        for i, (path, mask) in enumerate(zip(paths, keep), 1):
+            source = faiss.read_index(str(path))
+            if (mask is None or mask.all()) and kind == "flat" and isinstance(source, faiss.IndexFlat) \
+                    and source.metric_type == index.metric_type:
+                index.merge_from(source)
+            else:
+                for block in iter_kept_vectors(source, mask, block_size):
+                    index.add(block)
+            LOGGER.info("Merged %s (%d/%d): %d vectors total", path, i, len(paths), index.ntotal)
+            del source
+    set_search_params(index)
+    return index
+
+
+def iter_kept_vectors(index, mask: Optional[np.ndarray], block_size: int = 65536) -> Iterator[np.ndarray]:
+    """iter_vectors restricted to the positions where mask is True (all of them for None)."""
+    for start, block in zip(range(0, index.ntotal, block_size), iter_vectors(index, block_size)):
+        if mask is not None:
+            block = block[mask[start:start + len(block)]]
+        if len(block):
+            yield np.ascontiguousarray(block, dtype='float32')
+
+
+def _merge_ivf_ondisk(index, paths: List[Path], keep: List[Optional[np.ndarray]], ondisk_path: Path,
+                      block_size: int) -> None:
+    faiss = _faiss()
+    from faiss.contrib.ondisk import merge_ondisk
+
+    ondisk_path.parent.mkdir(parents=True, exist_ok=True)
+    if ondisk_path.exists():
+        ondisk_path.unlink()
+    with tempfile.TemporaryDirectory(dir=ondisk_path.parent, prefix=".ivf_shards_") as tmp:
+        shard_paths = []
+        offset = 0
+        for i, (path, mask) in enumerate(zip(paths, keep)):
+            source = faiss.read_index(str(path))
+            shard = faiss.clone_index(index)
+            for block in iter_kept_vectors(source, mask, block_size):
+                ids = np.arange(offset, offset + len(block), dtype='int64')
+                shard.add_with_ids(block, ids)
+                offset += len(block)
+            shard_path = Path(tmp) / f"shard_{i:05d}.index"
+            faiss.write_index(shard, str(shard_path))
+            shard_paths.append(str(shard_path))
+            LOGGER.info("Wrote IVF shard %d/%d (%d vectors)", i + 1, len(paths), shard.ntotal)
+            del source, shard
+        merge_ondisk(index, shard_paths, str(ondisk_path))
+    LOGGER.info("Merged %d vectors into on-disk inverted lists at %s", index.ntotal, ondisk_path)
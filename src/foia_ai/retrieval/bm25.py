@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .topk import select_top_k
+
+LOGGER = logging.getLogger(__name__)
+
+BM25_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# rank_bm25.BM25Okapi defaults, so scores match indexes built before this module
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+DEFAULT_EPSILON = 0.25
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased whitespace tokens, the tokenization the chunk indexes have always used."""
+    return text.lower().split()
+
+
+class BM25IndexBuilder:
+    """
+    Accumulates per-chunk term counts in compact arrays and turns them into
+    a term-major inverted index with build().
+
+    Chunk ids are assigned in add() order, so they line up with the chunk
+    list and the FAISS rows built from the same sequence.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self._terms = array('i')
+        self._tfs = array('i')
+        self._postings_per_doc = array('i')
+        self._doc_len = array('i')
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add_counts(self, counts: Mapping[str, int], length: Optional[int] = None) -> int:
+        vocab = self.vocabulary
+        self._terms.extend(vocab.setdefault(term, len(vocab)) for term in counts)
+        self._tfs.extend(counts.values())
+        self._postings_per_doc.append(len(counts))
+        self._doc_len.append(sum(counts.values()) if length is None else length)
+        return len(self._doc_len) - 1
+
+    def add(self, tokens: Sequence[str]) -> int:
+        return self.add_counts(Counter(tokens), len(tokens))
+
+    def add_texts(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self.add(tokenize(text))
+
+    def build(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B, epsilon: float = DEFAULT_EPSILON) -> BM25Index:
+        n_docs = len(self._doc_len)
+        n_terms = len(self.vocabulary)
+        terms = np.frombuffer(self._terms, dtype=np.int32)
+        tfs = np.frombuffer(self._tfs, dtype=np.int32)
+        doc_of = np.repeat(np.arange(n_docs, dtype=np.uint32), np.frombuffer(self._postings_per_doc, dtype=np.int32))
+
+        # Stable sort keeps each posting list in chunk-id order.
+        order = np.argsort(terms, kind='stable')
+        doc_ids = doc_of[order]
+        tf_dtype = np.uint16 if tfs.size == 0 or tfs.max() <= np.iinfo(np.uint16).max else np.uint32
+        term_tfs = tfs[order].astype(tf_dtype)
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=indptr[1:])
+
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int32).astype(np.uint32)
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        idf = okapi_idf(np.diff(indptr), n_docs, epsilon)
+
+        terms_by_id = [''] * n_terms
+        for term, term_id in self.vocabulary.items():
+            terms_by_id[term_id] = term
+
+        return BM25Index.from_arrays(
+            terms=terms_by_id, indptr=indptr, doc_ids=doc_ids, tfs=term_tfs, doc_len=doc_len, idf=idf,
+            k1=k1, b=b, epsilon=epsilon, avgdl=avgdl,
+        )
+
+
+def okapi_idf(df: np.ndarray, n_docs: int, epsilon: float) -> np.ndarray:
+    """BM25Okapi idf: negative values (terms in over half the chunks) become epsilon * mean idf."""
+    df = np.asarray(df, dtype=np.float64)
+    idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+    if idf.size:
+        idf[idf < 0] = epsilon * idf.mean()
+    return idf.astype(np.float32)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index held in flat numpy arrays.
+
+    Layout (CSR by term, every array memory-mappable):
+        manifest.json   format version, sizes, k1/b/epsilon, avgdl
+        vocab.json      terms in term-id order
+        indptr.npy      (n_terms + 1,) posting list offsets
+        doc_ids.npy     (n_postings,) chunk ids, ascending within each term
+        tfs.npy         (n_postings,) term frequencies (uint16 unless a count overflows)
+        idf.npy         (n_terms,) idf weights
+        max_score.npy   (n_terms,) highest single-chunk score of each term, for pruning
+        doc_norm.npy    (n_docs,) k1 * (1 - b + b * len / avgdl), the length normalisation
+        doc_len.npy     (n_docs,) chunk lengths in tokens
+
+    Queries only read the posting lists of their own terms.
+    """
+
+    def __init__(
+        self,
+        *,
+        vocabulary: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        idf: np.ndarray,
+        max_score: np.ndarray,
+        doc_norm: np.ndarray,
+        doc_len: np.ndarray,
+        manifest: Dict[str, Any],
+        path: Optional[Path] = None,
+    ):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.max_score = max_score
+        self.doc_norm = doc_norm
+        self.doc_len = doc_len
+        self.manifest = manifest
+        self.path = path
+        self.k1 = float(manifest['k1'])
+
+    @classmethod
+    def from_arrays(
+        cls, *, terms: List[str], indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+        doc_len: np.ndarray, idf: np.ndarray, k1: float, b: float, epsilon: float, avgdl: float,
+    ) -> BM25Index:
+        doc_norm = (k1 * (1 - b + b * doc_len / avgdl)).astype(np.float32) if avgdl else np.full(len(doc_len), k1, np.float32)
+        max_score = np.zeros(len(terms), dtype=np.float32)
+        if doc_ids.size:
+            tf = tfs.astype(np.float32)
+            weights = tf * (k1 + 1) / (tf + doc_norm[doc_ids])
+            starts = indptr[:-1]
+            nonempty = starts < indptr[1:]
+            max_score[nonempty] = np.maximum.reduceat(weights, starts[nonempty]) * idf[nonempty]
+        manifest = {
+            'format_version': BM25_FORMAT_VERSION,
+            'n_docs': int(len(doc_len)),
+            'n_terms': len(terms),
+            'n_postings': int(doc_ids.size),
+            'k1': k1,
+            'b': b,
+            'epsilon': epsilon,
+            'avgdl': avgdl,
+            'tokenizer': 'lower-whitespace',
+        }
+        return cls(
+            vocabulary={term: i for i, term in enumerate(terms)},
+            indptr=indptr, doc_ids=doc_ids, tfs=tfs, idf=idf, max_score=max_score,
+            doc_norm=doc_norm, doc_len=doc_len, manifest=manifest,
+        )
+
+    @classmethod
+    def from_okapi(cls, bm25) -> BM25Index:
+        """Convert a pickled rank_bm25.BM25Okapi (its per-chunk term dicts) to the inverted layout."""
+        builder = BM25IndexBuilder()
+        for freqs, length in zip(bm25.doc_freqs, bm25.doc_len):
+            builder.add_counts(freqs, length)
+        return builder.build(k1=bm25.k1, b=bm25.b, epsilon=bm25.epsilon)
+
+    # -- persistence ---------------------------------------------------------
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / MANIFEST_NAME).exists()
+
+    def save(self, path: Path) -> Path:
+        """Write to a sibling temp directory and swap it in, so readers never see a partial index."""
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+        for name in ("indptr", "doc_ids", "tfs", "idf", "max_score", "doc_norm", "doc_len"):
+            np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        terms = [''] * len(self.vocabulary)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        with open(tmp_path / "vocab.json", 'w') as f:
+            json.dump(terms, f)
+        manifest = dict(self.manifest, built_at=time.time())
+        with open(tmp_path / MANIFEST_NAME, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        old = None
+        if path.exists():
+            old = path.with_name(f"{path.name}.old-{os.getpid()}-{int(time.time())}")
+            path.rename(old)
+        tmp_path.rename(path)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        self.path = path
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> BM25Index:
+        path = Path(path)
+        with open(path / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != BM25_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {path}: {manifest.get('format_version')}")
+        mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mode)
+            for name in ("indptr", "doc_ids", "tfs", "idf", "max_score", "doc_norm", "doc_len")
+        }
+        with open(path / "vocab.json") as f:
+            terms = json.load(f)
+        return cls(vocabulary={term: i for i, term in enumerate(terms)}, manifest=manifest, path=path, **arrays)
+
+    # -- querying ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return int(self.manifest['n_docs'])
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = int(self.indptr[term_id]), int(self.indptr[term_id + 1])
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def _term_scores(self, term_id: int, docs: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        tf = tfs.astype(np.float32)
+        return self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norm[docs])
+
+    def _query_terms(self, tokens: Iterable[str]) -> List[Tuple[int, int]]:
+        # Repeated query tokens count once per occurrence, as BM25Okapi.get_scores does.
+        counts = Counter(self.vocabulary[t] for t in tokens if t in self.vocabulary)
+        return list(counts.items())
+
+    def get_scores(self, tokens: Sequence[str]) -> np.ndarray:
+        """Dense score array over every chunk (BM25Okapi.get_scores equivalent)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term_id, weight in self._query_terms(tokens):
+            docs, tfs = self._postings(term_id)
+            scores[docs] += weight * self._term_scores(term_id, docs, tfs)
+        return scores
+
+    def _scored_postings(self, term_id: int, cache: Optional[Dict[int, Tuple[np.ndarray, np.ndarray]]]):
+        """(chunk ids, unweighted scores) of a term's full posting list, memoized in cache when given."""
+        if cache is not None and term_id in cache:
+            return cache[term_id]
+        docs, tfs = self._postings(term_id)
+        scored = (docs, self._term_scores(term_id, docs, tfs))
+        if cache is not None:
+            cache[term_id] = scored
+        return scored
+
+    def search_many(self, token_lists: Sequence[Sequence[str]], top_k: int = 100) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        search() for a batch of tokenized queries, results in input order.
+
+        Posting lists are read and scored at most once per distinct term
+        across the batch, so queries sharing terms (topic sweeps, eval sets)
+        only pay for each term the first time.
+        """
+        cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        return [self.search(tokens, top_k, _cache=cache) for tokens in token_lists]
+
+    def search(self, tokens: Sequence[str], top_k: int = 100, *, _cache=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k chunk ids and scores (descending, scores > 0) for a tokenized query.
+
+        MaxScore, term-at-a-time: terms are taken in decreasing order of their
+        score upper bound and their posting lists are accumulated in full
+        until the bounds of the terms left can no longer lift an unseen chunk
+        above the current k-th score. The remaining (non-essential) terms are
+        then only looked up for surviving candidates, which are re-pruned
+        against the shrinking bound after each term.
+        """
+        terms = self._query_terms(tokens)
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        if not terms or top_k <= 0:
+            return empty
+        bounds = [weight * float(self.max_score[term_id]) for term_id, weight in terms]
+        order = sorted(range(len(terms)), key=lambda i: -bounds[i])
+        remaining = float(sum(bounds))
+
+        cand_docs = np.zeros(0, dtype=np.uint32)
+        cand_scores = np.zeros(0, dtype=np.float32)
+        position = 0
+        while position < len(order):
+            if len(cand_docs) >= top_k and _kth_largest(cand_scores, top_k) >= remaining:
+                break
+            i = order[position]
+            term_id, weight = terms[i]
+            docs, scores = self._scored_postings(term_id, _cache)
+            cand_docs, cand_scores = _merge_scores(cand_docs, cand_scores, docs, weight * scores)
+            remaining -= bounds[i]
+            position += 1
+
+        for i in order[position:]:
+            threshold = _kth_largest(cand_scores, top_k)
+            keep = cand_scores + remaining >= threshold
+            cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+            term_id, weight = terms[i]
+            cached = _cache.get(term_id) if _cache is not None else None
+            docs = cached[0] if cached is not None else self._postings(term_id)[0]
+            if len(docs):
+                slots = np.searchsorted(docs, cand_docs)
+                slots[slots == len(docs)] = 0
+                hit = docs[slots] == cand_docs
+                if hit.any():
+                    if cached is not None:
+                        term_scores = cached[1][slots[hit]]
+                    else:
+                        term_scores = self._term_scores(term_id, cand_docs[hit], self._postings(term_id)[1][slots[hit]])
+                    cand_scores[hit] += weight * term_scores
+            remaining -= bounds[i]
+
+        top, top_scores = select_top_k(cand_scores, top_k, min_score=0)
+        return cand_docs[top].astype(np.int64), top_scores
+
+
+def _kth_largest(scores: np.ndarray, k: int) -> float:
+    if len(scores) < k:
+        return -math.inf
+    return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+
+
+def _merge_scores(
+    docs_a: np.ndarray, scores_a: np.ndarray, docs_b: np.ndarray, scores_b: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum two (sorted chunk ids, scores) accumulators into one sorted by chunk id."""
+    if not len(docs_a):
+        return np.asarray(docs_b, dtype=np.uint32), np.asarray(scores_b, dtype=np.float32)
+    docs = np.concatenate([docs_a, docs_b])
+    unique, inverse = np.unique(docs, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate([scores_a, scores_b]), minlength=len(unique))
+    return unique, scores.astype(np.float32)
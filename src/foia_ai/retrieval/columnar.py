@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+import numpy as np
+from scipy import sparse
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+DELTA_DIR = "deltas"
+SCORE_BLOCK_ROWS = 65536  # embedding rows cast to float32 and scored at a time
+
+PAGE_COLUMNS = (
+    "page_id",
+    "document_id",
+    "page_no",
+    "text",
+    "document_title",
+    "document_external_id",
+    "source_name",
+    "url",
+    "extraction_method",
+    "word_count",
+    "content_hash",
+)
+
+
+def exact_text_hash(text: Optional[str]) -> str:
+    """sha1 of the text exactly as stored (None counts as ""); see dedup.normalized_text_hash for the normalized key."""
+    return hashlib.sha1((text or "").encode('utf-8')).hexdigest()
+
+
+class PageStore:
+    """
+    Page metadata and text in a read-only SQLite sidecar, addressed by row
+    number (the row of the page in the embedding and TF-IDF matrices).
+
+    Only the rows a query returns are read, and every process opening the
+    same file shares the OS page cache instead of holding its own copy.
+
+    The file is opened once, here, and that one connection (serialized by a
+    lock) serves every thread: it stays bound to the file this index was
+    opened with even after commit() renames a newer index over the path or
+    a merge deletes the delta directory.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        self._len = self._query("SELECT COUNT(*) FROM pages")[0][0]
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            if self._db is None:
+                raise ValueError(f"PageStore {self.path} is closed")
+            return self._db.execute(sql, params).fetchall()
+
+    def _iter_query(self, sql: str, batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """Stream a query's rows, holding the lock only while each batch is fetched."""
+        with self._lock:
+            if self._db is None:
+                raise ValueError(f"PageStore {self.path} is closed")
+            cursor = self._db.execute(sql)
+        while True:
+            with self._lock:
+                chunk = cursor.fetchmany(batch_size)
+            if not chunk:
+                return
+            yield from chunk
+
+    @staticmethod
+    def create(path: Path, rows: Iterable[Dict[str, Any]], batch_size: int = 2000) -> int:
+        """Write page rows (dicts keyed by PAGE_COLUMNS) in iteration order. Returns row count."""
+        conn = sqlite3.connect(str(path))
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE pages (row INTEGER PRIMARY KEY, page_id INTEGER, document_id INTEGER, "
+                "page_no INTEGER, text TEXT, document_title TEXT, document_external_id TEXT, "
+                "source_name TEXT, url TEXT, extraction_method TEXT, word_count INTEGER, content_hash TEXT)"
+            )
+            insert = (
+                f"INSERT INTO pages (row, {', '.join(PAGE_COLUMNS)}) "
+                f"VALUES (?{', ?' * len(PAGE_COLUMNS)})"
+            )
+            count = 0
+            batch: List[tuple] = []
+            for row in rows:
+                if row.get('content_hash') is None:
+                    row = dict(row, content_hash=exact_text_hash(row.get('text')))
+                batch.append((count,) + tuple(row.get(col) for col in PAGE_COLUMNS))
+                count += 1
+                if len(batch) >= batch_size:
+                    conn.executemany(insert, batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert, batch)
+            conn.execute("CREATE INDEX ix_pages_page_id ON pages (page_id)")
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row < 0:
+            row += self._len
+        found = self.get_many([row])
+        if not found:
+            raise IndexError(row)
+        return found[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for rec in self._iter_query(f"SELECT {', '.join(PAGE_COLUMNS)} FROM pages ORDER BY row"):
+            yield dict(rec)
+
+    def get_many(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Fetch several rows in one query, returned in the order requested."""
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        placeholders = ", ".join("?" * len(rows))
+        records = self._query(
+            f"SELECT row, {', '.join(PAGE_COLUMNS)} FROM pages WHERE row IN ({placeholders})", rows
+        )
+        by_row = {rec['row']: {col: rec[col] for col in PAGE_COLUMNS} for rec in records}
+        return [by_row[r] for r in rows if r in by_row]
+
+    def iter_hashes(self) -> Iterator[tuple]:
+        """(row, page_id, content_hash) for every row, in row order."""
+        return (tuple(rec) for rec in self._iter_query("SELECT row, page_id, content_hash FROM pages ORDER BY row"))
+
+    def iter_texts(self, batch_size: int = 1000) -> Iterator[str]:
+        for (text,) in self._iter_query("SELECT text FROM pages ORDER BY row", batch_size):
+            yield text or ""
+
+    def summary(self) -> Dict[str, int]:
+        total_words, documents, sources = self._query(
+            "SELECT COALESCE(SUM(word_count), 0), COUNT(DISTINCT document_id), COUNT(DISTINCT source_name) FROM pages"
+        )[0]
+        return {'total_words': total_words, 'documents': documents, 'sources': sources}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class ColumnarIndexWriter:
+    """
+    Builds an index directory next to the live one and swaps it in on commit().
+
+    Layout:
+        manifest.json        format version, shapes, dtypes, TF-IDF params
+        pages.sqlite         PageStore sidecar
+        embeddings.npy       (n_pages, dim) L2-normalized, float32 or float16
+        tfidf_data.npy       CSR data     }
+        tfidf_indices.npy    CSR indices  } of the L2-normalized TF-IDF matrix
+        tfidf_indptr.npy     CSR indptr   }
+        tfidf_idf.npy        vectorizer idf_ weights
+        tfidf_vocab.json     vectorizer vocabulary_
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        if self.tmp_path.exists():
+            shutil.rmtree(self.tmp_path)
+        self.tmp_path.mkdir(parents=True)
+        self.manifest: Dict[str, Any] = {'format_version': INDEX_FORMAT_VERSION}
+        self._embeddings: Optional[np.memmap] = None
+
+    def write_pages(self, rows: Iterable[Dict[str, Any]]) -> PageStore:
+        page_ids: List[int] = []
+
+        def track(it: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for row in it:
+                page_ids.append(row['page_id'])
+                yield row
+
+        count = PageStore.create(self.tmp_path / "pages.sqlite", track(rows))
+        np.save(self.tmp_path / "page_ids.npy", np.asarray(page_ids, dtype=np.int64))
+        self.manifest['n_pages'] = count
+        self.manifest['max_page_id'] = int(max(page_ids)) if page_ids else 0
+        return PageStore(self.tmp_path / "pages.sqlite")
+
+    def write_deleted(self, page_ids: Iterable[int]) -> None:
+        """Page ids that earlier segments still hold but the database no longer has."""
+        np.save(self.tmp_path / "deleted.npy", np.asarray(sorted(page_ids), dtype=np.int64))
+
+    def write_tfidf(self, vectorizer, matrix, params: Dict[str, Any]) -> None:
+        matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        matrix.sort_indices()
+        np.save(self.tmp_path / "tfidf_data.npy", matrix.data)
+        # Same dtype for both so scipy doesn't upcast (and copy) the mapped indices on load.
+        index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+        np.save(self.tmp_path / "tfidf_indices.npy", matrix.indices.astype(index_dtype))
+        np.save(self.tmp_path / "tfidf_indptr.npy", matrix.indptr.astype(index_dtype))
+        np.save(self.tmp_path / "tfidf_idf.npy", np.asarray(vectorizer.idf_, dtype=np.float64))
+        with open(self.tmp_path / "tfidf_vocab.json", 'w') as f:
+            json.dump({term: int(col) for term, col in vectorizer.vocabulary_.items()}, f)
+        self.manifest['tfidf'] = {'shape': list(matrix.shape), 'nnz': int(matrix.nnz), 'params': params}
+
+    def open_embeddings(self, n_rows: int, dim: int, dtype: str = "float32") -> np.memmap:
+        """Writable memmap for embeddings; fill it in batches, rows must be L2-normalized."""
+        self._embeddings = np.lib.format.open_memmap(
+            self.tmp_path / "embeddings.npy", mode='w+', dtype=np.dtype(dtype), shape=(n_rows, dim)
+        )
+        self.manifest['embeddings'] = {'shape': [n_rows, dim], 'dtype': str(np.dtype(dtype))}
+        return self._embeddings
+
+    def write_embeddings(self, embeddings: np.ndarray, dtype: str = "float32") -> None:
+        out = self.open_embeddings(embeddings.shape[0], embeddings.shape[1], dtype)
+        out[:] = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+
+    def commit(self, **extra: Any) -> Path:
+        if self._embeddings is not None:
+            self._embeddings.flush()
+            self._embeddings = None
+        self.manifest.update(extra)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest['built_at'] = time.time()
+        with open(self.tmp_path / MANIFEST_NAME, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+
+        old = None
+        if self.path.exists():
+            old = self.path.with_name(f"{self.path.name}.old-{os.getpid()}-{int(time.time())}")
+            self.path.rename(old)
+        self.tmp_path.rename(self.path)
+        if old is not None:
+            # Readers that already mmap'd the old files keep their (unlinked) inodes.
+            shutil.rmtree(old, ignore_errors=True)
+        LOGGER.info("Published columnar index at %s", self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._embeddings = None
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class ColumnarIndex:
+    """Read side of the columnar format: everything large is memory-mapped, nothing is unpickled."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_NAME) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar index version in {self.path}: {self.manifest.get('format_version')}")
+
+        self.pages = PageStore(self.path / "pages.sqlite")
+        self.page_ids: np.ndarray = np.load(self.path / "page_ids.npy", mmap_mode='r')
+        self.deleted: np.ndarray = np.zeros(0, dtype=np.int64)
+        if (self.path / "deleted.npy").exists():
+            self.deleted = np.load(self.path / "deleted.npy")
+
+        self.embeddings: Optional[np.ndarray] = None
+        if (self.path / "embeddings.npy").exists():
+            self.embeddings = np.load(self.path / "embeddings.npy", mmap_mode='r')
+
+        self.tfidf_matrix: Optional[sparse.csr_matrix] = None
+        self.tfidf_vocabulary: Dict[str, int] = {}
+        self.tfidf_idf: Optional[np.ndarray] = None
+        if 'tfidf' in self.manifest:
+            shape = tuple(self.manifest['tfidf']['shape'])
+            data = np.load(self.path / "tfidf_data.npy", mmap_mode='r')
+            indices = np.load(self.path / "tfidf_indices.npy", mmap_mode='r')
+            indptr = np.load(self.path / "tfidf_indptr.npy", mmap_mode='r')
+            self.tfidf_matrix = sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+            self.tfidf_idf = np.load(self.path / "tfidf_idf.npy")
+            with open(self.path / "tfidf_vocab.json") as f:
+                self.tfidf_vocabulary = json.load(f)
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / MANIFEST_NAME).exists()
+
+    @property
+    def max_page_id(self) -> int:
+        return int(self.manifest.get('max_page_id', 0))
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def close(self) -> None:
+        self.pages.close()
+
+
+def list_delta_paths(base_path: Path) -> List[Path]:
+    delta_root = Path(base_path) / DELTA_DIR
+    if not delta_root.exists():
+        return []
+    return sorted(p for p in delta_root.iterdir() if p.name.isdigit() and ColumnarIndex.exists(p))
+
+
+class SegmentedPages:
+    """PageStore-like view over every segment, addressed by global row number."""
+
+    def __init__(self, index: SegmentedIndex):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.live_count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Live rows only, oldest segment first."""
+        for seg, dead in zip(self._index.segments, self._index.segment_dead_masks()):
+            for local_row, page in enumerate(seg.pages):
+                if not dead[local_row]:
+                    yield page
+
+    def get_many(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        by_row: Dict[int, Dict[str, Any]] = {}
+        for seg_no, local_rows, global_rows in self._index.split_rows(rows):
+            for g, page in zip(global_rows, self._index.segments[seg_no].pages.get_many(local_rows)):
+                by_row[g] = page
+        return [by_row[int(r)] for r in rows if int(r) in by_row]
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        found = self.get_many([row])
+        if not found:
+            raise IndexError(row)
+        return found[0]
+
+    def summary(self) -> Dict[str, int]:
+        total_words = 0
+        documents: Set[int] = set()
+        sources: Set[str] = set()
+        for seg, dead in zip(self._index.segments, self._index.segment_dead_masks()):
+            dead_rows = set(np.nonzero(dead)[0].tolist())
+            for row, document_id, source_name, word_count in seg.pages._iter_query(
+                "SELECT row, document_id, source_name, word_count FROM pages"
+            ):
+                if row in dead_rows:
+                    continue
+                total_words += word_count or 0
+                documents.add(document_id)
+                sources.add(source_name)
+        return {'total_words': total_words, 'documents': len(documents), 'sources': len(sources)}
+
+    def close(self) -> None:
+        for seg in self._index.segments:
+            seg.close()
+
+
+class SegmentedIndex:
+    """
+    A base segment plus append-only delta segments under <base>/deltas/.
+
+    Deltas are scored with the base segment's TF-IDF vocabulary, so they can
+    be added without refitting; a row is dead once a newer segment holds the
+    same page_id or lists it as deleted. merge consolidates everything into
+    a new base (see HybridRetriever.merge_segments).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.base = ColumnarIndex(self.path)
+        self.deltas = [ColumnarIndex(p) for p in list_delta_paths(self.path)]
+        self.segments: List[ColumnarIndex] = [self.base] + self.deltas
+        self.offsets = np.cumsum([0] + [len(seg) for seg in self.segments])
+
+        masks: List[np.ndarray] = []
+        shadowed = np.zeros(0, dtype=np.int64)
+        for seg in reversed(self.segments):
+            ids = np.asarray(seg.page_ids)
+            masks.append(np.isin(ids, shadowed) if len(shadowed) else np.zeros(len(ids), dtype=bool))
+            shadowed = np.union1d(shadowed, np.union1d(ids, seg.deleted))
+        masks.reverse()
+        self.dead = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+        self.live_count = int(len(self.dead) - self.dead.sum())
+        self.pages = SegmentedPages(self)
+
+    @property
+    def max_page_id(self) -> int:
+        return max(seg.max_page_id for seg in self.segments)
+
+    @property
+    def delta_rows(self) -> int:
+        return int(sum(len(seg) for seg in self.deltas))
+
+    def segment_dead_masks(self) -> List[np.ndarray]:
+        return [self.dead[self.offsets[i]:self.offsets[i + 1]] for i in range(len(self.segments))]
+
+    def split_rows(self, rows: Sequence[int]) -> Iterator[tuple]:
+        """Group global rows by segment: yields (segment_no, local_rows, global_rows)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        seg_nos = np.searchsorted(self.offsets, rows, side='right') - 1
+        for seg_no in np.unique(seg_nos):
+            selected = rows[seg_nos == seg_no]
+            yield int(seg_no), (selected - self.offsets[seg_no]).tolist(), selected.tolist()
+
+    def live_hashes(self) -> Dict[int, str]:
+        """page_id -> content_hash for every live row."""
+        hashes: Dict[int, str] = {}
+        for seg, dead in zip(self.segments, self.segment_dead_masks()):
+            for row, page_id, digest in seg.pages.iter_hashes():
+                if not dead[row]:
+                    hashes[page_id] = digest
+        return hashes
+
+    def tfidf_scores(self, query_vector) -> np.ndarray:
+        return self.tfidf_scores_many(query_vector)[0]
+
+    def tfidf_scores_many(self, query_vectors) -> np.ndarray:
+        """(n_queries, n_rows) scores for a sparse matrix of query vectors, one sparse product per segment."""
+        parts = []
+        for seg in self.segments:
+            if seg.tfidf_matrix is None:
+                parts.append(np.zeros((query_vectors.shape[0], len(seg)), dtype=np.float32))
+            else:
+                parts.append((query_vectors @ seg.tfidf_matrix.T).toarray().astype(np.float32, copy=False))
+        return np.concatenate(parts, axis=1)
+
+    def embedding_scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        return self.embedding_scores_many(np.asarray(query_embedding)[None, :])[0]
+
+    def embedding_scores_many(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """
+        (n_queries, n_rows) float32 dot products, computed per segment in
+        blocks of SCORE_BLOCK_ROWS rows. Only one block of a float16 matrix
+        is cast to float32 at a time, so scoring never materializes a float32
+        copy of the whole memmap.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        scores = np.zeros((len(queries), int(self.offsets[-1])), dtype=np.float32)
+        for offset, seg in zip(self.offsets, self.segments):
+            if seg.embeddings is None:
+                continue
+            for start in range(0, len(seg), SCORE_BLOCK_ROWS):
+                block = np.asarray(seg.embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+                scores[:, offset + start:offset + start + len(block)] = queries @ block.T
+        return scores
+
+    def close(self) -> None:
+        self.pages.close()
+
+
+@contextmanager
+def index_lock(path: Path):
+    """Exclusive cross-process lock serializing index writers (updates and merges)."""
+    lock_path = Path(path).with_name(Path(path).name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine similarity becomes a dot product."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
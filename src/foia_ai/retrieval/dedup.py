@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_chunk_text(text: str) -> str:
+    """NFKC, case-folded, whitespace collapsed: re-OCRed or re-flowed copies of a passage compare equal."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def normalized_text_hash(text: str) -> str:
+    """sha1 of normalize_chunk_text(text): the dedup key, equal for reflowed copies (not an embedding key)."""
+    return hashlib.sha1(normalize_chunk_text(text).encode('utf-8')).hexdigest()
+
+
+def unique_documents(documents: Iterable[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    (kept, skipped): documents whose 'sha256' was already seen are skipped,
+    keeping the first copy. Documents without a hash are always kept.
+    """
+    seen = set()
+    kept: List[Dict] = []
+    skipped: List[Dict] = []
+    for doc in documents:
+        sha256 = doc.get('sha256')
+        if sha256 and sha256 in seen:
+            skipped.append(doc)
+            continue
+        if sha256:
+            seen.add(sha256)
+        kept.append(doc)
+    return kept, skipped
+
+
+class ChunkDeduplicator:
+    """
+    Gives every distinct chunk text (by normalized_text_hash) the next position and
+    maps repeats to the position of its first occurrence.
+
+    Index builders append only the new chunks, so positions are the ids
+    of the chunks' vectors and BM25 rows; duplicates are recorded against
+    the shared position instead of being embedded again.
+    """
+
+    def __init__(self):
+        self._positions: Dict[str, int] = {}
+        self.duplicates = 0
+
+    def add(self, text: str) -> Tuple[int, bool]:
+        """(position, is_new) for text."""
+        key = normalized_text_hash(text)
+        position = self._positions.get(key)
+        if position is not None:
+            self.duplicates += 1
+            return position, False
+        position = len(self._positions)
+        self._positions[key] = position
+        return position, True
+
+    def add_many(self, texts: Iterable[str]) -> List[Tuple[int, bool]]:
+        """(position, is_new) for each text, like add(); every text is hashed before any is registered."""
+        keys = [normalized_text_hash(text) for text in texts]
+        results = []
+        for key in keys:
+            position = self._positions.get(key)
+            if position is not None:
+                self.duplicates += 1
+                results.append((position, False))
+            else:
+                position = len(self._positions)
+                self._positions[key] = position
+                results.append((position, True))
+        return results
+
+    def lookup(self, text: str) -> Optional[int]:
+        return self._positions.get(normalized_text_hash(text))
+
+    @property
+    def unique(self) -> int:
+        return len(self._positions)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import QUERY_EMBEDDING_CACHE_PATH, QUERY_EMBEDDING_CACHE_SIZE
+from .columnar import exact_text_hash
+from .vector_store import SQLiteVectorStore
+
+LOGGER = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key text: NFC, trimmed, inner whitespace collapsed (case is kept; cased models see it)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class QueryEmbeddingCache:
+    """
+    Embeddings of query (and lookup) texts keyed by (model name, normalized text).
+
+    An in-memory LRU of max_entries vectors sits in front of an optional
+    SQLite file, so repeated queries skip the encoder within a process and,
+    with a path configured, across restarts and between processes. Vectors
+    are stored exactly as model.encode returns them; callers normalize as
+    before.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE, path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self._entries: OrderedDict[Tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk = SQLiteVectorStore(self.path, "query_embeddings") if self.path is not None else None
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        vector.flags.writeable = False
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load_from_disk(self, model_name: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._disk is None or not keys:
+            return {}
+        hashes = {exact_text_hash(key): key for key in keys}
+        return {hashes[text_hash]: vector.copy() for text_hash, vector in self._disk.get_many(model_name, list(hashes)).items()}
+
+    def _store_on_disk(self, model_name: str, vectors: Dict[str, np.ndarray]) -> None:
+        if self._disk is None:
+            return
+        self._disk.put_many(
+            model_name, {exact_text_hash(key): vector for key, vector in vectors.items()}, replace=True
+        )
+
+    def encode(self, model: Any, model_name: str, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        """
+        (len(texts), dim) float32 embeddings in input order; only texts
+        missing from both tiers reach model.encode, in a single call.
+        """
+        keys = [normalize_query(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        pending: List[str] = []
+        with self._lock:
+            for key in keys:
+                if key in vectors:
+                    continue
+                vector = self._entries.get((model_name, key))
+                if vector is not None:
+                    self._entries.move_to_end((model_name, key))
+                    vectors[key] = vector
+                    self.hits += 1
+                elif key not in pending:
+                    pending.append(key)
+
+        if pending:
+            from_disk = self._load_from_disk(model_name, pending)
+            for key, vector in from_disk.items():
+                self._remember((model_name, key), vector)
+                vectors[key] = vector
+            self.disk_hits += len(from_disk)
+            pending = [key for key in pending if key not in from_disk]
+
+        if pending:
+            self.misses += len(pending)
+            encoded = np.asarray(model.encode(pending, batch_size=batch_size, convert_to_numpy=True), dtype=np.float32)
+            fresh = {key: encoded[i].copy() for i, key in enumerate(pending)}
+            for key, vector in fresh.items():
+                self._remember((model_name, key), vector)
+            vectors.update(fresh)
+            try:
+                self._store_on_disk(model_name, fresh)
+            except sqlite3.Error as e:
+                LOGGER.warning("Could not persist query embeddings to %s: %s", self.path, e)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def encode_one(self, model: Any, model_name: str, text: str) -> np.ndarray:
+        return self.encode(model, model_name, [text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            'persistent': str(self.path) if self.path else None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """The process-wide cache shared by every search entry point."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_PATH or None)
+        return _cache
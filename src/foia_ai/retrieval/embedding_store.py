@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from ..config import CHUNK_EMBEDDING_STORE_PATH
+from .columnar import exact_text_hash
+from .vector_store import SQLiteVectorStore
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ChunkEmbeddingStore:
+    """
+    Persistent embeddings of index chunks keyed by (model name,
+    exact_text_hash of the chunk), in one SQLite file. The key is the exact
+    text, not dedup's normalized hash: two texts that only normalize alike
+    can still embed differently.
+
+    Index builders encode through encode(): texts already in the store are
+    read back and only the rest reach model.encode, so rebuilding with new
+    chunking, a new merge layout or a new index type re-embeds only text
+    that was never seen. Vectors are stored exactly as model.encode returns
+    them (float32); callers normalize as before. Several builder processes
+    can share the file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._vectors = SQLiteVectorStore(self.path, "chunk_embeddings", timeout=60)
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, model: Any, model_name: str, texts: Sequence[str], **encode_kwargs) -> np.ndarray:
+        """
+        (len(texts), dim) float32 embeddings in input order. Texts missing
+        from the store (each distinct one once) go to model.encode in a
+        single call with encode_kwargs, then are saved.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        hashes = [exact_text_hash(text) for text in texts]
+        vectors = self._vectors.get_many(model_name, hashes)
+        self.hits += sum(1 for text_hash in hashes if text_hash in vectors)
+
+        pending: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in vectors and text_hash not in pending:
+                pending[text_hash] = text
+        if pending:
+            self.misses += len(pending)
+            encoded = np.asarray(model.encode(list(pending.values()), **encode_kwargs), dtype=np.float32)
+            fresh = {text_hash: encoded[i] for i, text_hash in enumerate(pending)}
+            try:
+                self._vectors.put_many(model_name, fresh)
+            except sqlite3.Error as e:
+                LOGGER.warning("Could not save chunk embeddings to %s: %s", self.path, e)
+            vectors.update(fresh)
+
+        return np.stack([vectors[text_hash] for text_hash in hashes])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_store: Optional[ChunkEmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_embedding_store() -> Optional[ChunkEmbeddingStore]:
+    """The process-wide store at CHUNK_EMBEDDING_STORE_PATH, or None when that is empty (disabled)."""
+    global _store
+    if not CHUNK_EMBEDDING_STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ChunkEmbeddingStore(Path(CHUNK_EMBEDDING_STORE_PATH))
+        return _store
+
+
+def encode_chunks(model: Any, model_name: str, texts: Sequence[str], **encode_kwargs) -> np.ndarray:
+    """model.encode(texts, **encode_kwargs) as float32, served from the chunk embedding store when enabled."""
+    store = get_chunk_embedding_store()
+    if store is None:
+        return np.asarray(model.encode(list(texts), **encode_kwargs), dtype=np.float32)
+    return store.encode(model, model_name, texts, **encode_kwargs)
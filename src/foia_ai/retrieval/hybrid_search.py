@@ -2,19 +2,65 @@ from __future__ import annotations
 
 import logging
 import pickle
+import threading
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Iterator, Sequence
 import numpy as np
 
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sentence_transformers import SentenceTransformer
 
+from ..config import RETRIEVAL_EMBEDDING_DTYPE
 from ..storage.db import get_session
-from ..storage.models import Document, Page
+from ..storage.models import Document, Page, Source
+from .columnar import (
+    DELTA_DIR,
+    ColumnarIndex,
+    ColumnarIndexWriter,
+    PageStore,
+    SegmentedIndex,
+    exact_text_hash,
+    index_lock,
+    list_delta_paths,
+    normalize_rows,
+)
+from .embedding_cache import get_query_embedding_cache
+from .embedding_store import encode_chunks
+from .topk import top_k_indices
 
 LOGGER = logging.getLogger(__name__)
 
+TFIDF_PARAMS: Dict[str, Any] = {
+    'max_features': 10000,
+    'stop_words': 'english',
+    'ngram_range': (1, 2),  # Include bigrams for better phrase matching
+    'min_df': 1,  # Keep rare terms (important for specialized documents)
+    'max_df': 0.95,  # Remove very common terms
+    'sublinear_tf': True,  # Use log scaling (similar to BM25)
+    'norm': 'l2',
+}
+
+
+def _restore_vectorizer(vocabulary: Dict[str, int], idf: np.ndarray, params: Dict[str, Any]) -> TfidfVectorizer:
+    """Rebuild a fitted TfidfVectorizer from its vocabulary and idf weights."""
+    params = dict(params)
+    params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(vocabulary=vocabulary, **params)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def _batched_texts(texts: Iterator[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class HybridRetriever:
     """
@@ -24,21 +70,41 @@ class HybridRetriever:
     - BM25 for lexical matching (keyword-based)
     - Dense embeddings for semantic similarity
     - Hybrid scoring for best of both worlds
+    
+    The index lives in a columnar directory (see retrieval.columnar): the
+    embeddings and TF-IDF CSR arrays are memory-mapped .npy files and page
+    metadata sits in a SQLite sidecar, so loading is near-instant and every
+    worker process shares one copy through the OS page cache.
+    
+    update_index() appends new or changed pages as delta segments instead of
+    rebuilding; merge_segments() folds the deltas back into the base.
     """
     
-    def __init__(self, embedding_model: str = "all-MiniLM-L6-v2", cache_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        embedding_model: str = "all-MiniLM-L6-v2",
+        cache_dir: Optional[Path] = None,
+        embedding_dtype: Optional[str] = None,
+    ):
         self.embedding_model_name = embedding_model
         self.cache_dir = cache_dir or Path("data/retrieval_cache")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.embedding_dtype = embedding_dtype or RETRIEVAL_EMBEDDING_DTYPE
         
         self.tfidf_vectorizer: Optional[TfidfVectorizer] = None
         self.tfidf_matrix: Optional[Any] = None
         self.embedding_model: Optional[SentenceTransformer] = None
         self.embeddings: Optional[np.ndarray] = None
         
-        self.pages: List[Dict] = []
-        self.page_texts: List[str] = []
+        self.index: Optional[SegmentedIndex] = None
+        self.pages: Sequence[Dict] = []
+        self._merge_thread: Optional[threading.Thread] = None
+        self._opened_signature: Optional[Tuple] = None
+        self._snapshot: Optional[Tuple[SegmentedIndex, TfidfVectorizer]] = None
         
+        self.index_dir = self.cache_dir / "index"
+        
+        # Pre-columnar pickle caches, read once by _migrate_legacy_caches
         self.tfidf_cache = self.cache_dir / "tfidf_vectorizer.pkl"
         self.tfidf_matrix_cache = self.cache_dir / "tfidf_matrix.pkl"
         self.embeddings_cache = self.cache_dir / "embeddings.pkl"
@@ -46,123 +112,326 @@ class HybridRetriever:
     
     def build_index(self, force_rebuild: bool = False) -> None:
         """Build or load the retrieval index from the database."""
-        LOGGER.info("Building hybrid retrieval index...")
+        if not force_rebuild and ColumnarIndex.exists(self.index_dir):
+            try:
+                self._open_index()
+                LOGGER.info("Loaded columnar index: %d pages", len(self.pages))
+                return
+            except (ValueError, OSError) as e:
+                LOGGER.warning("Columnar index at %s unreadable (%s); rebuilding", self.index_dir, e)
         
-        self._load_corpus()
-        
-        if not self.page_texts:
-            LOGGER.warning("No pages found in database")
-            return
+        LOGGER.info("Building hybrid retrieval index...")
         
-        self._build_tfidf_index(force_rebuild)
+        with index_lock(self.index_dir):
+            if not force_rebuild and self._legacy_caches_exist():
+                self._migrate_legacy_caches()
+            elif not self._build_columnar_index():
+                LOGGER.warning("No pages found in database")
+                return
         
-        self._build_embedding_index(force_rebuild)
+        self._open_index()
         
         LOGGER.info("Hybrid index built successfully: %d pages indexed", len(self.pages))
     
-    def _load_corpus(self) -> None:
-        """Load page corpus from database."""
-        if self.corpus_cache.exists():
-            LOGGER.info("Loading corpus from cache...")
-            with open(self.corpus_cache, 'rb') as f:
-                data = pickle.load(f)
-                self.pages = data['pages']
-                self.page_texts = data['page_texts']
+    def _open_index(self) -> None:
+        previous = self.index
+        self._opened_signature = self._index_signature()
+        self.index = SegmentedIndex(self.index_dir)
+        base = self.index.base
+        self.pages = self.index.pages
+        # Base-segment arrays; delta segments are scored through self.index.
+        self.tfidf_matrix = base.tfidf_matrix
+        self.embeddings = base.embeddings
+        self.tfidf_vectorizer = _restore_vectorizer(
+            base.tfidf_vocabulary, base.tfidf_idf, base.manifest['tfidf']['params']
+        )
+        # Single attribute so a search never mixes segments from before and after a merge.
+        self._snapshot = (self.index, self.tfidf_vectorizer)
+        if previous is not None:
+            previous.close()
+    
+    def _iter_corpus_rows(self, after_id: int = 0, page_ids: Optional[Sequence[int]] = None) -> Iterator[Dict]:
+        """
+        Stream non-empty pages with their document/source metadata from the database,
+        optionally only those with id > after_id or (in chunks) those in page_ids.
+        """
+        if page_ids is not None:
+            for start in range(0, len(page_ids), 500):
+                yield from self._query_corpus_rows(after_id, page_ids[start:start + 500])
             return
-        
-        LOGGER.info("Loading corpus from database...")
+        yield from self._query_corpus_rows(after_id, None)
+    
+    def _query_corpus_rows(self, after_id: int, page_ids: Optional[Sequence[int]]) -> Iterator[Dict]:
         with get_session() as session:
-            pages = session.query(Page).filter(Page.text.isnot(None)).all()
-            
-            self.pages = []
-            self.page_texts = []
-            
-            for page in pages:
-                if not page.text or not page.text.strip():
+            rows = (
+                session.query(
+                    Page.id, Page.document_id, Page.page_no, Page.text, Page.ocr_confidence,
+                    Document.title, Document.external_id, Document.url, Source.name,
+                )
+                .join(Document, Page.document_id == Document.id)
+                .join(Source, Document.source_id == Source.id)
+                .filter(Page.text.isnot(None), Page.id > after_id)
+            )
+            if page_ids is not None:
+                rows = rows.filter(Page.id.in_(page_ids))
+            rows = rows.order_by(Page.id).yield_per(1000)
+            for page_id, document_id, page_no, text, ocr_conf, title, external_id, url, source_name in rows:
+                if not text.strip():
                     continue
-                
-                doc = page.document
-                page_data = {
-                    'page_id': page.id,
-                    'document_id': doc.id,
-                    'page_no': page.page_no,
-                    'text': page.text,
-                    'document_title': doc.title,
-                    'document_external_id': doc.external_id,
-                    'source_name': doc.source.name,
-                    'url': doc.url,
-                    'extraction_method': 'OCR' if page.ocr_confidence else 'Text',
-                    'word_count': len(page.text.split())
+                yield {
+                    'page_id': page_id,
+                    'document_id': document_id,
+                    'page_no': page_no,
+                    'text': text,
+                    'document_title': title,
+                    'document_external_id': external_id,
+                    'source_name': source_name,
+                    'url': url,
+                    'extraction_method': 'OCR' if ocr_conf else 'Text',
+                    'word_count': len(text.split()),
+                    'content_hash': exact_text_hash(text),
                 }
-                
-                self.pages.append(page_data)
-                self.page_texts.append(page.text)
-        
-        with open(self.corpus_cache, 'wb') as f:
-            pickle.dump({
-                'pages': self.pages,
-                'page_texts': self.page_texts
-            }, f)
-        
-        LOGGER.info("Loaded %d pages from database", len(self.pages))
-    
-    def _build_tfidf_index(self, force_rebuild: bool = False) -> None:
-        """Build TF-IDF index for lexical matching."""
-        if not force_rebuild and self.tfidf_cache.exists() and self.tfidf_matrix_cache.exists():
-            LOGGER.info("Loading TF-IDF index from cache...")
-            with open(self.tfidf_cache, 'rb') as f:
-                self.tfidf_vectorizer = pickle.load(f)
-            with open(self.tfidf_matrix_cache, 'rb') as f:
-                self.tfidf_matrix = pickle.load(f)
-            return
+    
+    def _get_embedding_model(self) -> SentenceTransformer:
+        if self.embedding_model is None:
+            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        return self.embedding_model
+    
+    def _build_columnar_index(self) -> bool:
+        """Build the full index from the database. Returns False if there were no pages."""
+        writer = ColumnarIndexWriter(self.index_dir)
+        try:
+            LOGGER.info("Loading corpus from database...")
+            store = writer.write_pages(self._iter_corpus_rows())
+            n_pages = len(store)
+            if not n_pages:
+                writer.abort()
+                return False
+            LOGGER.info("Loaded %d pages from database", n_pages)
+            
+            LOGGER.info("Building TF-IDF index...")
+            vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+            matrix = vectorizer.fit_transform(store.iter_texts())
+            writer.write_tfidf(vectorizer, matrix, TFIDF_PARAMS)
+            LOGGER.info("TF-IDF index built: %d features", len(vectorizer.vocabulary_))
+            
+            LOGGER.info("Building embedding index with model: %s", self.embedding_model_name)
+            dim = self._embed_pages(writer, store)
+            store.close()
+            
+            writer.commit(embedding_model=self.embedding_model_name)
+            LOGGER.info("Embeddings built: shape (%d, %d)", n_pages, dim)
+            return True
+        except Exception:
+            writer.abort()
+            raise
+    
+    def _embed_pages(self, writer: ColumnarIndexWriter, store: PageStore, batch_size: int = 32) -> int:
+        """Encode every page in `store` into the writer's embeddings memmap. Returns the dimension."""
+        model = self._get_embedding_model()
+        dim = model.get_sentence_embedding_dimension()
+        out = writer.open_embeddings(len(store), dim, self.embedding_dtype)
+        row = 0
+        for batch in _batched_texts(store.iter_texts(), batch_size):
+            # pages embedded by an earlier build or delta come from the chunk embedding store
+            batch_embeddings = encode_chunks(model, self.embedding_model_name, batch, show_progress_bar=False)
+            out[row:row + len(batch)] = normalize_rows(batch_embeddings)
+            row += len(batch)
+        return dim
+    
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    
+    def update_index(
+        self,
+        *,
+        detect_changes: bool = False,
+        merge: bool = True,
+        background_merge: bool = True,
+        max_deltas: int = 8,
+        merge_ratio: float = 0.1,
+    ) -> Dict[str, int]:
+        """
+        Index only what changed since the last build, as a new delta segment.
         
-        LOGGER.info("Building TF-IDF index...")
+        Pages with id above the highest indexed Page.id are always picked up.
+        With detect_changes, every indexed page's text is re-hashed against the
+        stored content hash (a text scan, no embedding) so edited pages are
+        re-embedded and removed pages are dropped. Deltas reuse the base
+        TF-IDF vocabulary; once there are max_deltas of them, or they hold
+        more than merge_ratio of the base rows, they are merged (in a
+        background thread unless background_merge=False).
         
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=10000,
-            stop_words='english',
-            ngram_range=(1, 2),  # Include bigrams for better phrase matching
-            min_df=1,  # Keep rare terms (important for specialized documents)
-            max_df=0.95,  # Remove very common terms
-            sublinear_tf=True,  # Use log scaling (similar to BM25)
-            norm='l2'
+        Returns counts of added, changed and deleted pages.
+        """
+        if not ColumnarIndex.exists(self.index_dir):
+            self.build_index()
+            return {'added': len(self.pages), 'changed': 0, 'deleted': 0}
+        
+        with index_lock(self.index_dir):
+            index = SegmentedIndex(self.index_dir)
+            try:
+                counts = self._write_delta(index, detect_changes)
+            finally:
+                index.close()
+        
+        self._open_index()
+        LOGGER.info(
+            "Index update: %d added, %d changed, %d deleted (%d delta segments, %d delta rows)",
+            counts['added'], counts['changed'], counts['deleted'], len(self.index.deltas), self.index.delta_rows,
         )
         
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.page_texts)
-        
-        with open(self.tfidf_cache, 'wb') as f:
-            pickle.dump(self.tfidf_vectorizer, f)
-        with open(self.tfidf_matrix_cache, 'wb') as f:
-            pickle.dump(self.tfidf_matrix, f)
-        
-        LOGGER.info("TF-IDF index built: %d features", len(self.tfidf_vectorizer.vocabulary_))
+        if merge and self.index.deltas and (
+            len(self.index.deltas) >= max_deltas
+            or self.index.delta_rows >= merge_ratio * len(self.index.base)
+        ):
+            self.merge_segments(background=background_merge)
+        return counts
     
-    def _build_embedding_index(self, force_rebuild: bool = False) -> None:
-        """Build dense embedding index for semantic matching."""
-        if not force_rebuild and self.embeddings_cache.exists():
-            LOGGER.info("Loading embeddings from cache...")
-            with open(self.embeddings_cache, 'rb') as f:
-                self.embeddings = pickle.load(f)
-            return
-        
-        LOGGER.info("Building embedding index with model: %s", self.embedding_model_name)
-        
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
-        
-        batch_size = 32
-        embeddings_list = []
-        
-        for i in range(0, len(self.page_texts), batch_size):
-            batch = self.page_texts[i:i + batch_size]
-            batch_embeddings = self.embedding_model.encode(batch, show_progress_bar=True)
-            embeddings_list.append(batch_embeddings)
-        
-        self.embeddings = np.vstack(embeddings_list)
-        
-        with open(self.embeddings_cache, 'wb') as f:
-            pickle.dump(self.embeddings, f)
-        
-        LOGGER.info("Embeddings built: shape %s", self.embeddings.shape)
+    def _write_delta(self, index: SegmentedIndex, detect_changes: bool) -> Dict[str, int]:
+        base = index.base
+        if base.manifest.get('embedding_model', self.embedding_model_name) != self.embedding_model_name:
+            raise ValueError(
+                f"Index was built with {base.manifest.get('embedding_model')}; "
+                f"use build_index(force_rebuild=True) to switch to {self.embedding_model_name}"
+            )
+        
+        max_id = index.max_page_id
+        changed: List[int] = []
+        deleted: List[int] = []
+        if detect_changes:
+            indexed = index.live_hashes()
+            seen = set()
+            with get_session() as session:
+                for page_id, text in session.query(Page.id, Page.text).filter(Page.id <= max_id).yield_per(5000):
+                    if not text or not text.strip():
+                        continue
+                    seen.add(page_id)
+                    if indexed.get(page_id) != exact_text_hash(text):
+                        changed.append(page_id)
+            deleted = sorted(set(indexed) - seen)
+        
+        existing = list_delta_paths(self.index_dir)
+        delta_no = int(existing[-1].name) + 1 if existing else 1
+        writer = ColumnarIndexWriter(self.index_dir / DELTA_DIR / f"{delta_no:06d}")
+        try:
+            store = writer.write_pages(chain(
+                self._iter_corpus_rows(page_ids=changed),
+                self._iter_corpus_rows(after_id=max_id),
+            ))
+            added = len(store) - len(changed)
+            if not len(store) and not deleted:
+                store.close()
+                writer.abort()
+                return {'added': 0, 'changed': 0, 'deleted': 0}
+            
+            if len(store):
+                vectorizer = _restore_vectorizer(
+                    base.tfidf_vocabulary, base.tfidf_idf, base.manifest['tfidf']['params']
+                )
+                writer.write_tfidf(vectorizer, vectorizer.transform(store.iter_texts()), base.manifest['tfidf']['params'])
+                self._embed_pages(writer, store)
+            store.close()
+            writer.write_deleted(deleted)
+            writer.commit(embedding_model=self.embedding_model_name)
+        except Exception:
+            writer.abort()
+            raise
+        return {'added': added, 'changed': len(changed), 'deleted': len(deleted)}
+    
+    def merge_segments(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Fold all delta segments into a new base: live rows are copied (no
+        re-embedding) and TF-IDF is refit so new terms enter the vocabulary.
+        Searches keep using the current segments until the new base is swapped in.
+        """
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            LOGGER.info("Segment merge already running")
+            return self._merge_thread
+        if not background:
+            self._merge()
+            return None
+        self._merge_thread = threading.Thread(target=self._merge, name="index-merge")
+        self._merge_thread.start()
+        return self._merge_thread
+    
+    def _merge(self) -> None:
+        with index_lock(self.index_dir):
+            index = SegmentedIndex(self.index_dir)
+            try:
+                if not index.deltas:
+                    return
+                LOGGER.info("Merging %d delta segments (%d rows) into base", len(index.deltas), index.delta_rows)
+                writer = ColumnarIndexWriter(self.index_dir)
+                try:
+                    store = writer.write_pages(iter(index.pages))
+                    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+                    writer.write_tfidf(vectorizer, vectorizer.fit_transform(store.iter_texts()), TFIDF_PARAMS)
+                    
+                    out = writer.open_embeddings(len(store), index.base.embeddings.shape[1], self.embedding_dtype)
+                    row = 0
+                    for seg, dead in zip(index.segments, index.segment_dead_masks()):
+                        live = np.nonzero(~dead)[0]
+                        for start in range(0, len(live), 10000):
+                            chunk = live[start:start + 10000]
+                            out[row:row + len(chunk)] = seg.embeddings[chunk]
+                            row += len(chunk)
+                    store.close()
+                    writer.commit(
+                        embedding_model=index.base.manifest.get('embedding_model', self.embedding_model_name),
+                        merged_segments=len(index.segments),
+                    )
+                except Exception:
+                    writer.abort()
+                    raise
+            finally:
+                index.close()
+        self._open_index()
+        LOGGER.info("Segment merge complete: %d pages in base", len(self.pages))
+    
+    def refresh(self) -> bool:
+        """Reopen the index if another process added deltas or swapped in a new base."""
+        if self.index is None or not ColumnarIndex.exists(self.index_dir):
+            return False
+        if self._index_signature() == self._opened_signature:
+            return False
+        self._open_index()
+        return True
+    
+    def _index_signature(self) -> Tuple:
+        manifest = self.index_dir / "manifest.json"
+        return (manifest.stat().st_mtime_ns, tuple(p.name for p in list_delta_paths(self.index_dir)))
+    
+    def _legacy_caches_exist(self) -> bool:
+        return all(p.exists() for p in (
+            self.corpus_cache, self.tfidf_cache, self.tfidf_matrix_cache, self.embeddings_cache
+        ))
+    
+    def _migrate_legacy_caches(self) -> None:
+        """Convert the old pickle caches to the columnar format once, without re-embedding."""
+        LOGGER.info("Migrating pickle caches in %s to columnar index", self.cache_dir)
+        with open(self.corpus_cache, 'rb') as f:
+            pages = pickle.load(f)['pages']
+        with open(self.tfidf_cache, 'rb') as f:
+            vectorizer = pickle.load(f)
+        with open(self.tfidf_matrix_cache, 'rb') as f:
+            matrix = pickle.load(f)
+        with open(self.embeddings_cache, 'rb') as f:
+            embeddings = pickle.load(f)
+        
+        writer = ColumnarIndexWriter(self.index_dir)
+        try:
+            writer.write_pages(pages).close()
+            writer.write_tfidf(vectorizer, matrix, TFIDF_PARAMS)
+            writer.write_embeddings(embeddings, self.embedding_dtype)
+            writer.commit(embedding_model=self.embedding_model_name, migrated_from="pickle")
+        except Exception:
+            writer.abort()
+            raise
+        
+        for path in (self.corpus_cache, self.tfidf_cache, self.tfidf_matrix_cache, self.embeddings_cache):
+            path.unlink()
     
     def search(self, query: str, top_k: int = 10, alpha: float = 0.5) -> List[Dict]:
         """
@@ -176,56 +445,73 @@ class HybridRetriever:
         Returns:
             List of search results with scores and metadata
         """
-        if not self.pages:
-            LOGGER.warning("Index not built. Call build_index() first.")
-            return []
-        
-        tfidf_scores = self._get_tfidf_scores(query)
-        
-        embedding_scores = self._get_embedding_scores(query)
-        
-        hybrid_scores = alpha * tfidf_scores + (1 - alpha) * embedding_scores
-        
-        top_indices = np.argsort(hybrid_scores)[::-1][:top_k]
+        return self.search_many([query], top_k=top_k, alpha=alpha)[0]
+    
+    def search_many(self, queries: Sequence[str], top_k: int = 10, alpha: float = 0.5,
+                    batch_size: int = 32) -> List[List[Dict]]:
+        """
+        Hybrid search for several queries at once, results in input order.
         
-        results = []
-        for idx in top_indices:
-            if hybrid_scores[idx] > 0:
-                page_data = self.pages[idx].copy()
-                page_data.update({
-                    'score': float(hybrid_scores[idx]),
-                    'tfidf_score': float(tfidf_scores[idx]),
-                    'embedding_score': float(embedding_scores[idx]),
-                    'rank': len(results) + 1
-                })
-                results.append(page_data)
+        Each block of batch_size queries is embedded in one encode call and
+        scored with one sparse and one dense matrix product per segment;
+        batch_size bounds the (queries x pages) score matrices held at once.
+        """
+        if self._snapshot is None or not self.pages:
+            LOGGER.warning("Index not built. Call build_index() first.")
+            return [[] for _ in queries]
+        index, vectorizer = self._snapshot
+        
+        results: List[List[Dict]] = []
+        for start in range(0, len(queries), batch_size):
+            block = list(queries[start:start + batch_size])
+            tfidf_scores = index.tfidf_scores_many(vectorizer.transform(block))
+            embedding_scores = index.embedding_scores_many(self._encode_queries(block))
+            
+            hybrid_scores = alpha * tfidf_scores + (1 - alpha) * embedding_scores
+            hybrid_scores[:, index.dead] = -np.inf  # rows superseded by a newer segment
+            
+            for row, top in enumerate(top_k_indices(hybrid_scores, top_k)):
+                hits = [int(idx) for idx in top if hybrid_scores[row, idx] > 0]
+                query_results = []
+                for idx, page_data in zip(hits, index.pages.get_many(hits)):
+                    page_data.update({
+                        'score': float(hybrid_scores[row, idx]),
+                        'tfidf_score': float(tfidf_scores[row, idx]),
+                        'embedding_score': float(embedding_scores[row, idx]),
+                        'rank': len(query_results) + 1
+                    })
+                    query_results.append(page_data)
+                results.append(query_results)
         
         return results
     
     def _get_tfidf_scores(self, query: str) -> np.ndarray:
-        """Get TF-IDF similarity scores for query."""
-        query_vector = self.tfidf_vectorizer.transform([query])
-        scores = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
-        return scores
+        """Get TF-IDF similarity scores for query (rows are L2-normalized, so a dot product is cosine)."""
+        index, vectorizer = self._snapshot
+        return index.tfidf_scores(vectorizer.transform([query]))
     
-    def _get_embedding_scores(self, query: str) -> np.ndarray:
-        """Get embedding similarity scores for query."""
-        if self.embedding_model is None:
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
-        
-        query_embedding = self.embedding_model.encode([query])
-        scores = cosine_similarity(query_embedding, self.embeddings).flatten()
-        return scores
+    def _get_embedding_scores(self, query: str, index: Optional[SegmentedIndex] = None) -> np.ndarray:
+        """Get embedding similarity scores for query (stored embeddings are L2-normalized)."""
+        index = index or self._snapshot[0]
+        return index.embedding_scores(self._encode_queries([query])[0])
+    
+    def _encode_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Embed queries in one encode call, L2-normalized like the stored embeddings."""
+        query_embeddings = get_query_embedding_cache().encode(
+            self._get_embedding_model(), self.embedding_model_name, queries
+        )
+        return normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the retrieval index."""
+        summary = self.pages.summary() if self.index is not None else {}
         return {
             'total_pages': len(self.pages),
-            'total_words': sum(p['word_count'] for p in self.pages),
+            'total_words': summary.get('total_words', 0),
             'tfidf_features': len(self.tfidf_vectorizer.vocabulary_) if self.tfidf_vectorizer else 0,
             'embedding_dim': self.embeddings.shape[1] if self.embeddings is not None else 0,
-            'sources': len(set(p['source_name'] for p in self.pages)),
-            'documents': len(set(p['document_id'] for p in self.pages))
+            'sources': summary.get('sources', 0),
+            'documents': summary.get('documents', 0)
         }
 
 
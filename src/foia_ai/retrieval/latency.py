@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator
+
+import numpy as np
+
+from ..config import SEARCH_LATENCY_WINDOW
+
+
+class LatencyTracker:
+    """
+    Rolling per-stage latencies (the last `window` samples of each) and
+    timeout counts, for reporting p50/p95 of search legs.
+    """
+
+    def __init__(self, window: int = SEARCH_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._timeouts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def record_timeout(self, stage: str) -> None:
+        with self._lock:
+            self._timeouts[stage] += 1
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            samples = {stage: np.fromiter(values, dtype=np.float64) for stage, values in self._samples.items()}
+            timeouts = dict(self._timeouts)
+        out: Dict[str, Dict[str, Any]] = {}
+        for stage in sorted(set(samples) | set(timeouts)):
+            values = samples.get(stage)
+            entry: Dict[str, Any] = {'count': 0, 'timeouts': timeouts.get(stage, 0)}
+            if values is not None and values.size:
+                p50, p95 = np.percentile(values, [50, 95]) * 1000
+                entry.update({
+                    'count': int(values.size),
+                    'p50_ms': round(float(p50), 2),
+                    'p95_ms': round(float(p95), 2),
+                    'max_ms': round(float(values.max()) * 1000, 2),
+                })
+            out[stage] = entry
+        return out
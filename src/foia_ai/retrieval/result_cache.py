@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..config import SEARCH_RESULT_CACHE_SIZE, SEARCH_RESULT_CACHE_TTL
+from .embedding_cache import normalize_query
+
+LOGGER = logging.getLogger(__name__)
+
+
+def path_version(paths: Iterable[Path]) -> Tuple:
+    """
+    Cheap fingerprint of on-disk index files: (inode, mtime) per path, None
+    when missing. Rebuilding or swapping an index changes it, which is what
+    the result cache keys on.
+    """
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((st.st_ino, st.st_mtime_ns))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def search_cache_key(query: str, search_mode: str, top_k: int, semantic_weight: float, diversity: str) -> Tuple:
+    return (normalize_query(query), search_mode, int(top_k), round(float(semantic_weight), 4), diversity)
+
+
+class SearchResultCache:
+    """
+    TTL + LRU cache of result lists for repeated searches.
+
+    Entries belong to one index version; the first lookup that sees a new
+    version (a rebuilt LanceDB/Tantivy store or batch index) drops them
+    all. Results are copied in and out so callers can decorate them freely.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_RESULT_CACHE_SIZE, ttl_seconds: float = SEARCH_RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, Tuple[float, List[Dict[str, Any]]]] = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _copy(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [dict(result) for result in results]
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                LOGGER.info("Search index changed; dropping %d cached result lists", len(self._entries))
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[List[Dict[str, Any]]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._copy(entry[1])
+
+    def put(self, key: Hashable, version: Hashable, results: List[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, self._copy(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_search(self, key: Hashable, version: Hashable,
+                      search: Callable[[], List[Dict[str, Any]]],
+                      cacheable: Optional[Callable[[], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Cached results for key, else search() stored under key. cacheable is
+        asked after the search; partial results (a backend leg timed out)
+        are returned but not kept.
+        """
+        cached = self.get(key, version)
+        if cached is not None:
+            return cached
+        results = search()
+        if cacheable is None or cacheable():
+            self.put(key, version, results)
+        return self._copy(results)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[SearchResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_result_cache() -> SearchResultCache:
+    """Process-wide cache shared by the web search route and wiki generation."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchResultCache()
+        return _cache
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+
+def top_k_indices(scores: np.ndarray, k: int, *, min_score: Optional[float] = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+
+    argpartition selects the k in O(n) and only those k are sorted, instead
+    of argsorting the whole array. A 2-D array is treated as a batch of
+    queries (one row each) and gives a (n_queries, k) result; min_score is
+    only supported for 1-D input, where lower scores are dropped.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind='stable')
+    top = np.take_along_axis(part, order, axis=-1).astype(np.int64, copy=False)
+
+    if min_score is not None:
+        if scores.ndim != 1:
+            raise ValueError("min_score is only supported for a single query")
+        top = top[scores[top] > min_score]
+    return top
+
+
+def select_top_k(scores: np.ndarray, k: int, *, min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, scores) of the k highest scores, best first; see top_k_indices."""
+    scores = np.asarray(scores)
+    top = top_k_indices(scores, k, min_score=min_score)
+    return top, np.take_along_axis(scores, top, axis=-1)
+
+
+def iter_descending(items: Iterable[T], key: Callable[[T], float]) -> Iterator[T]:
+    """
+    Yield items best first, lazily.
+
+    For result lists that are filtered while being consumed (per-document
+    diversity caps), where the number of items needed isn't known up
+    front: heapify is O(n) and each item taken costs O(log n), so stopping
+    after the first few never pays for a full sort. Ties keep input order.
+    """
+    heap = [(-key(item), position, item) for position, item in enumerate(items)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+
+LOOKUP_CHUNK = 500  # hashes per IN (...) lookup, under SQLite's bound-parameter limit
+
+
+class SQLiteVectorStore:
+    """
+    float32 vectors keyed by (model name, text hash) in one table of a SQLite
+    file, shared by the query embedding cache and the chunk embedding store.
+
+    Each thread gets its own WAL connection, so several threads and
+    processes can read while one writes. Callers choose the hash; vectors
+    are returned as read-only views of the stored bytes.
+    """
+
+    def __init__(self, path: Path, table: str, *, timeout: float = 30):
+        self.path = Path(path)
+        self.table = table
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model_name: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        conn = self._conn()
+        for start in range(0, len(unique), LOOKUP_CHUNK):
+            chunk = unique[start:start + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM {self.table} WHERE model = ? "
+                f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                [model_name, *chunk],
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray], *, replace: bool = False) -> None:
+        """Save hash -> vector; existing rows are kept unless replace is set."""
+        if not vectors:
+            return
+        now = time.time()
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn = self._conn()
+        conn.executemany(
+            f"{verb} INTO {self.table} (model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (model_name, text_hash, int(vector.shape[0]), np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for text_hash, vector in vectors.items()
+            ],
+        )
+        conn.commit()
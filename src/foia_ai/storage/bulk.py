@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import csv
+import io
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Union
+
+from sqlalchemy import Table, insert
+
+from ..config import DB_BULK_BATCH_SIZE
+from .db import engine
+from .models import Page
+
+LOGGER = logging.getLogger(__name__)
+
+PAGE_COLUMNS = ("document_id", "page_no", "text", "ocr_confidence", "image_path")
+
+PageRow = Union[Mapping[str, Any], Sequence[Any]]
+
+
+def _as_page_dict(row: PageRow) -> Dict[str, Any]:
+    if isinstance(row, Mapping):
+        values = {col: row.get(col) for col in PAGE_COLUMNS}
+    else:
+        values = dict(zip(PAGE_COLUMNS, row))
+        for col in PAGE_COLUMNS[len(row):]:
+            values[col] = None
+    return values
+
+
+def _batched(rows: Iterable[PageRow], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(_as_page_dict(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_statement(table: Table, index_elements: Sequence[str], update_columns: Sequence[str]):
+    """
+    INSERT that resolves conflicts on `index_elements` natively where the dialect
+    allows it (SQLite, Postgres); plain INSERT elsewhere. An empty
+    `update_columns` means conflicting rows are left untouched.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+
+    stmt = dialect_insert(table)
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+    return stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={col: getattr(stmt.excluded, col) for col in update_columns},
+    )
+
+
+def bulk_upsert_pages(
+    rows: Iterable[PageRow],
+    *,
+    batch_size: Optional[int] = None,
+    update_existing: bool = True,
+    method: str = "auto",
+    refresh_stats: bool = True,
+) -> int:
+    """
+    Write Page rows with SQLAlchemy Core instead of one ORM object at a time.
+
+    Rows are dicts or (document_id, page_no, text, ocr_confidence, image_path)
+    tuples. Each batch is one executemany round-trip in its own transaction,
+    so a crash loses at most one batch. Conflicts on uq_doc_page update the
+    existing row (or are skipped with update_existing=False) on SQLite and
+    Postgres; other dialects get a plain insert.
+
+    Args:
+        rows: Page rows, consumed lazily
+        batch_size: Rows per transaction (default DB_BULK_BATCH_SIZE)
+        update_existing: Overwrite text/confidence/image_path of existing pages
+        method: "auto" or "copy" (Postgres only: COPY into a temp table, then upsert)
+        refresh_stats: Recompute document_stats for the touched documents once
+            all rows are written. Callers streaming one page at a time should
+            pass False and refresh when the document is complete.
+
+    Returns number of rows written
+    """
+    batch_size = batch_size or DB_BULK_BATCH_SIZE
+    touched: Set[int] = set()
+
+    def track(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+        for batch in batches:
+            touched.update(row['document_id'] for row in batch)
+            yield batch
+
+    batches = track(_batched(rows, batch_size))
+    if method == "copy":
+        if engine.dialect.name != "postgresql":
+            raise ValueError("method='copy' requires a Postgres DATABASE_URL")
+        written = _copy_upsert_pages(batches, update_existing=update_existing)
+    else:
+        stmt = upsert_statement(
+            Page.__table__,
+            ["document_id", "page_no"],
+            ["text", "ocr_confidence", "image_path"] if update_existing else [],
+        )
+        written = 0
+        for batch in batches:
+            with engine.begin() as conn:
+                conn.execute(stmt, batch)
+            written += len(batch)
+            LOGGER.debug("Bulk page write: %d rows (%d total)", len(batch), written)
+
+    if refresh_stats and touched:
+        from .stats import refresh_document_stats
+        refresh_document_stats(touched)
+    return written
+
+
+def _copy_upsert_pages(batches: Iterable[List[Dict[str, Any]]], *, update_existing: bool) -> int:
+    """Postgres COPY FROM STDIN into a temp table, then one INSERT ... SELECT ... ON CONFLICT per batch."""
+    columns = ", ".join(PAGE_COLUMNS)
+    if update_existing:
+        conflict = (
+            "ON CONFLICT (document_id, page_no) DO UPDATE SET "
+            "text = EXCLUDED.text, ocr_confidence = EXCLUDED.ocr_confidence, image_path = EXCLUDED.image_path"
+        )
+    else:
+        conflict = "ON CONFLICT (document_id, page_no) DO NOTHING"
+
+    written = 0
+    for batch in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(["\\N" if row[col] is None else row[col] for col in PAGE_COLUMNS])
+        buffer.seek(0)
+
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS pages_stage ("
+                "document_id integer, page_no integer, text text, "
+                "ocr_confidence double precision, image_path varchar(1000)"
+                ") ON COMMIT DELETE ROWS"
+            )
+            cursor.copy_expert(
+                f"COPY pages_stage ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO pages ({columns}) SELECT {columns} FROM pages_stage {conflict}"
+            )
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        written += len(batch)
+    return written
+
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import func, select
+
+from .db import get_session
+from .models import Document, Page, Source
+
+LOGGER = logging.getLogger(__name__)
+
+
+def document_batch_starts(batch_size: int, *, source: Optional[str] = None) -> List[int]:
+    """
+    Keyset cursor (the id to read after) for every consecutive run of
+    batch_size documents in id order; the first is 0. Batch n of
+    iter_documents(after_id=starts[n], limit=batch_size) then covers the
+    same documents as OFFSET n*batch_size, without the deep OFFSET scans.
+    """
+    starts = [0]
+    with get_session() as session:
+        q = session.query(Document.id)
+        if source:
+            q = q.join(Source, Document.source_id == Source.id).filter(Source.name == source)
+        for position, (doc_id,) in enumerate(q.order_by(Document.id).yield_per(10000), 1):
+            if position % batch_size == 0:
+                starts.append(doc_id)
+    return starts
+
+
+def _duplicate_file_ids(session, after_id: int, last_id: int) -> Set[int]:
+    """Ids in (after_id, last_id] whose sha256 is shared with a lower document id"""
+    batch_hashes = (
+        select(Document.sha256)
+        .where(Document.id > after_id, Document.id <= last_id, Document.sha256.isnot(None))
+        .scalar_subquery()
+    )
+    first_copy = (
+        session.query(Document.sha256, func.min(Document.id).label('first_id'))
+        .filter(Document.sha256.in_(batch_hashes))
+        .group_by(Document.sha256)
+        .subquery()
+    )
+    rows = (
+        session.query(Document.id)
+        .join(first_copy, first_copy.c.sha256 == Document.sha256)
+        .filter(Document.id > after_id, Document.id <= last_id, Document.id != first_copy.c.first_id)
+    )
+    return {doc_id for (doc_id,) in rows}
+
+
+def _document_dict(doc_id, external_id, title, url, source_name, sha256, pages: List[Dict], include_pages: bool) -> Dict:
+    full_text = "\n\n".join(page['text'] for page in pages)
+    doc = {
+        'document_id': doc_id,
+        'id': external_id,
+        'title': title or f"Document {external_id}",
+        'source': source_name or 'Unknown',
+        'text': full_text,
+        'url': url,
+        'sha256': sha256,
+        'page_count': len(pages),
+        'word_count': len(full_text.split()),
+    }
+    if include_pages:
+        doc['pages'] = pages  # page-level data for citation tracking
+    return doc
+
+
+def iter_documents(
+    *,
+    after_id: int = 0,
+    limit: Optional[int] = None,
+    source: Optional[str] = None,
+    min_chars: int = 100,
+    include_pages: bool = True,
+    skip_duplicate_files: bool = False,
+    batch_size: int = 500,
+) -> Iterator[Dict]:
+    """
+    Stream documents with their page text, in id order, for index building.
+
+    Documents are read batch_size at a time by primary-key keyset
+    (id > last id seen), and each batch's pages come from one joined query
+    ordered by (document_id, page_no) and streamed with yield_per, so memory
+    stays at one batch whatever the corpus size. limit caps the documents
+    scanned (not yielded); documents whose text is shorter than min_chars
+    after stripping, including those with no text at all, are skipped.
+    With skip_duplicate_files, a document whose sha256 also belongs to a
+    lower id is skipped too, so concurrent batch builders agree on which
+    copy of a re-published file gets indexed.
+    """
+    last_id = after_id
+    remaining = limit
+    while remaining is None or remaining > 0:
+        take = batch_size if remaining is None else min(batch_size, remaining)
+        with get_session() as session:
+            ids_query = session.query(Document.id).filter(Document.id > last_id)
+            if source:
+                ids_query = ids_query.join(Source, Document.source_id == Source.id).filter(Source.name == source)
+            ids = [doc_id for (doc_id,) in ids_query.order_by(Document.id).limit(take)]
+            if not ids:
+                return
+            duplicates = _duplicate_file_ids(session, last_id, ids[-1]) if skip_duplicate_files else set()
+
+            rows = (
+                session.query(
+                    Document.id, Document.external_id, Document.title, Document.url, Source.name,
+                    Document.sha256, Page.page_no, Page.text,
+                )
+                .join(Page, Page.document_id == Document.id)
+                .outerjoin(Source, Document.source_id == Source.id)
+                .filter(Document.id > last_id, Document.id <= ids[-1])
+                .filter(Page.text.isnot(None), Page.text != "")
+                .order_by(Document.id, Page.page_no)
+            )
+            if source:
+                rows = rows.filter(Source.name == source)
+
+            current = None
+            pages: List[Dict] = []
+            for doc_id, external_id, title, url, source_name, sha256, page_no, text in rows.yield_per(1000):
+                if doc_id in duplicates:
+                    continue
+                if current is not None and doc_id != current[0]:
+                    doc = _document_dict(*current, pages, include_pages)
+                    if len(doc['text'].strip()) >= min_chars:
+                        yield doc
+                    pages = []
+                current = (doc_id, external_id, title, url, source_name, sha256)
+                pages.append({'page_no': page_no, 'text': text})
+            if current is not None:
+                doc = _document_dict(*current, pages, include_pages)
+                if len(doc['text'].strip()) >= min_chars:
+                    yield doc
+
+        LOGGER.debug("Corpus reader: %d documents scanned through id %d", len(ids), ids[-1])
+        last_id = ids[-1]
+        if remaining is not None:
+            remaining -= len(ids)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, column, or_, text
+from sqlalchemy.sql import ColumnElement
+
+from .db import engine, get_session
+from .models import Document, Page
+
+LOGGER = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# SQLite: external-content FTS5 tables mirroring pages/documents, kept in sync by triggers.
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+    "text, content='pages', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+    "title, external_id, content='documents', content_rowid='id', tokenize='porter unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS pages_fts_ai AFTER INSERT ON pages BEGIN
+        INSERT INTO pages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pages_fts_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pages_fts_au AFTER UPDATE OF text ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO pages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, external_id) VALUES (new.id, new.title, new.external_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, external_id)
+        VALUES ('delete', old.id, old.title, old.external_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF title, external_id ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, external_id)
+        VALUES ('delete', old.id, old.title, old.external_id);
+        INSERT INTO documents_fts(rowid, title, external_id) VALUES (new.id, new.title, new.external_id);
+    END""",
+)
+
+# Postgres: stored generated tsvector columns (always in sync) with GIN indexes.
+_POSTGRES_DDL = (
+    "ALTER TABLE pages ADD COLUMN IF NOT EXISTS text_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(text, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_pages_text_tsv ON pages USING GIN (text_tsv)",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(external_id, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_documents_search_tsv ON documents USING GIN (search_tsv)",
+)
+
+_ensured = False
+_ensure_lock = threading.Lock()
+
+INDEX_RECHECK_SECONDS = 60  # how often a missing index is probed for again
+_index_available = False
+_index_checked_at = 0.0
+
+
+@dataclass
+class PageHit:
+    """One ranked full-text match. Higher score is better on every backend."""
+    page_id: int
+    document_id: int
+    page_no: int
+    external_id: Optional[str]
+    title: Optional[str]
+    source_name: Optional[str]
+    score: float
+    snippet: str
+
+
+def fulltext_supported() -> bool:
+    return engine.dialect.name in ("sqlite", "postgresql")
+
+
+def _index_exists() -> bool:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            found = conn.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE name IN ('pages_fts', 'documents_fts')")
+            ).scalar()
+            return found == 2
+        found = conn.execute(text(
+            "SELECT count(*) FROM information_schema.columns WHERE "
+            "(table_name = 'pages' AND column_name = 'text_tsv') OR "
+            "(table_name = 'documents' AND column_name = 'search_tsv')"
+        )).scalar()
+        return found == 2
+
+
+def fulltext_index_available() -> bool:
+    """
+    Whether the full-text index has been built (scripts/build_fulltext_index.py).
+
+    Only detects; never creates. Once found it is assumed to stay; while
+    missing it is probed again at most every INDEX_RECHECK_SECONDS.
+    """
+    global _index_available, _index_checked_at
+    if not fulltext_supported():
+        return False
+    if _index_available:
+        return True
+    now = time.monotonic()
+    if _index_checked_at and now - _index_checked_at < INDEX_RECHECK_SECONDS:
+        return False
+    _index_checked_at = now
+    try:
+        _index_available = _index_exists()
+    except Exception as e:
+        LOGGER.warning("Could not check for the full-text index: %s", e)
+        return False
+    if not _index_available:
+        LOGGER.warning("Full-text index not built; searches use ILIKE. Run scripts/build_fulltext_index.py")
+    return _index_available
+
+
+def ensure_fulltext_index(*, rebuild: bool = False) -> None:
+    """
+    Create the full-text index structures if missing.
+
+    This runs the full DDL (an FTS5 rebuild over all page text on SQLite, a
+    table rewrite plus GIN build on Postgres), so call it from
+    scripts/build_fulltext_index.py or ingestion setup, not web startup.
+
+    On SQLite a freshly created FTS table is populated from existing rows;
+    afterwards the triggers keep it current for every writer (ORM or Core
+    bulk upserts). Pass rebuild=True to repopulate it from scratch.
+    """
+    global _ensured, _index_available
+    if not fulltext_supported():
+        return
+    with _ensure_lock:
+        if _ensured and not rebuild:
+            return
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                existing = {
+                    name for (name,) in conn.execute(
+                        text("SELECT name FROM sqlite_master WHERE name IN ('pages_fts', 'documents_fts')")
+                    )
+                }
+                for ddl in _SQLITE_DDL:
+                    conn.execute(text(ddl))
+                for table in ("pages_fts", "documents_fts"):
+                    if rebuild or table not in existing:
+                        LOGGER.info("Building %s from existing rows", table)
+                        conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+            else:
+                for ddl in _POSTGRES_DDL:
+                    conn.execute(text(ddl))
+        _ensured = True
+        _index_available = True
+
+
+def _terms(query: str) -> List[str]:
+    return TOKEN_RE.findall(query.lower())
+
+
+def _sqlite_match(query: str, prefix: bool) -> Optional[str]:
+    """User input -> FTS5 MATCH string: every term quoted and ANDed, last one prefix-matched."""
+    terms = _terms(query)
+    if not terms:
+        return None
+    parts = [f'"{t}"' for t in terms]
+    if prefix:
+        parts[-1] += "*"
+    return " ".join(parts)
+
+
+def _postgres_tsquery(query: str, prefix: bool) -> Optional[str]:
+    terms = _terms(query)
+    if not terms:
+        return None
+    if prefix:
+        terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+def search_pages(
+    query: str,
+    *,
+    limit: int = 10,
+    offset: int = 0,
+    source_id: Optional[int] = None,
+    prefix: bool = False,
+    highlight: Tuple[str, str] = ("<mark>", "</mark>"),
+) -> List[PageHit]:
+    """
+    Ranked full-text search over page text.
+
+    Uses FTS5 bm25() on SQLite and ts_rank_cd on Postgres; other backends,
+    and databases where the index has not been built yet, fall back to an
+    unranked ILIKE scan. Snippets wrap matched terms in `highlight` markers.
+    """
+    if not fulltext_index_available():
+        return _search_pages_like(query, limit=limit, offset=offset, source_id=source_id, highlight=highlight)
+
+    start_sel, stop_sel = highlight
+    params = {'limit': limit, 'offset': offset, 'start_sel': start_sel, 'stop_sel': stop_sel}
+    source_filter = ""
+    if source_id is not None:
+        source_filter = "AND d.source_id = :source_id"
+        params['source_id'] = source_id
+
+    if engine.dialect.name == "sqlite":
+        params['q'] = _sqlite_match(query, prefix)
+        sql = f"""
+            SELECT p.id, p.document_id, p.page_no, d.external_id, d.title, s.name,
+                   -bm25(pages_fts) AS score,
+                   snippet(pages_fts, 0, :start_sel, :stop_sel, '…', 24) AS snippet
+            FROM pages_fts
+            JOIN pages p ON p.id = pages_fts.rowid
+            JOIN documents d ON d.id = p.document_id
+            LEFT JOIN sources s ON s.id = d.source_id
+            WHERE pages_fts MATCH :q {source_filter}
+            ORDER BY bm25(pages_fts)
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        params['q'] = _postgres_tsquery(query, prefix)
+        params['headline_opts'] = f'StartSel="{start_sel}", StopSel="{stop_sel}", MaxWords=40, MinWords=15'
+        sql = f"""
+            WITH hits AS (
+                SELECT p.id, p.document_id, p.page_no, p.text,
+                       ts_rank_cd(p.text_tsv, to_tsquery('english', :q)) AS score
+                FROM pages p
+                JOIN documents d ON d.id = p.document_id
+                WHERE p.text_tsv @@ to_tsquery('english', :q) {source_filter}
+                ORDER BY score DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT h.id, h.document_id, h.page_no, d.external_id, d.title, s.name, h.score,
+                   ts_headline('english', coalesce(h.text, ''), to_tsquery('english', :q), :headline_opts)
+            FROM hits h
+            JOIN documents d ON d.id = h.document_id
+            LEFT JOIN sources s ON s.id = d.source_id
+            ORDER BY h.score DESC
+        """
+
+    if params['q'] is None:
+        return []
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).all()
+    return [PageHit(*row) for row in rows]
+
+
+def _search_pages_like(
+    query: str, *, limit: int, offset: int, source_id: Optional[int], highlight: Tuple[str, str]
+) -> List[PageHit]:
+    with get_session() as session:
+        q = session.query(Page).join(Document).filter(Page.text.ilike(f"%{query}%"))
+        if source_id is not None:
+            q = q.filter(Document.source_id == source_id)
+        hits = []
+        for page in q.order_by(Page.id).offset(offset).limit(limit):
+            body = page.text or ""
+            pos = body.lower().find(query.lower())
+            lo, hi = max(0, pos - 100), pos + len(query) + 100
+            snippet = body[lo:pos] + highlight[0] + body[pos:pos + len(query)] + highlight[1] + body[pos + len(query):hi]
+            doc = page.document
+            hits.append(PageHit(
+                page.id, page.document_id, page.page_no, doc.external_id, doc.title,
+                doc.source.name if doc.source else None, 0.0, snippet,
+            ))
+        return hits
+
+
+def document_match_clause(query: str, *, include_pages: bool = True, prefix: bool = True) -> ColumnElement:
+    """
+    WHERE clause selecting documents whose title/external_id (and, with
+    include_pages, any page text) matches `query`, as an index lookup.
+
+    Without the index only title/external_id are matched, by ILIKE: a page
+    text ILIKE would scan every page on each call.
+    """
+    if not fulltext_index_available():
+        like = f"%{query}%"
+        return or_(Document.title.ilike(like), Document.external_id.ilike(like))
+
+    if engine.dialect.name == "sqlite":
+        match = _sqlite_match(query, prefix)
+        sql = "SELECT rowid FROM documents_fts WHERE documents_fts MATCH :fts_q"
+        if include_pages:
+            sql += (
+                " UNION SELECT p.document_id FROM pages_fts"
+                " JOIN pages p ON p.id = pages_fts.rowid WHERE pages_fts MATCH :fts_q"
+            )
+    else:
+        match = _postgres_tsquery(query, prefix)
+        sql = "SELECT id FROM documents WHERE search_tsv @@ to_tsquery('english', :fts_q)"
+        if include_pages:
+            sql += " UNION SELECT document_id FROM pages WHERE text_tsv @@ to_tsquery('english', :fts_q)"
+
+    if match is None:
+        return Document.id.is_(None)
+    ids = text(sql).bindparams(fts_q=match).columns(column("id", Integer))
+    return Document.id.in_(ids)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from ..config import DOC_METADATA_CACHE_SIZE
+from .db import get_session
+from .models import Document, Source
+
+LOGGER = logging.getLogger(__name__)
+
+IN_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+
+def default_metadata(doc_id: str) -> Dict[str, str]:
+    """What search results show for a doc_id with no documents row."""
+    return {'title': f"{doc_id}.pdf", 'source': 'Unknown', 'url': f"/pdf/{doc_id}"}
+
+
+def _metadata(doc_id: str, title: Optional[str], source_name: Optional[str]) -> Dict[str, str]:
+    return {'title': title or f"{doc_id}.pdf", 'source': source_name or 'Unknown', 'url': f"/pdf/{doc_id}"}
+
+
+class DocumentMetadataCache:
+    """
+    external_id -> {title, source, url} for search results.
+
+    resolve() serves what it can from an in-process LRU and fetches the rest
+    with one IN (...) query per IN_CHUNK ids, instead of one session and
+    query per hit. Ids with no row get the default metadata but are not
+    cached, so a document ingested while the process runs shows its real
+    title on the next search. When an external_id exists under several
+    sources the lowest document id wins.
+    """
+
+    def __init__(self, max_entries: int = DOC_METADATA_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Dict[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def _remember(self, doc_id: str, metadata: Dict[str, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[doc_id] = metadata
+            self._entries.move_to_end(doc_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _fetch(self, doc_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        found: Dict[str, Dict[str, str]] = {}
+        with get_session() as session:
+            for start in range(0, len(doc_ids), IN_CHUNK):
+                chunk = doc_ids[start:start + IN_CHUNK]
+                rows = (
+                    session.query(Document.external_id, Document.title, Source.name)
+                    .outerjoin(Source, Document.source_id == Source.id)
+                    .filter(Document.external_id.in_(chunk))
+                    .order_by(Document.id)
+                )
+                self.queries += 1
+                for external_id, title, source_name in rows:
+                    if external_id not in found:
+                        found[external_id] = _metadata(external_id, title, source_name)
+        return found
+
+    def resolve(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """Metadata for every distinct id in doc_ids; falls back to default_metadata if the database fails."""
+        result: Dict[str, Dict[str, str]] = {}
+        pending: List[str] = []
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in result or doc_id in pending:
+                    continue
+                metadata = self._entries.get(doc_id)
+                if metadata is not None:
+                    self._entries.move_to_end(doc_id)
+                    result[doc_id] = metadata
+                    self.hits += 1
+                else:
+                    pending.append(doc_id)
+
+        if pending:
+            self.misses += len(pending)
+            try:
+                found = self._fetch(pending)
+            except Exception as e:
+                LOGGER.warning("Document metadata lookup failed for %d ids: %s", len(pending), e)
+                for doc_id in pending:
+                    result[doc_id] = default_metadata(doc_id)
+                return result
+            for doc_id in pending:
+                metadata = found.get(doc_id)
+                if metadata is None:
+                    result[doc_id] = default_metadata(doc_id)
+                    continue
+                self._remember(doc_id, metadata)
+                result[doc_id] = metadata
+        return result
+
+    def get(self, doc_id: str) -> Dict[str, str]:
+        return self.resolve([doc_id])[doc_id]
+
+    def prewarm(self, batch_size: int = 5000) -> int:
+        """Load every document (up to max_entries) in one streamed pass; returns the number cached."""
+        loaded = 0
+        with get_session() as session:
+            rows = (
+                session.query(Document.external_id, Document.title, Source.name)
+                .outerjoin(Source, Document.source_id == Source.id)
+                .filter(Document.external_id.isnot(None))
+                .order_by(Document.id.desc())  # lowest id is remembered last, matching resolve()
+                .yield_per(batch_size)
+            )
+            for external_id, title, source_name in rows:
+                self._remember(external_id, _metadata(external_id, title, source_name))
+                loaded += 1
+        LOGGER.info("Prewarmed document metadata for %d rows (%d cached)", loaded, len(self._entries))
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'queries': self.queries,
+        }
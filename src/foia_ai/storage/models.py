@@ -40,6 +40,7 @@ class Document(Base):
 
     source: Mapped[Source] = relationship("Source", back_populates="documents")
     page_texts: Mapped[list[Page]] = relationship("Page", back_populates="document", cascade="all, delete-orphan")
+    stats: Mapped[Optional[DocumentStats]] = relationship("DocumentStats", uselist=False, cascade="all, delete-orphan")
 
 
 class Page(Base):
@@ -59,6 +60,19 @@ class Page(Base):
     document: Mapped[Document] = relationship("Document", back_populates="page_texts")
 
 
+class DocumentStats(Base):
+    """Denormalized per-document page/word counts, maintained by the page writers (see storage.stats)."""
+    __tablename__ = "document_stats"
+
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), primary_key=True)
+    page_count: Mapped[int] = mapped_column(Integer, default=0)
+    word_count: Mapped[int] = mapped_column(Integer, default=0)
+    char_count: Mapped[int] = mapped_column(Integer, default=0)
+    ocr_page_count: Mapped[int] = mapped_column(Integer, default=0)
+    avg_ocr_confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class IngestionJob(Base):
     __tablename__ = "ingestion_jobs"
 
@@ -69,3 +83,19 @@ class IngestionJob(Base):
     finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     stats: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string for simplicity
+
+
+class DocumentIngestState(Base):
+    """Durable per-document ingestion progress, so interrupted runs resume at the last completed stage."""
+    __tablename__ = "document_ingest_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), unique=True, index=True)
+    job_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ingestion_jobs.id"), nullable=True, index=True)
+
+    stage: Mapped[str] = mapped_column(String(20), default="pending", index=True)  # Last completed stage
+    status: Mapped[str] = mapped_column(String(20), default="ok")  # ok | failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    detail: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON: page plan, counters
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
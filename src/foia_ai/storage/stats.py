@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+
+from .bulk import upsert_statement
+from .db import Base, engine, get_session
+from .models import Document, DocumentStats, Page
+
+LOGGER = logging.getLogger(__name__)
+
+STATS_COLUMNS = ("page_count", "word_count", "char_count", "ocr_page_count", "avg_ocr_confidence", "updated_at")
+
+
+def _create_document_stats_table() -> None:
+    Base.metadata.create_all(engine, tables=[DocumentStats.__table__])
+
+
+def _has_documents_without_stats() -> bool:
+    with get_session() as session:
+        row = (
+            session.query(Document.id)
+            .outerjoin(DocumentStats, DocumentStats.document_id == Document.id)
+            .filter(DocumentStats.document_id.is_(None))
+            .first()
+        )
+    return row is not None
+
+
+def ensure_document_stats_table() -> None:
+    """
+    Create document_stats if this database predates it and fill in rows for
+    documents that have none, so counts read from it are never silently 0.
+    On an up-to-date database this is one anti-join probe.
+    """
+    _create_document_stats_table()
+    if _has_documents_without_stats():
+        LOGGER.info("Some documents have no document_stats row; backfilling them")
+        backfill_document_stats(missing_only=True)
+
+
+def compute_document_stats(session, document_ids: List[int]) -> List[Dict]:
+    """Aggregate page, word, character and OCR counts for the given documents."""
+    rows = {
+        doc_id: {
+            'document_id': doc_id,
+            'page_count': 0,
+            'word_count': 0,
+            'char_count': 0,
+            'ocr_page_count': 0,
+            'avg_ocr_confidence': None,
+            'updated_at': datetime.utcnow(),
+        }
+        for doc_id in document_ids
+    }
+
+    aggregates = (
+        session.query(
+            Page.document_id,
+            func.count(Page.id),
+            func.coalesce(func.sum(func.length(Page.text)), 0),
+            func.count(Page.ocr_confidence),
+            func.avg(Page.ocr_confidence),
+        )
+        .filter(Page.document_id.in_(document_ids))
+        .group_by(Page.document_id)
+    )
+    for doc_id, page_count, char_count, ocr_pages, avg_conf in aggregates:
+        row = rows[doc_id]
+        row['page_count'] = page_count
+        row['char_count'] = int(char_count or 0)
+        row['ocr_page_count'] = ocr_pages
+        row['avg_ocr_confidence'] = float(avg_conf) if avg_conf is not None else None
+
+    # Word counts need a tokenizer the database doesn't have, so stream the text.
+    texts = (
+        session.query(Page.document_id, Page.text)
+        .filter(Page.document_id.in_(document_ids), Page.text.isnot(None))
+        .yield_per(1000)
+    )
+    for doc_id, text in texts:
+        rows[doc_id]['word_count'] += len(text.split())
+
+    return list(rows.values())
+
+
+def refresh_document_stats(document_ids: Iterable[int], *, batch_size: int = 500) -> int:
+    """Recompute and upsert document_stats rows. Returns the number of documents refreshed."""
+    ids = sorted(set(document_ids))
+    if not ids:
+        return 0
+
+    stmt = upsert_statement(DocumentStats.__table__, ["document_id"], STATS_COLUMNS)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with get_session() as session:
+            rows = compute_document_stats(session, batch)
+        with engine.begin() as conn:
+            conn.execute(stmt, rows)
+    return len(ids)
+
+
+def backfill_document_stats(*, batch_size: int = 500, missing_only: bool = False) -> int:
+    """
+    Populate document_stats for every document, walking documents by primary key.
+
+    With missing_only, documents that already have a stats row are skipped.
+    """
+    _create_document_stats_table()
+    refreshed = 0
+    last_id = 0
+    while True:
+        with get_session() as session:
+            query = session.query(Document.id).filter(Document.id > last_id)
+            if missing_only:
+                query = query.outerjoin(DocumentStats, DocumentStats.document_id == Document.id) \
+                    .filter(DocumentStats.document_id.is_(None))
+            ids = [doc_id for (doc_id,) in query.order_by(Document.id).limit(batch_size).all()]
+        if not ids:
+            break
+        refreshed += refresh_document_stats(ids, batch_size=batch_size)
+        last_id = ids[-1]
+        LOGGER.info("Backfilled document stats through document id %d (%d documents)", last_id, refreshed)
+    return refreshed
+
+
+def corpus_totals(source_id: Optional[int] = None) -> Dict[str, int]:
+    """Corpus-wide document/page/word counts read from document_stats."""
+    with get_session() as session:
+        doc_query = session.query(func.count(Document.id))
+        stats_query = session.query(
+            func.coalesce(func.sum(DocumentStats.page_count), 0),
+            func.coalesce(func.sum(DocumentStats.word_count), 0),
+            func.coalesce(func.sum(DocumentStats.char_count), 0),
+            func.coalesce(func.sum(DocumentStats.ocr_page_count), 0),
+        )
+        if source_id is not None:
+            doc_query = doc_query.filter(Document.source_id == source_id)
+            stats_query = stats_query.join(Document, Document.id == DocumentStats.document_id) \
+                .filter(Document.source_id == source_id)
+        documents = doc_query.scalar() or 0
+        pages, words, chars, ocr_pages = stats_query.one()
+
+    return {
+        'documents': int(documents),
+        'pages': int(pages),
+        'words': int(words),
+        'chars': int(chars),
+        'ocr_pages': int(ocr_pages),
+    }
@@ -3,14 +3,27 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Optional
 
-from pdfminer.high_level import extract_text
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer
 
 
-def extract_text_len(pdf_path: Path, maxpages: Optional[int] = None) -> int:
-    """Return length of extractable text using pdfminer.six. If parsing fails, return 0."""
+def extract_text_len(pdf_path: Path, maxpages: Optional[int] = None, stop_at: Optional[int] = None) -> int:
+    """
+    Return length of extractable text using pdfminer.six. If parsing fails, return 0.
+
+    With stop_at, parsing stops as soon as that many characters have been seen,
+    so callers that only compare against a threshold don't parse the whole PDF.
+    """
+    total = 0
     try:
-        text = extract_text(str(pdf_path), maxpages=maxpages)
-        return len(text.strip()) if text else 0
+        pages = extract_pages(str(pdf_path), maxpages=maxpages or 0)
+        for layout in pages:
+            for element in layout:
+                if isinstance(element, LTTextContainer):
+                    total += len(element.get_text().strip())
+            if stop_at is not None and total >= stop_at:
+                break
+        return total
     except Exception:
         return 0
 
@@ -19,5 +32,8 @@ def is_scanned_like(pdf_path: Path, *, threshold: int = 100) -> bool:
     """
     Heuristic: consider PDF scanned-like if extractable text length < threshold.
     threshold can be tuned; 100 chars is a conservative default.
+
+    For mixed scanned/born-digital PDFs prefer foia_ai.ocr.hybrid.extract_pages_hybrid,
+    which decides per page instead of per document.
     """
-    return extract_text_len(pdf_path) < threshold
+    return extract_text_len(pdf_path, stop_at=threshold) < threshold
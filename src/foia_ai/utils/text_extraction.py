@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import logging
+import re
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 
-from pdfminer.high_level import extract_text
 from pdfminer.pdfpage import PDFPage
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.converter import TextConverter
@@ -16,6 +16,58 @@ from .text_cleanup import enhance_text_quality
 LOGGER = logging.getLogger(__name__)
 
 
+WORD_RE = re.compile(r"[A-Za-z]{2,}")
+
+
+def iter_raw_page_texts(pdf_path: Path) -> Iterator[Tuple[int, str]]:
+    """
+    Parse a PDF once and yield (page_number, raw_text) for every page,
+    including pages whose text layer is empty.
+    """
+    with open(pdf_path, 'rb') as file:
+        resource_manager = PDFResourceManager()
+        laparams = LAParams(
+            word_margin=0.1,
+            char_margin=2.0,
+            line_margin=0.5,
+            boxes_flow=0.5
+        )
+        
+        for page_num, page in enumerate(PDFPage.get_pages(file), 1):
+            output_string = StringIO()
+            converter = TextConverter(resource_manager, output_string, laparams=laparams)
+            interpreter = PDFPageInterpreter(resource_manager, converter)
+            
+            interpreter.process_page(page)
+            text = output_string.getvalue()
+            
+            converter.close()
+            output_string.close()
+            
+            yield page_num, text
+
+
+def is_usable_text_layer(text: str, *, min_chars: int = 50, min_alpha_ratio: float = 0.6) -> bool:
+    """
+    Heuristic: is a page's embedded text good enough to skip OCR?
+
+    Rejects near-empty pages and the garbage layers some scanners embed
+    (symbol soup, broken encodings) by requiring mostly letters and a
+    reasonable share of word-like tokens.
+    """
+    stripped = "".join(text.split()) if text else ""
+    if len(stripped) < min_chars:
+        return False
+
+    alpha = sum(1 for c in stripped if c.isalpha())
+    if alpha / len(stripped) < min_alpha_ratio:
+        return False
+
+    tokens = text.split()
+    words = sum(1 for t in tokens if WORD_RE.search(t))
+    return words / len(tokens) >= 0.5
+
+
 def extract_text_by_page(pdf_path: Path) -> List[Tuple[int, str]]:
     """
     Extract text from PDF page by page for text-based PDFs.
@@ -24,29 +76,10 @@ def extract_text_by_page(pdf_path: Path) -> List[Tuple[int, str]]:
     try:
         pages_text = []
         
-        with open(pdf_path, 'rb') as file:
-            resource_manager = PDFResourceManager()
-            laparams = LAParams(
-                word_margin=0.1,
-                char_margin=2.0,
-                line_margin=0.5,
-                boxes_flow=0.5
-            )
-            
-            for page_num, page in enumerate(PDFPage.get_pages(file), 1):
-                output_string = StringIO()
-                converter = TextConverter(resource_manager, output_string, laparams=laparams)
-                interpreter = PDFPageInterpreter(resource_manager, converter)
-                
-                interpreter.process_page(page)
-                text = output_string.getvalue()
-                
-                converter.close()
-                output_string.close()
-                
-                text = enhance_text_quality(text)
-                if text:
-                    pages_text.append((page_num, text))
+        for page_num, text in iter_raw_page_texts(pdf_path):
+            text = enhance_text_quality(text)
+            if text:
+                pages_text.append((page_num, text))
         
         return pages_text
         
@@ -61,9 +94,8 @@ def extract_text_with_metadata(pdf_path: Path) -> dict:
     Returns dict with text, word_count, char_count, page_count, and avg_words_per_page
     """
     try:
-        full_text = extract_text(str(pdf_path))
-        
         pages = extract_text_by_page(pdf_path)
+        full_text = "\n\n".join(text for _, text in pages)
         
         word_count = len(full_text.split()) if full_text else 0
         char_count = len(full_text) if full_text else 0